@@ -1,122 +1,123 @@
 import dash
 from dash import dcc, html, State, dash_table
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, ClientsideFunction
+from dash.exceptions import PreventUpdate
 import plotly.express as px
 import pandas as pd
 import numpy as np
 import dash_bootstrap_components as dbc
 import os
 import plotly.graph_objs as go
-import json
-import base64
+import plotly.io as pio
+from datetime import datetime, timezone
+from flask import jsonify, request
 
 from table_styles import get_table_style
 from table_styles import get_table_position_color
+from table_styles import get_heatmap_bins, get_heatmap_cells, get_heatmap_css
 from chart_styles import apply_darkly_style
+from data_snapshot import load_tables, read_manifest, is_fresh, SNAPSHOT_MAX_AGE_HOURS
+from data_refresh import DataRefresher, current_dataset
+from arrow_store import arrow_lock, read_arrow_manifest, write_arrow_dataset, map_arrow_dataset, process_memory
+from table_schema import validate_tables, optimize_dtypes, decategorize
+from data_index import games_index
+from position_matrix import position_matrix
+from point_distribution import point_distribution, TOP_K_LIMITS
+from team_profiles import team_profiles
+from standings import compute_standings
+from form import last_form_icons
+from result_store import ResultStore, store_key, RENDER_CACHE_SIZE
+from callback_metrics import CallbackMetrics
+from response_compression import compress_response, COMPRESSED_ENDPOINTS
+from figure_payload import compact_figures
+from data_sources import create_data_source
+from sql_engine import sql_engine, resolve_query_engine
+from view_snapshots import ViewSnapshots, layout_values, is_snapshot_request
 
-from google.cloud import bigquery
 
 
-##### SET UP CONNECTION TO BIGQUERY ######
+##### SET UP THE DATA SOURCE: BIGQUERY, OR LOCAL FILES (see data_sources.py) ######
 
-key_json = os.getenv("BIGQUERY_KEY")
-local_key_path = 'C:/Users/marcu/Documents/servicekeys/sportresults-294318-ffcf7d3aebdf.json'
+data_source = create_data_source()
 
-print(f"BIGQUERY_KEY: {key_json}")  # Debug
-
-try:
-    if key_json:
-        decoded_key = base64.b64decode(key_json).decode('utf-8')
-        key_data = json.loads(decoded_key)
-        with open('temp_key.json', 'w') as f:
-            json.dump(key_data, f)
-        client = bigquery.Client.from_service_account_json('temp_key.json')
-        os.remove('temp_key.json')  # Cleanup
-    elif os.path.exists(local_key_path):
-        # Local development key path
-        client = bigquery.Client.from_service_account_json(local_key_path)
-    else:
-        # Local development path
-        # key_path = 'C:/Users/marcu/Documents/servicekeys/sportresults-294318-ffcf7d3aebdf.json'
-        key_path = '/app/servicekeys/sportresults-294318-ffcf7d3aebdf.json'
-        client = bigquery.Client.from_service_account_json(key_path)
-    print("BigQuery client successfully initialized!")
-
-except Exception as e:
-    print(f"Error initializing BigQuery client: {e}")
+# Engine of the standings, point distribution and team comparison aggregations: pandas, or duckdb (see sql_engine.py)
+query_engine = resolve_query_engine()
 
 ############################################################################################################
 
 
 
-q_teamgames = """
-  SELECT *
-  FROM `sportresults-294318.icehockey_plotly_dashboard.swehockey_team_games_dashboard` 
-  where 1=1 
-  """
-
-q_team_season_metrics = """
-  SELECT *
-  FROM `sportresults-294318.icehockey_plotly_dashboard.swehockey_team_season_metrics` 
-  where 1=1 
-  """
+# Freshly loaded tables are validated and compacted before they are published 
+def prepare_tables(tables):
+    return optimize_dtypes(validate_tables(tables))
 
-q_matchdays = """
-  SELECT *
-  FROM `sportresults-294318.icehockey_plotly_dashboard.matchdays` 
-  """
 
-q_teams = """
-  SELECT *
-  FROM `sportresults-294318.icehockey_plotly_dashboard.teams` 
-  """
+def load_dataset(force=False):
+    # Queries for the columns registered in table_schema.py, for local files they also identify the file version 
+    queries = data_source.queries()
 
-q_team_headtohead = """
-  SELECT *
-  FROM `sportresults-294318.icehockey_plotly_dashboard.team_headtohead` 
-  """
+    # Skip the reload if the published dataset is still the fresh snapshot on disk 
+    dataset = current_dataset()
+    manifest = read_manifest()
+    if (not force and dataset is not None and manifest is not None 
+            and manifest['version'] == dataset.version and is_fresh(manifest, queries)):
+        return dataset.version, dataset.tables
 
-q_team_currentmetrics = """
-  SELECT *
-  FROM `sportresults-294318.icehockey_plotly_dashboard.team_current_metrics` 
-  """
+    with arrow_lock():
+        # Map the shared Arrow files if another process already prepared this snapshot 
+        manifest = read_manifest()
+        if not force and manifest is not None and is_fresh(manifest, queries):
+            arrow_manifest = read_arrow_manifest()
+            if arrow_manifest is not None and arrow_manifest['version'] == manifest['version']:
+                try:
+                    return arrow_manifest['version'], map_arrow_dataset(arrow_manifest)
+                except OSError as e:
+                    print(f"Error mapping Arrow dataset {arrow_manifest['version']}: {e}")
 
+        # Load from the local snapshot if it is fresh, otherwise from the data source 
+        tables, manifest = load_tables(queries, data_source, max_age_hours=0 if force else SNAPSHOT_MAX_AGE_HOURS)
+        version = manifest['version'] if manifest else datetime.now(timezone.utc).strftime('live-%Y%m%dT%H%M%S%fZ')
+        tables = prepare_tables(tables)
 
+        # Publish the prepared tables as Arrow files and serve them from the mapping, shared by all workers 
+        try:
+            return version, map_arrow_dataset(write_arrow_dataset(tables, version))
+        except Exception as e:
+            print(f"Error writing Arrow dataset, using in-memory tables: {e}")
+            return version, tables
 
-df_team_games = client.query(q_teamgames).to_dataframe()
-df_team_season_metrics = client.query(q_team_season_metrics).to_dataframe()
-df_matchdays = client.query(q_matchdays).to_dataframe()
-df_teams = client.query(q_teams).to_dataframe()
-df_team_headtohead = client.query(q_team_headtohead).to_dataframe()
-df_team_currentmetrics = client.query(q_team_currentmetrics).to_dataframe()
 
+DATA_REFRESH_MINUTES = float(os.getenv('DATA_REFRESH_MINUTES', '60'))
+REFRESH_TOKEN = os.getenv('REFRESH_TOKEN')
 
+# Structures derived from a dataset are built before it is published 
+def warm_dataset(dataset):
+    games_index(dataset)
+    point_distribution(dataset)
+    team_profiles(dataset).warm()
+    if query_engine == 'duckdb':
+        sql_engine(dataset)
 
-# Function to map results to icons 
-def map_results_to_icons(results):
 
-    icon_map = {
-        'win': '<span class="square-icon win">W</span>',
-        'draw': '<span class="square-icon draw">T</span>',
-        'lost': '<span class="square-icon loss">L</span>',
-        'ot win': '<span class="square-icon ot-win">T</span>',
-        'ot loss': '<span class="square-icon ot-loss">T</span>',
-    }
-  
-    if not results:
-        return ''
+# Set by gunicorn.conf.py when the app is preloaded in the gunicorn master and forked into workers
+PRELOAD_FORK = os.getenv('PRELOAD_FORK') == '1'
 
-    icons = []
-    results_list = results.split(',')
+data_refresher = DataRefresher(load_dataset, interval_seconds=DATA_REFRESH_MINUTES * 60, warm_fn=warm_dataset)
+data_refresher.refresh()
+# Threads do not survive a fork, so with preloading the refresher is started in each worker instead
+if not PRELOAD_FORK:
+    data_refresher.start()
 
-    for result in results_list[:]:
-        icons.append(icon_map.get(result, ''))  # Default to empty if not found
 
-    return ' '.join(icons)
+def after_fork():
+    """
+    Set up a worker forked from the preloaded gunicorn master.
 
-# Apply the mapping function to the 'last_5' column
-df_team_games['last_5_icons'] = df_team_games['last_5_games'].apply(map_results_to_icons)
-df_team_games['result_icon'] = df_team_games['result_details'].apply(map_results_to_icons)
+    The published dataset is inherited from the master and shared copy-on-write,
+    only the data source connection (the BigQuery client) and the refresher thread are per worker.
+    """
+    data_source.connect()
+    data_refresher.start()
 
 
 # INITIALIZE DASH APP 
@@ -127,279 +128,436 @@ app = dash.Dash(__name__,
 
 server = app.server
 
-app.layout = html.Div([
-    dbc.Container([
+callback_metrics = CallbackMetrics()
+
+
+## Instrumentation of the Dash callback requests, reported by /callback-metrics 
+@server.before_request
+def start_callback_metrics():
+    # Requests rendering the view snapshots are not visitor requests
+    if request.path.endswith('/_dash-update-component') and not is_snapshot_request(request):
+        callback_metrics.start(request.content_length)
+        view_snapshots.count_request(request.get_json(silent=True) or {})
+
+
+# The JSON responses of the Dash endpoints are compressed, callback responses are measured before and after 
+@server.after_request
+def finish_callback_metrics(response):
+    if not request.path.endswith(COMPRESSED_ENDPOINTS):
+        return response
+    response_bytes = response.calculate_content_length()
+    with callback_metrics.timed('compress'):
+        compress_response(response, request)
+    if request.path.endswith('/_dash-update-component'):
+        callback_metrics.finish(response_bytes, response.calculate_content_length(), response.status_code)
+    return response
+
+
+# Operational endpoints need the X-Refresh-Token header, and are disabled without REFRESH_TOKEN 
+def is_authorized():
+    return bool(REFRESH_TOKEN) and request.headers.get('X-Refresh-Token') == REFRESH_TOKEN
+
+
+## ENDPOINT: Trigger a data refresh, e.g. from the job that updates the BigQuery tables 
+@server.route('/refresh', methods=['POST'])
+def trigger_refresh():
+    if not is_authorized():
+        return jsonify({'error': 'forbidden'}), 403
+    data_refresher.trigger()
+    return jsonify({'version': current_dataset().version}), 202
+
+
+## ENDPOINT: Hit/miss counters of the server-side caches and memory of this worker 
+@server.route('/cache-stats')
+def cache_stats():
+    if not is_authorized():
+        return jsonify({'error': 'forbidden'}), 403
+    return jsonify({
+        'version': current_dataset().version,
+        'result_store': result_store.stats(),
+        'render_cache': render_cache.stats(),
+        'memory': process_memory(),
+    })
+
+
+## ENDPOINT: Latency, time per phase and payload percentiles of the callbacks of this worker, per callback and per tab 
+@server.route('/callback-metrics')
+def callback_metrics_stats():
+    if not is_authorized():
+        return jsonify({'error': 'forbidden'}), 403
+    return jsonify(callback_metrics.stats())
+
+
+## ENDPOINT: Clear the callback metrics of this worker, e.g. before a load test 
+@server.route('/callback-metrics/reset', methods=['POST'])
+def reset_callback_metrics():
+    if not is_authorized():
+        return jsonify({'error': 'forbidden'}), 403
+    callback_metrics.reset()
+    return '', 204
+
+
+## ENDPOINT: JSON parse times of callback responses, reported by the browser (assets/payload_metrics.js) 
+@server.route('/callback-metrics/client', methods=['POST'])
+def client_callback_metrics():
+    # Browsers report without a token, so reports are limited in size and every sample is checked 
+    if request.content_length is None or request.content_length > CLIENT_REPORT_MAX_BYTES:
+        return jsonify({'error': f'expected a report of at most {CLIENT_REPORT_MAX_BYTES} bytes'}), 413
+    samples = request.get_json(force=True, silent=True)
+    if not isinstance(samples, list):
+        return jsonify({'error': 'expected a list of samples'}), 400
+    for sample in samples[:CLIENT_SAMPLES_PER_REPORT]:
+        client_sample = validate_client_sample(sample)
+        if client_sample is not None:
+            callback_metrics.record_client(*client_sample)
+    return '', 204
+
+
+def validate_client_sample(sample):
+    """
+    Key, parse time and size of a browser sample, None if it is malformed or out of range.
+
+    Tab content responses are keyed on the active tab, like on the server, other responses on
+    their output. Unknown outputs and tabs are dropped, so a client can not add keys.
+    """
+    if not isinstance(sample, dict):
+        return None
+    output, tab = sample.get('output'), sample.get('tab')
+    parse_ms, response_bytes = sample.get('parse_ms'), sample.get('bytes')
+
+    if not isinstance(output, str) or len(output) > max(map(len, app.callback_map)):
+        return None
+    if output == TAB_CONTENT_OUTPUT:
+        if not isinstance(tab, str) or tab not in TAB_IDS:
+            return None
+        key = tab
+    elif output in app.callback_map:
+        key = output
+    else:
+        return None
 
-        ### HEADER ROW 
-        dbc.Row(
-            [
-                dbc.Col(html.H1("🏒 Mackan's Hockey Hub"), width=12, md=6, className="d-flex justify-content-center justify-content-md-start align-items-center"), 
-                dbc.Col(
-                    dbc.Button(
-                        "About Mackan's Hockey Hub",
-                        id="about-button",
-                        color="info",
-                        size="sm",
-                        style={"rightMargin": "20px"}
+    # bool is an int, but not a measurement 
+    if isinstance(parse_ms, bool) or not isinstance(parse_ms, (int, float)) or not 0 <= parse_ms <= CLIENT_PARSE_MS_MAX:
+        return None
+    if isinstance(response_bytes, bool) or not isinstance(response_bytes, int) or not 0 <= response_bytes <= CLIENT_RESPONSE_BYTES_MAX:
+        return None
+    return key, float(parse_ms), response_bytes
+
+
+## ENDPOINTS: Pre-rendered callback responses of the default and most requested views (see view_snapshots.py) 
+@server.route('/view-snapshots.json')
+def view_snapshot_manifest():
+    return view_snapshots.manifest_response(request, current_dataset().version)
+
+
+@server.route('/view-snapshots/<digest>.json')
+def view_snapshot(digest):
+    response = view_snapshots.snapshot_response(request, digest, current_dataset().version)
+    if response is None:
+        return jsonify({'error': 'no snapshot of the current data version'}), 404
+    return response
+
+
+TAB_IDS = ['tab-1', 'tab-2', 'tab-3', 'tab-4', 'tab-5', 'tab-6']
+# Output of the tab content callback, as the browser sends it 
+TAB_CONTENT_OUTPUT = '..' + '...'.join(f'{tab_id}-content.children' for tab_id in TAB_IDS) + '..'
+# Samples and bytes accepted per browser report, so a client can not flood the metrics 
+CLIENT_SAMPLES_PER_REPORT = 50
+CLIENT_REPORT_MAX_BYTES = 64 * 1024
+# Largest parse time and response size of a sample, larger values are not measurements 
+CLIENT_PARSE_MS_MAX = 60000
+CLIENT_RESPONSE_BYTES_MAX = 100 * 2 ** 20
+
+
+def serve_layout():
+    # Built on every page load, so dropdown options follow the current dataset
+    dataset = current_dataset()
+    # Only the key columns of the games table, which stays memory-mapped 
+    df_team_games = games_index(dataset).keys
+    df_matchdays = dataset['matchdays']
+    df_teams = dataset['teams']
+
+    return html.Div([
+        dbc.Container([
+
+            ### HEADER ROW 
+            dbc.Row(
+                [
+                    dbc.Col(html.H1("🏒 Mackan's Hockey Hub"), width=12, md=6, className="d-flex justify-content-center justify-content-md-start align-items-center"), 
+                    dbc.Col(
+                        dbc.Button(
+                            "About Mackan's Hockey Hub",
+                            id="about-button",
+                            color="info",
+                            size="sm",
+                            style={"rightMargin": "20px"}
+                        ),
+                         width=12, md=6,  
+                        className="d-flex justify-content-center justify-content-md-end align-items-center"
                     ),
-                     width=12, md=6,  
-                    className="d-flex justify-content-center justify-content-md-end align-items-center"
-                ),
-            ],
-            className="mt-2",
-        ),
+                ],
+                className="mt-2",
+            ),
 
-        # POPUP FOR INFO BUTTON
-        # MODAL FOR INFO BUTTON
-        dbc.Modal(
-            [
-                dbc.ModalHeader(dbc.ModalTitle("About Mackan's Hockey Hub")),
-                dbc.ModalBody(
-                    html.Div([
-                        html.P("Hey there! 👋 Mackan's Hockey Hub is all about diving into 🏒 ice hockey stats and having some fun with it."),
-                        html.Br(),
-                        html.P("You’ll find data from Sweden’s top two leagues, SHL and HockeyAllsvenskan, updated daily 📅 to keep things fresh."),
-                        html.P("No promises that it’s perfect—so if you spot something odd, just roll with it. This is for fun, after all! 🎉"),
-                        html.Br(),
-                        html.P("Unfortunately, the dashboard is not yet optimized for mobile 📱, so the mobile experience is not very good 😔"),
-                        html.Br(),
-                        html.P([
-                            "Got questions, ideas, or just want to say hi? 💡 Shoot me an email at ",
-                            html.A("mackanshockeyhub@gmail.com", href="mailto:mackanshockeyhub@gmail.com", style={"textDecoration": "none", "color": "#007bff"}),
-                            " ✉️"
-                        ]),
-                ])
-                ),
-                dbc.ModalFooter(
-                    dbc.Button(
-                        "Close",
-                        id="close-modal",
-                        className="ms-auto",
-                        n_clicks=0,
-                    )
-                ),
-            ],
-            id="about-modal",
-            centered=True,  
-            is_open=False, 
-          #  style={"maxWidth": "60%", "marginLeft": "auto", "marginRight": "auto"}
-        ),
+            # POPUP FOR INFO BUTTON
+            # MODAL FOR INFO BUTTON
+            dbc.Modal(
+                [
+                    dbc.ModalHeader(dbc.ModalTitle("About Mackan's Hockey Hub")),
+                    dbc.ModalBody(
+                        html.Div([
+                            html.P("Hey there! 👋 Mackan's Hockey Hub is all about diving into 🏒 ice hockey stats and having some fun with it."),
+                            html.Br(),
+                            html.P("You’ll find data from Sweden’s top two leagues, SHL and HockeyAllsvenskan, updated daily 📅 to keep things fresh."),
+                            html.P("No promises that it’s perfect—so if you spot something odd, just roll with it. This is for fun, after all! 🎉"),
+                            html.Br(),
+                            html.P("Unfortunately, the dashboard is not yet optimized for mobile 📱, so the mobile experience is not very good 😔"),
+                            html.Br(),
+                            html.P([
+                                "Got questions, ideas, or just want to say hi? 💡 Shoot me an email at ",
+                                html.A("mackanshockeyhub@gmail.com", href="mailto:mackanshockeyhub@gmail.com", style={"textDecoration": "none", "color": "#007bff"}),
+                                " ✉️"
+                            ]),
+                    ])
+                    ),
+                    dbc.ModalFooter(
+                        dbc.Button(
+                            "Close",
+                            id="close-modal",
+                            className="ms-auto",
+                            n_clicks=0,
+                        )
+                    ),
+                ],
+                id="about-modal",
+                centered=True,  
+                is_open=False, 
+              #  style={"maxWidth": "60%", "marginLeft": "auto", "marginRight": "auto"}
+            ),
 
-        ### TAB ROW
-        dbc.Row([
-            dbc.Col([
-                dbc.Tabs(
-                    id="tabs",
-                    active_tab='tab-1',
-                    children=[
-                        dbc.Tab(label='🏆 Table', tab_id='tab-1'),
-                        dbc.Tab(label='🎮 Games', tab_id='tab-2'),
-                        dbc.Tab(label='📈 Matchday Table Position', tab_id='tab-3'),
-                        dbc.Tab(label='📊 Point Distribution', tab_id='tab-4'),
-                        dbc.Tab(label='📋 Team Statistics', tab_id='tab-5'),
-                        dbc.Tab(label='⚖️ Team Comparison', tab_id='tab-6'),
-                    ],
-                    className="bg-dark text-white d-flex justify-content-center" 
-                )
-            ], width = 12)
-        ], className="mb-3 mt-3"),
+            ### TAB ROW
+            dbc.Row([
+                dbc.Col([
+                    dbc.Tabs(
+                        id="tabs",
+                        active_tab='tab-1',
+                        children=[
+                            dbc.Tab(label='🏆 Table', tab_id='tab-1'),
+                            dbc.Tab(label='🎮 Games', tab_id='tab-2'),
+                            dbc.Tab(label='📈 Matchday Table Position', tab_id='tab-3'),
+                            dbc.Tab(label='📊 Point Distribution', tab_id='tab-4'),
+                            dbc.Tab(label='📋 Team Statistics', tab_id='tab-5'),
+                            dbc.Tab(label='⚖️ Team Comparison', tab_id='tab-6'),
+                        ],
+                        className="bg-dark text-white d-flex justify-content-center" 
+                    )
+                ], width = 12)
+            ], className="mb-3 mt-3"),
        
-     ### CONTENT HEADER ROW  
-     dbc.Container(
-        dbc.Row(
-            [
-
-            # Header and Info - i  
-            dbc.Col(
-                dbc.Row(
-                    [
-                        dbc.Col(
-                            html.H2(
-                                "Your Title Here", 
-                                id="tab-title",
-                                style={"textAlign": "left", "margin": "10px", "fontSize":"28px"}), 
-                                width="auto"
-                        ),
-                        dbc.Col(
-                            dbc.Button(
-                                html.I(className="fas fa-info-circle"),
-                                id="info-button",
-                                className="btn-sm btn-info",
-                                n_clicks=0,
-                                style={
-                                    "font-size": "1.2rem",
-                                    "color": "white",
-                                    "background-color": "transparent",
-                                    "border": "none"
-                                },
+         ### CONTENT HEADER ROW  
+         dbc.Container(
+            dbc.Row(
+                [
+
+                # Header and Info - i  
+                dbc.Col(
+                    dbc.Row(
+                        [
+                            dbc.Col(
+                                html.H2(
+                                    "Your Title Here", 
+                                    id="tab-title",
+                                    style={"textAlign": "left", "margin": "10px", "fontSize":"28px"}), 
+                                    width="auto"
+                            ),
+                            dbc.Col(
+                                dbc.Button(
+                                    html.I(className="fas fa-info-circle"),
+                                    id="info-button",
+                                    className="btn-sm btn-info",
+                                    n_clicks=0,
+                                    style={
+                                        "font-size": "1.2rem",
+                                        "color": "white",
+                                        "background-color": "transparent",
+                                        "border": "none"
+                                    },
+                                ),
+                                width="auto",
+                                className="d-flex align-items-center justify-content-end"
                             ),
-                            width="auto",
-                            className="d-flex align-items-center justify-content-end"
+                        ],
+                        className="g-0 d-flex flex-wrap",  
                         ),
-                    ],
-                    className="g-0 d-flex flex-wrap",  
+                        width=12, md=4   
                     ),
-                    width=12, md=4   
-                ),
             
-            # Relevant Filter Section  
-            dbc.Col(
-                html.Div(
-                    [
-                            dcc.Dropdown(
-                                id='league-dropdown',
-                                options=[{'label': grp, 'value': grp} for grp in df_team_games['league'].unique()],
-                                value='shl',
-                                className='m-1',
-                                clearable=False
+                # Relevant Filter Section  
+                dbc.Col(
+                    html.Div(
+                        [
+                                dcc.Dropdown(
+                                    id='league-dropdown',
+                                    options=[{'label': grp, 'value': grp} for grp in df_team_games['league'].unique()],
+                                    value='shl',
+                                    className='m-1',
+                                    clearable=False
+                                ),
+                                dbc.Tooltip("Select a league",  target="league-dropdown", ),
+                                dcc.Dropdown(
+                                    id='season-dropdown',
+                                    options=[{'label': grp, 'value': grp} for grp in df_team_games['season'].unique()],
+                                    value='2024/25',
+                                    className='m-1',
+                                    clearable=False
+                                ),
+                                dbc.Tooltip("Select a season", target="season-dropdown"),       
+                                # Home/Away Button 
+                                dbc.ButtonGroup(
+                                    [
+                                        dbc.Button("Total", id="btn-total", n_clicks=0, color="primary", outline=True, value='total', style={'width': '100%', 'margin': '5px'}),
+                                        dbc.Button("Home", id="btn-home", n_clicks=0, color="primary", outline=True, value='home', style={'width': '100%', 'margin': '5px'}),
+                                        dbc.Button("Away", id="btn-away", n_clicks=0, color="primary", outline=True, value='away', style={'width': '100%', 'margin': '5px'}),
+                                    ],
+                                    id='btn-standings-homeaway',
+                                    vertical=False,
+                                    size="md",
+                                    className="m-3",
+                                    style={
+                                        'marginBottom': '10px', 
+                                        'marginTop': '10px',
+                                        'width': 'auto',  
+                                        'marginLeft': '0px',  
+                                        'marginRight': 'auto'  ,                                   
+                                        }
+                                ),
+                                 
+                                dbc.ButtonGroup(
+                                    [
+                                        dbc.Button("All", id="btn-all", n_clicks=0, color="primary", outline=True, value='all', style={'width': '100%', 'margin': '5px'}),
+                                        dbc.Button("Last 5", id="btn-last5", n_clicks=0, color="primary", outline=True, value='last5', style={'width': '100%', 'margin': '5px'}),
+                                        dbc.Button("Last 10", id="btn-last10", n_clicks=0, color="primary", outline=True, value='last10', style={'width': '100%', 'margin': '5px'}),
+                                    ],
+                                    id='btn-last-games',
+                                    vertical=False,
+                                    size="md",
+                                    className="m-3",
+                                    style={
+                                        'marginBottom': '10px', 
+                                        'marginTop': '10px',
+                                        'width': 'auto',  
+                                        'marginLeft': '0px',  
+                                        'marginRight': 'auto'  ,
+                                        'display': 'flex', 'justify-content': 'flex-start'
+                                        }  
                             ),
-                            dbc.Tooltip("Select a league",  target="league-dropdown", ),
-                            dcc.Dropdown(
-                                id='season-dropdown',
-                                options=[{'label': grp, 'value': grp} for grp in df_team_games['season'].unique()],
-                                value='2024/25',
+                        dcc.Dropdown(
+                                id='matchday-dropdown',
+                                options=[{'label': grp, 'value': grp} for grp in df_matchdays['matchday'].unique()],
+                                value=52,
+                                placeholder='Select matchday',
                                 className='m-1',
+                                searchable=True,
                                 clearable=False
-                            ),
-                            dbc.Tooltip("Select a season", target="season-dropdown"),       
-                            # Home/Away Button 
-                            dbc.ButtonGroup(
-                                [
-                                    dbc.Button("Total", id="btn-total", n_clicks=0, color="primary", outline=True, value='total', style={'width': '100%', 'margin': '5px'}),
-                                    dbc.Button("Home", id="btn-home", n_clicks=0, color="primary", outline=True, value='home', style={'width': '100%', 'margin': '5px'}),
-                                    dbc.Button("Away", id="btn-away", n_clicks=0, color="primary", outline=True, value='away', style={'width': '100%', 'margin': '5px'}),
+                                ),
+                        dbc.Tooltip("Select matchday", target="matchday-dropdown",),
+
+                        dcc.Dropdown(
+                                id='matchdaymetric-dropdown',
+                                options=[
+                                    {'label': 'Table Position', 'value': 'table_position'},
+                                    {'label': 'Average Points', 'value': 'avg_points'}
                                 ],
-                                id='btn-standings-homeaway',
-                                vertical=False,
-                                size="md",
-                                className="m-3",
-                                style={
-                                    'marginBottom': '10px', 
-                                    'marginTop': '10px',
-                                    'width': 'auto',  
-                                    'marginLeft': '0px',  
-                                    'marginRight': 'auto'  ,                                   
-                                    }
+                                value='table_position',
+                                placeholder='Select metric',
+                                className='m-1',
+                                clearable=False
+                                ),
+                        dbc.Tooltip("Select metric", target="matchdaymetric-dropdown",),
+
+                        dcc.Dropdown(
+                                id='team-dropdown',
+                                options=[{'label': grp, 'value': grp} for grp in df_teams['team'].unique()],
+                                value='Leksands IF',
+                                placeholder='Select team',
+                                className='m-1',
+                                searchable=True,
+                                clearable=False
                             ),
-                                 
-                            dbc.ButtonGroup(
-                                [
-                                    dbc.Button("All", id="btn-all", n_clicks=0, color="primary", outline=True, value='all', style={'width': '100%', 'margin': '5px'}),
-                                    dbc.Button("Last 5", id="btn-last5", n_clicks=0, color="primary", outline=True, value='last5', style={'width': '100%', 'margin': '5px'}),
-                                    dbc.Button("Last 10", id="btn-last10", n_clicks=0, color="primary", outline=True, value='last10', style={'width': '100%', 'margin': '5px'}),
+                        dbc.Tooltip("Select team", target="team-dropdown"),
+
+                                dbc.ButtonGroup(
+                                    [
+                                        dbc.Button("Points", id="btn-points", n_clicks=0, color="primary", outline=True, value='avg_points', style={'margin': '3px'}),
+                                        dbc.Button("Scored", id="btn-scored", n_clicks=0, color="primary", outline=True, value='avg_scored', style={'margin': '3px'}),
+                                        dbc.Button("Goal Against", id="btn-conceded", n_clicks=0, color="primary", outline=True, value='avg_conceded', style={'margin': '3px'}),
+                                        dbc.Button("Spectators (H)", id="btn-spectators-home", n_clicks=0, color="primary", outline=True, value='avg_spectators', style={'margin': '3px'}),
+                                        dbc.Button("Spectators (A)", id="btn-spectators-away", n_clicks=0, color="primary", outline=True, value='avg_spectators_away', style={'margin': '3px'}),
+                                        dbc.Button("Points (H)", id="btn-points-home", n_clicks=0, color="primary", outline=True, value='avg_points_home', style={'margin': '3px'}),
+                                        dbc.Button("Points (A)", id="btn-points-away", n_clicks=0, color="primary", outline=True, value='avg_points_away', style={'margin': '3px'}),
+                                    ],
+                                    id='btn-group-metricselector',
+                                    vertical=False,
+                                    size="md",
+                                    className="m-3 mr-1",
+                                    style={'display': 'flex', 'width': 'auto', 'justify-content': 'flex-start'}
+                                )
                                 ],
-                                id='btn-last-games',
-                                vertical=False,
-                                size="md",
-                                className="m-3",
-                                style={
-                                    'marginBottom': '10px', 
-                                    'marginTop': '10px',
-                                    'width': 'auto',  
-                                    'marginLeft': '0px',  
-                                    'marginRight': 'auto'  ,
-                                    'display': 'flex', 'justify-content': 'flex-start'
-                                    }  
-                        ),
-                    dcc.Dropdown(
-                            id='matchday-dropdown',
-                            options=[{'label': grp, 'value': grp} for grp in df_matchdays['matchday'].unique()],
-                            value=52,
-                            placeholder='Select matchday',
-                            className='m-1',
-                            searchable=True,
-                            clearable=False
-                            ),
-                    dbc.Tooltip("Select matchday", target="matchday-dropdown",),
-
-                    dcc.Dropdown(
-                            id='matchdaymetric-dropdown',
-                            options=[
-                                {'label': 'Table Position', 'value': 'table_position'},
-                                {'label': 'Average Points', 'value': 'avg_points'}
-                            ],
-                            value='table_position',
-                            placeholder='Select metric',
-                            className='m-1',
-                            clearable=False
-                            ),
-                    dbc.Tooltip("Select metric", target="matchdaymetric-dropdown",),
-
-                    dcc.Dropdown(
-                            id='team-dropdown',
-                            options=[{'label': grp, 'value': grp} for grp in df_teams['team'].unique()],
-                            value='Leksands IF',
-                            placeholder='Select team',
-                            className='m-1',
-                            searchable=True,
-                            clearable=False
+                        style={'display': 'flex', 'flexDirection': 'row', 'flexWrap': 'wrap', 'justifyContent': 'flex-start', 'align-items': 'flex-start'}
                         ),
-                    dbc.Tooltip("Select team", target="team-dropdown"),
+                        width=12, md=8  
+                    ),  
+                ],
+                align="left"  ,
+                style={"paddingLeft": "0", "paddingRight": "0", 'marginLeft': '0'},
+            )
+            ,style={"paddingLeft": "0", "paddingRight": "0", 'marginLeft': '0'}
+        ),
+     
+        dbc.Row([
+                dbc.Collapse(
+                    html.Div("This is some collapsible content!", className="p-2"),
+                    id="info-toggle-collapse",
+                    is_open=False
+                ),
+            ]),
 
-                            dbc.ButtonGroup(
-                                [
-                                    dbc.Button("Points", id="btn-points", n_clicks=0, color="primary", outline=True, value='avg_points', style={'margin': '3px'}),
-                                    dbc.Button("Scored", id="btn-scored", n_clicks=0, color="primary", outline=True, value='avg_scored', style={'margin': '3px'}),
-                                    dbc.Button("Goal Against", id="btn-conceded", n_clicks=0, color="primary", outline=True, value='avg_conceded', style={'margin': '3px'}),
-                                    dbc.Button("Spectators (H)", id="btn-spectators-home", n_clicks=0, color="primary", outline=True, value='avg_spectators', style={'margin': '3px'}),
-                                    dbc.Button("Spectators (A)", id="btn-spectators-away", n_clicks=0, color="primary", outline=True, value='avg_spectators_away', style={'margin': '3px'}),
-                                    dbc.Button("Points (H)", id="btn-points-home", n_clicks=0, color="primary", outline=True, value='avg_points_home', style={'margin': '3px'}),
-                                    dbc.Button("Points (A)", id="btn-points-away", n_clicks=0, color="primary", outline=True, value='avg_points_away', style={'margin': '3px'}),
-                                ],
-                                id='btn-group-metricselector',
-                                vertical=False,
-                                size="md",
-                                className="m-3 mr-1",
-                                style={'display': 'flex', 'width': 'auto', 'justify-content': 'flex-start'}
-                            )
-                            ],
-                    style={'display': 'flex', 'flexDirection': 'row', 'flexWrap': 'wrap', 'justifyContent': 'flex-start', 'align-items': 'flex-start'}
-                    ),
-                    width=12, md=8  
-                ),  
-            ],
-            align="left"  ,
-            style={"paddingLeft": "0", "paddingRight": "0", 'marginLeft': '0'},
+        ## MAIN CONTENT ROW  
+        dbc.Row([
+                dbc.Col(
+                    id='main-content',
+                    width = 12, 
+                    style={'height': '100%'},  
+                     children=[
+                        dbc.Card(
+                        dbc.CardBody(html.Div(
+                            id='tab-content',
+                            # One container per tab, only the active one is shown and rendered 
+                            children=[html.Div(id=f'{tab_id}-content', className='' if tab_id == 'tab-1' else 'd-none') for tab_id in TAB_IDS]
+                            )),
+                        className="mt-3" 
+                        )
+                     ]
+                )
+            ]), 
+
+            # Hidden storage for filtered DataFrame  
+            dcc.Store(id='table-filtered', data={}),  
+            dcc.Store(id='season-league-filtered', data={}),      
+            dcc.Store(id='league-matchday-filtered', data={}),         
+            dcc.Store(id='team-season-aggr', data={}), 
+            dcc.Store(id='metricselector-button-text', storage_type='memory'),  
+            dcc.Store(id='homeaway-button-text', storage_type='memory'),  
+            dcc.Store(id='lastgames-button-text', storage_type='memory'),
+            dcc.Store(id='selected-tab-text', storage_type='memory'),
+            dcc.Store(id='btn-group-standings_homeaway', storage_type='memory'),
+            dcc.Store(id='filter-visibility', data=visibility_by_tab()),
+        ], fluid=True
         )
-        ,style={"paddingLeft": "0", "paddingRight": "0", 'marginLeft': '0'}
-    ),
-     
-    dbc.Row([
-            dbc.Collapse(
-                html.Div("This is some collapsible content!", className="p-2"),
-                id="info-toggle-collapse",
-                is_open=False
-            ),
-        ]),
+    ])
 
-    ## MAIN CONTENT ROW  
-    dbc.Row([
-            dbc.Col(
-                id='main-content',
-                width = 12, 
-                style={'height': '100%'},  
-                 children=[
-                    dbc.Card(
-                    dbc.CardBody(html.Div(id='tab-content')),
-                    className="mt-3" 
-                    )
-                 ]
-            )
-        ]), 
-
-        # Hidden storage for filtered DataFrame  
-        dcc.Store(id='table-filtered', data={}),  
-        dcc.Store(id='season-league-filtered', data={}),      
-        dcc.Store(id='league-matchday-filtered', data={}),         
-        dcc.Store(id='team-season-aggr', data={}), 
-        dcc.Store(id='metricselector-button-text', storage_type='memory'),  
-        dcc.Store(id='homeaway-button-text', storage_type='memory'),  
-        dcc.Store(id='lastgames-button-text', storage_type='memory'),
-        dcc.Store(id='selected-tab-text', storage_type='memory'),
-        dcc.Store(id='btn-group-standings_homeaway', storage_type='memory')
-    ], fluid=True
-    )
-])
+
+app.layout = serve_layout
 
 
 
@@ -412,7 +570,8 @@ app.layout = html.Div([
 
 ## CALLBACK: Dropdown and filter visibility 
 
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace='filters', function_name='filter_visibility'),
     [
         Output('season-dropdown', 'className'),
         Output('league-dropdown', 'className'),
@@ -425,11 +584,25 @@ app.layout = html.Div([
         Output('tab-title', 'children'), 
         Output('info-toggle-collapse', 'children')
 
-     ],  
-    [Input('tabs', 'active_tab')]
+     ] + [Output(f'{tab_id}-content', 'className') for tab_id in TAB_IDS],  
+    [Input('tabs', 'active_tab')],
+    [State('filter-visibility', 'data')]
 )
 
-def update_dropdown_visibility(active_tab):
+
+def visibility_by_tab():
+    """
+    Filter, title and tab content classes per tab, sent with the layout and looked up in the browser when the tab changes.
+    """
+    visibility = {
+        tab_id: filter_visibility(tab_id) + tuple('' if tab == tab_id else 'd-none' for tab in TAB_IDS)
+        for tab_id in TAB_IDS
+    }
+    visibility['default'] = filter_visibility(None) + tuple('d-none' for _ in TAB_IDS)
+    return visibility
+
+
+def filter_visibility(active_tab):
     if active_tab == 'tab-1':
         return 'm-1 custom-dropdown' , 'm-1 custom-dropdown',  'm-1', 'm-1', 'm-1 d-none', 'm-1 d-none','m-1 d-none', 'm-1 d-none', '🏆 Standings', 'This section contains standings, based on filter selection.'
 
@@ -453,7 +626,8 @@ def update_dropdown_visibility(active_tab):
 
 ## CALLBACK: Home or Away Selector in Tab 1
 
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace='filters', function_name='highlight_button'),
         [
         Output('btn-total', 'style'),
         Output('btn-home', 'style'),
@@ -472,42 +646,9 @@ def update_dropdown_visibility(active_tab):
     ]
 )
 
-def highlight_button(_, __, ___, total_value, home_value, away_value):
-    ctx = dash.callback_context
-
-    # Define active and inactive styles
-    active_style = {'backgroundColor': 'blue', 'color': 'white'}
-    inactive_style = {}
-
-    # Set all styles to inactive initially
-    total_style = inactive_style
-    home_style = inactive_style
-    away_style = inactive_style
-    
-     # Determine which button was clicked and apply the active style. 
-    if ctx.triggered:
-        button_id = ctx.triggered[0]['prop_id'].split('.')[0]
-
-        if button_id == 'btn-total':
-            total_style = active_style
-            selected_text = total_value
-        elif button_id == 'btn-home':
-            home_style = active_style
-            selected_text = home_value
-        elif button_id == 'btn-away':
-            away_style = active_style
-            selected_text = away_value
-
-    # If not triggered, default to "points"
-    else:
-        selected_text = total_value  
-        total_style = active_style 
-
-
-    return total_style, home_style, away_style, selected_text
-
 ## CALLBACK: Last Games Selector in Tab 1
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace='filters', function_name='highlight_button'),
         [
         Output('btn-all', 'style'),
         Output('btn-last5', 'style'),
@@ -526,42 +667,9 @@ def highlight_button(_, __, ___, total_value, home_value, away_value):
     ]
 )
 
-def highlight_button(_, __, ___, all_value, last5_value, last10_value):
-    ctx = dash.callback_context
-
-    # Define active and inactive styles
-    active_style = {'backgroundColor': 'blue', 'color': 'white'}
-    inactive_style = {}
-
-    # Set all styles to inactive initially
-    all_style = inactive_style
-    last5_style = inactive_style
-    last10_style = inactive_style
-    
-     # Determine which button was clicked and apply the active style. 
-    if ctx.triggered:
-        button_id = ctx.triggered[0]['prop_id'].split('.')[0]
-
-        if button_id == 'btn-all':
-            all_style = active_style
-            selected_text = all_value
-        elif button_id == 'btn-last5':
-            last5_style = active_style
-            selected_text = last5_value
-        elif button_id == 'btn-last10':
-            last10_style = active_style
-            selected_text = last10_value
-
-    # If not triggered, default to "points"
-    else:
-        selected_text = all_value  
-        all_style = active_style 
-
-
-    return all_style, last5_style, last10_style, selected_text
-
 ## CALLBACK: Metric Selector in Tab Team Comparison
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace='filters', function_name='highlight_button'),
         [
         Output('btn-points', 'style'),
         Output('btn-scored', 'style'),
@@ -594,182 +702,237 @@ def highlight_button(_, __, ___, all_value, last5_value, last10_value):
     ]
 )
 
-def highlight_button(_, __, ___,____,_____,______,_______,  points_value, scored_value, conceded_value, spectatorshome_value, spectatorsaway_value, pointshome_value, pointsaway_value):
-    ctx = dash.callback_context
-
-    # Define active and inactive styles
-    active_style = {'backgroundColor': 'blue', 'color': 'white'}
-    inactive_style = {}
-
-    # Set all styles to inactive initially
-    points_style = inactive_style
-    scored_style = inactive_style
-    conceded_style = inactive_style
-    spectatorshome_style = inactive_style
-    spectatorsaway_style = inactive_style
-    pointshome_style = inactive_style
-    pointsaway_style = inactive_style
-    
 
-     # Determine which button was clicked and apply the active style. 
-    if ctx.triggered:
-        button_id = ctx.triggered[0]['prop_id'].split('.')[0]
-
-        if button_id == 'btn-points':
-            points_style = active_style
-            selected_text = points_value
-        elif button_id == 'btn-scored':
-            scored_style = active_style
-            selected_text = scored_value
-        elif button_id == 'btn-conceded':
-            conceded_style = active_style
-            selected_text = conceded_value
-        elif button_id == 'btn-spectators-home':
-            spectatorshome_style = active_style
-            selected_text = spectatorshome_value
-        elif button_id == 'btn-spectators-away':
-            spectatorsaway_style = active_style
-            selected_text = spectatorsaway_value
-        elif button_id == 'btn-points-home':
-            pointshome_style = active_style
-            selected_text = pointshome_value
-        elif button_id == 'btn-points-away':
-            pointsaway_style = active_style
-            selected_text = pointsaway_value
-
-    # If not triggered, default to "points"
-    else:
-        selected_text = points_value  
-        points_style = active_style 
 
+# Filtered frames used by the tabs. They are computed on demand and kept in the 
+# server-side result store, the browser only holds the small store keys 
 
-    return points_style, scored_style, conceded_style, spectatorshome_style, spectatorsaway_style, pointshome_style, pointsaway_style, selected_text
+# Number of games per team the lastgames filter keeps
+LAST_GAMES = {'last5': 5, 'last10': 10}
 
+def filter_table(dataset, league, season, homeaway, lastgames):
 
+    if query_engine == 'duckdb':
+        with callback_metrics.timed('sql'):
+            return sql_engine(dataset).standings(league, season, homeaway, LAST_GAMES.get(lastgames))
 
-# CALLBACK: To update the all datatables and filter selections
-@app.callback(
-    [
-        Output('table-filtered', 'data'),
-        Output('season-league-filtered', 'data'),
-        Output('league-matchday-filtered', 'data'), 
-        ],
-    [
-        Input('league-dropdown', 'value'),
-        Input('season-dropdown', 'value'),
-        Input('matchday-dropdown', 'value'),
-        Input('homeaway-button-text', 'data'), 
-        Input('lastgames-button-text', 'data')
-        ]
-)
+    df_season_league_filtered = games_index(dataset).league_season(league, season)
 
-def update_table(selected_league, selected_season, selected_matchday, homeaway_button_text, lastgames_button_text):
-    
     # Create the dataframe for the table 
-    df_table_filtered = df_team_games[(df_team_games['league'] == selected_league) & 
-                                 (df_team_games['season'] == selected_season) & 
-                                 (df_team_games['game_id'].notna())]
+    df_table_filtered = df_season_league_filtered[df_season_league_filtered['game_id'].notna()]
     
       
-    if homeaway_button_text !="total":
-        df_table_filtered = df_table_filtered[df_table_filtered['h_a'] == homeaway_button_text]
+    if homeaway !="total":
+        df_table_filtered = df_table_filtered[df_table_filtered['h_a'] == homeaway]
     
-    if lastgames_button_text =="last5":
+    if lastgames =="last5":
         df_table_filtered = df_table_filtered.sort_values(by='date', ascending=False).groupby('team').head(5).reset_index(drop=True)
-    if lastgames_button_text =="last10":
+    if lastgames =="last10":
         df_table_filtered = df_table_filtered.sort_values(by='date', ascending=False).groupby('team').head(10).reset_index(drop=True)
     
  
     df_table_filtered = df_table_filtered.sort_values(by=['team', 'date'])
 
-    df_table_filtered['last_5_results'] = [','.join(df_table_filtered['result_details'][max(0, i-4):i+1]) for i in range(len(df_table_filtered))]
+    # Points, results, goals and per-game averages in one grouped reduction 
+    df_table_standings = compute_standings(df_table_filtered)
 
-    df_table_filtered['last_5_icons'] = df_table_filtered['last_5_results'].apply(map_results_to_icons)
-    df_table_filtered['result_icon'] = df_table_filtered['result_details'].apply(map_results_to_icons)
-    
-    # Make the aggregation 
-    df_table_filtered = (
-    df_table_filtered.groupby('team')
-    .agg(
-        points=('points', 'sum'),
-        win=('win', 'sum'),
-        lost=('lost', 'sum'),
-        draw=('draw', 'sum'),
-        ot_win=('ot_win', 'sum'),
-        ot_loss=('ot_lost', 'sum'),
-        scored=('score_team', 'sum'),
-        conceded=('score_opponent', 'sum'),
-        games=('points', 'size')  ,
-
-        avg_points=('points', lambda x: round(x.dropna().mean(), 2) if not x.dropna().empty else 0),
-        avg_points_pregame_ahead=('points_ahead_pregame', lambda x: round(x.dropna().mean(), 2) if not x.dropna().empty else 0),
-        avg_points_pregame_behind=('points_behind_pregame', lambda x: round(x.dropna().mean(), 2) if not x.dropna().empty else 0),
-
-        avg_scored=('score_team', lambda x: round(x.dropna().mean(), 2) if not x.dropna().empty else 0),
-        avg_conceded=('score_opponent', lambda x: round(x.dropna().mean(), 2) if not x.dropna().empty else 0),
-        avg_goals_game=('goals_game', lambda x: round(x.dropna().mean(), 2) if not x.dropna().empty else 0),
-
-        last_5_icons=('last_5_icons', 'last')  
-    )
-    .reset_index()
-    )
+    # Icons are only built for the last 5 games of each team, i.e. the rows that are shown 
+    df_table_standings['last_5_icons'] = last_form_icons(df_table_filtered, 5)
+    df_table_filtered = df_table_standings.reset_index()
 
-    df_table_filtered['goal_difference'] = df_table_filtered['scored'] - df_table_filtered['conceded'] 
-    df_table_filtered['goal_difference_txt'] = (df_table_filtered['scored'].astype(int).astype(str)  
-                                                + '-'  
-                                                + df_table_filtered['conceded'].astype(int).astype(str)
-                                                + ' ('  
-                                                + df_table_filtered['goal_difference'].astype(int).astype(str)
-                                                + ')'
-                                                )
-    
-    
-    df_season_league_filtered = df_team_games[(df_team_games['league'] == selected_league) & 
-                                 (df_team_games['season'] == selected_season)]
+    return df_table_filtered
+
+
+def filter_season_league(dataset, league, season):
+    return decategorize(games_index(dataset).league_season(league, season))
+
+
+def filter_league_matchday(dataset, league, matchday):
+    df_league_matchday_filtered = games_index(dataset).league_matchday(league, matchday)
+    return decategorize(df_league_matchday_filtered[df_league_matchday_filtered['result'].notna()])
+
+
+RESULT_BUILDERS = {
+    'table': filter_table,
+    'season-league': filter_season_league,
+    'league-matchday': filter_league_matchday,
+}
+
+result_store = ResultStore()
+render_cache = ResultStore(max_entries=RENDER_CACHE_SIZE)
+
+
+def load_result(key, dataset):
+    if not key:
+        raise PreventUpdate
+    # Keys from an older data version are resolved against the current dataset 
+    key = store_key(key['name'], dataset.version, **key['params'])
+    with callback_metrics.timed('pandas'):
+        return result_store.get_or_compute(key, lambda: RESULT_BUILDERS[key['name']](dataset, **key['params']))
+
+
+def key_params(key):
+    if not key:
+        raise PreventUpdate
+    return key['params']
 
-    df_league_matchday_filtered = df_team_games[(df_team_games['league'] == selected_league) & 
-                                                (df_team_games['matchday'] == selected_matchday) & 
-                                                (df_team_games['result'].notna())]
-        
-    return df_table_filtered.to_dict('records'), df_season_league_filtered.to_dict('records'), df_league_matchday_filtered.to_dict('records')
 
+# Rendered tab content is cached on the tab, the inputs it depends on and the data version.
+# Its figures are cached compacted (see figure_payload.py) 
+def render_cached(dataset, tab, params, render_fn):
+    with callback_metrics.timed('figure'):
+        return render_cache.get_or_compute(store_key(tab, dataset.version, **params), lambda: compact_figures(render_fn()))
 
-# CALLBACK to send data into the different tabs 
+
+# Filters of the tab data. The most requested combinations of their values are snapshotted (see view_snapshots.py) 
+FILTER_INPUTS = [
+    Input('league-dropdown', 'value'),
+    Input('season-dropdown', 'value'),
+    Input('matchday-dropdown', 'value'),
+    Input('homeaway-button-text', 'data'), 
+    Input('lastgames-button-text', 'data')
+]
+
+# CALLBACK: To update the all datatables and filter selections
 @app.callback(
-    Output('tab-content', 'children'),
     [
-        Input('tabs', 'active_tab'),
-        Input('table-filtered', 'data'),
-        Input('season-league-filtered', 'data'),
-        Input('league-matchday-filtered', 'data'), 
-        Input('metricselector-button-text', 'data'),
-        Input('team-dropdown', 'value'),
-        Input('league-dropdown', 'value'),
-        Input('matchdaymetric-dropdown','value')
-        ]
+        Output('table-filtered', 'data'),
+        Output('season-league-filtered', 'data'),
+        Output('league-matchday-filtered', 'data'), 
+        ],
+    FILTER_INPUTS
 )
-
-def render_content(selected_tab, table_filtered, season_league_filtered, league_matchday_filtered,  metricselector_text, selected_team, selected_league, selected_matchdaymetric):
+@callback_metrics.instrument
+def update_table(selected_league, selected_season, selected_matchday, homeaway_button_text, lastgames_button_text):
     
-    df_table_filtered = pd.DataFrame(table_filtered)
+    version = current_dataset().version
+
+    table_key = store_key('table', version, league=selected_league, season=selected_season, 
+                          homeaway=homeaway_button_text, lastgames=lastgames_button_text)
+    season_league_key = store_key('season-league', version, league=selected_league, season=selected_season)
+    league_matchday_key = store_key('league-matchday', version, league=selected_league, matchday=selected_matchday)
+
+    return table_key, season_league_key, league_matchday_key
+
+
+# Tab renderers. Each tab declares the inputs it consumes in TAB_INPUTS, only the active
+# tab renders 
+
+def render_tab_table(dataset, table_filtered):
+    return render_cached(dataset, 'tab-1', key_params(table_filtered),
+                         lambda: tab_content_table(load_result(table_filtered, dataset)))
 
-    df_season_league_filtered = pd.DataFrame(season_league_filtered)
 
-    df_league_matchday_filtered =  pd.DataFrame(league_matchday_filtered)
+def render_tab_games(dataset, season_league_filtered):
+    return render_cached(dataset, 'tab-2', key_params(season_league_filtered),
+                         lambda: tab_content_games(load_result(season_league_filtered, dataset)))
 
-    # Content rendering logic for each tab
-    if selected_tab == 'tab-1':
-        return tab_content_table(df_table_filtered)  
-    elif selected_tab == 'tab-2':
-        return tab_content_games(df_season_league_filtered)
-    elif selected_tab == 'tab-3':
-        return tab_content_points(df_season_league_filtered, selected_matchdaymetric)
-    elif selected_tab == 'tab-4':
-        return tab_content_pointdistr(df_league_matchday_filtered)
-    elif selected_tab == 'tab-5':
-        return tab_content_teamstat(selected_team)
-    elif selected_tab == 'tab-6':
-        return tab_content_teamcomparison(metricselector_text, selected_league)
+
+def render_tab_points(dataset, season_league_filtered, selected_matchdaymetric):
+    return render_cached(dataset, 'tab-3', dict(key_params(season_league_filtered), metric=selected_matchdaymetric),
+                         lambda: tab_content_points(season_matrix(dataset, season_league_filtered), selected_matchdaymetric))
+
+
+def season_matrix(dataset, season_league_filtered):
+    params = key_params(season_league_filtered)
+    with callback_metrics.timed('pandas'):
+        return position_matrix(dataset, params['league'], params['season'])
+
+
+def league_matchday_stats(dataset, league_matchday_filtered):
+    params = key_params(league_matchday_filtered)
+    if query_engine == 'duckdb':
+        with callback_metrics.timed('sql'):
+            return sql_engine(dataset).point_distribution_stats(params['league'], params['matchday'])
+    with callback_metrics.timed('pandas'):
+        return point_distribution(dataset).stats(params['league'], params['matchday'])
+
+
+def render_tab_pointdistr(dataset, league_matchday_filtered):
+    return render_cached(dataset, 'tab-4', key_params(league_matchday_filtered),
+                         lambda: tab_content_pointdistr(load_result(league_matchday_filtered, dataset), league_matchday_stats(dataset, league_matchday_filtered)))
+
+
+def render_tab_teamstat(dataset, selected_team):
+    return render_cached(dataset, 'tab-5', {'team': selected_team},
+                         lambda: tab_content_teamstat(team_profile(dataset, selected_team)))
+
+
+def team_profile(dataset, selected_team):
+    with callback_metrics.timed('pandas'):
+        profile = team_profiles(dataset).get(selected_team)
+    # Unknown teams, and teams without a current standing, have nothing to show 
+    if profile is None or profile.current is None:
+        raise PreventUpdate
+    return profile
+
+
+def render_tab_teamcomparison(dataset, metricselector_text, selected_league):
+    return render_cached(dataset, 'tab-6', {'metric': metricselector_text, 'league': selected_league},
+                         lambda: tab_content_teamcomparison(dataset, metricselector_text, selected_league))
+
+
+TAB_RENDERERS = {
+    'tab-1': render_tab_table,
+    'tab-2': render_tab_games,
+    'tab-3': render_tab_points,
+    'tab-4': render_tab_pointdistr,
+    'tab-5': render_tab_teamstat,
+    'tab-6': render_tab_teamcomparison,
+}
+
+TAB_INPUTS = {
+    'tab-1': [Input('table-filtered', 'data')],
+    'tab-2': [Input('season-league-filtered', 'data')],
+    'tab-3': [Input('season-league-filtered', 'data'), Input('matchdaymetric-dropdown', 'value')],
+    'tab-4': [Input('league-matchday-filtered', 'data')],
+    'tab-5': [Input('team-dropdown', 'value')],
+    'tab-6': [Input('metricselector-button-text', 'data'), Input('league-dropdown', 'value')],
+}
+
+
+def render_tab(tab_id, *values):
+    return TAB_RENDERERS[tab_id](current_dataset(), *values)
+
+
+# Inputs of all tabs, each once 
+TAB_CONTENT_INPUTS = list({str(dependency): dependency for tab_id in TAB_IDS for dependency in TAB_INPUTS[tab_id]}.values())
+
+
+def tab_triggers(tab_id):
+    """
+    'id.property' of the inputs whose change renders a tab while it is active: the active tab and the tab's own inputs.
+    """
+    return ['tabs.active_tab'] + [str(dependency) for dependency in TAB_INPUTS[tab_id]]
+
+
+def tab_content_triggers(body):
+    # Triggers of a tab content request for the view snapshots, None for other callbacks 
+    if body['output'] != TAB_CONTENT_OUTPUT:
+        return None
+    active_tab = next((entry.get('value') for entry in body['inputs'] if entry['id'] == 'tabs'), None)
+    return tab_triggers(active_tab) if active_tab in TAB_INPUTS else None
+
+
+# CALLBACK to send data into the active tab. One callback serves all tabs, so a page load or
+# tab switch sends one request. The containers of the other tabs keep their content and are
+# rendered again when they are shown 
+@app.callback(
+    [Output(f'{tab_id}-content', 'children') for tab_id in TAB_IDS],
+    [Input('tabs', 'active_tab')] + TAB_CONTENT_INPUTS
+)
+@callback_metrics.instrument
+def render_content(active_tab, *values):
+    if active_tab not in TAB_RENDERERS:
+        raise PreventUpdate
+    # Changes of the inputs of other tabs leave the active tab as it is. On page load nothing is triggered 
+    triggered = dash.callback_context.triggered_prop_ids
+    if triggered and not set(triggered) & set(tab_triggers(active_tab)):
+        raise PreventUpdate
+    callback_metrics.tag(tab=active_tab)
+    values = dict(zip(map(str, TAB_CONTENT_INPUTS), values))
+    content = render_tab(active_tab, *(values[str(dependency)] for dependency in TAB_INPUTS[active_tab]))
+    return [content if tab_id == active_tab else dash.no_update for tab_id in TAB_IDS]
 
 
 ## CALLBACK for Information Toggle 
@@ -939,9 +1102,7 @@ def tab_content_games(df_season_league_filtered):
                                             )
     
 
-    games_tbl = dash_table.DataTable(
-                   id='data-games-table',
-                    columns=[
+    games_columns = [
                         {"name": "League", "id": "league"},
                         {"name": "Date", "id": "date_adjusted"},
 
@@ -953,7 +1114,13 @@ def tab_content_games(df_season_league_filtered):
                         {"name": "", "id": "score_opponent"},
                         {"name": "Away", "id": "opponent"},
                  
-                    ],
+                    ]
+    # Rows carry the shown columns and the result the score colors are based on 
+    df_games_rows = df_games_filtered[[column['id'] for column in games_columns] + ['result_details']]
+
+    games_tbl = dash_table.DataTable(
+                   id='data-games-table',
+                    columns=games_columns,
                   #  tooltip={
                   #              "games": {'value': 'Games Played', 'use_with': 'both'},
                   #          },
@@ -963,7 +1130,7 @@ def tab_content_games(df_season_league_filtered):
                             'rule': 'background-color: grey; font-family: monospace; color: white'
                         }],
                         
-                    data=df_games_filtered.to_dict('records'),
+                    data=df_games_rows.to_dict('records'),
                     page_action="none",  
                     markdown_options={"html": True}, 
                     style_cell={
@@ -1049,27 +1216,13 @@ def tab_content_games(df_season_league_filtered):
 ################################################################################################
 
 
-def tab_content_points(df_season_league_filtered, selected_matchdaymetric):
-
-    # Get min matchday where we have non played games 
-    matchday_not_finished = df_season_league_filtered[df_season_league_filtered['game_id'].isnull()]["matchday"].min()
-
-    # Set to 100 if there was no non played 
-    if pd.isnull(matchday_not_finished):
-        matchday_not_finished = 100
-
+def tab_content_points(matrix, selected_matchdaymetric):
 
-    df_season_league_filtered = df_season_league_filtered[df_season_league_filtered['game_id'].notnull()].sort_values(by=['team', 'matchday'])
-
-    df_season_league_filtered_finished = df_season_league_filtered[df_season_league_filtered['matchday'] < matchday_not_finished].sort_values(by=['team', 'matchday'])
-
-    df_season_league_filtered_finished['avg_points'] = df_season_league_filtered_finished['points_cum'] / df_season_league_filtered_finished['matchday'] 
-
-    #selected_metric = 'avg_points'
-
-    max_position = df_season_league_filtered_finished[selected_matchdaymetric].max()
+    # Lines and end-of-line labels come straight from the team x matchday matrix, 
+    # with the same traces px.line(..., color='team', markers=True) would build 
+    max_position = matrix.max_value(selected_matchdaymetric)
     middle_position = (max_position+1)//2
-    matchday_max = df_season_league_filtered_finished["matchday"].max()  # Get the maximum matchday
+    matchday_max = matrix.max_matchday()  # Get the maximum matchday
 
     if selected_matchdaymetric == 'avg_points':
         yaxis_range = [0, 3]
@@ -1080,27 +1233,47 @@ def tab_content_points(df_season_league_filtered, selected_matchdaymetric):
         headline_txt = 'Table Position'
         tick_format = 'd'
 
+    colors = pio.templates[pio.templates.default].layout.colorway
+    fig_tblpos = go.Figure([
+        go.Scatter(
+            x=matchdays,
+            y=values,
+            name=team,
+            legendgroup=team,
+            mode='markers+lines',
+            line=dict(color=colors[i % len(colors)], dash='solid'),
+            marker=dict(symbol='circle'),
+            hovertemplate=f'team={team}<br>matchday=%{{x}}<br>{selected_matchdaymetric}=%{{y}}<extra></extra>',
+            orientation='v',
+            showlegend=True,
+            xaxis='x',
+            yaxis='y',
+        )
+        for i, (team, matchdays, values) in enumerate(matrix.series(selected_matchdaymetric))
+    ])
 
-    fig_tblpos = px.line(df_season_league_filtered_finished,
-                         title = None ,
-                         x='matchday', 
-                         y=selected_matchdaymetric, 
-                         color='team',
-                         markers = True)
-
-    # Add annotations for each team's last point if we have the table position metric
+    # Annotations for each team's last point if we have the table position metric, set in one update
+    annotations = []
     if selected_matchdaymetric == 'table_position':
-        for team in df_season_league_filtered_finished["team"].unique():
-            team_data = df_season_league_filtered_finished[df_season_league_filtered_finished["team"] == team]
-            last_row = team_data.iloc[-1]
-            fig_tblpos.add_annotation(
+        annotations = [
+            dict(
                 x=matchday_max*1.05, 
-                y=last_row[selected_matchdaymetric],
+                y=last_value,
                 text=team,
                 showarrow=False,
                 font=dict(size=12),
                 align="right"
             )
+            for team, last_value in zip(matrix.teams, matrix.last_values(selected_matchdaymetric))
+        ]
+
+    fig_tblpos.update_layout(
+        legend=dict(title=dict(text='team'), tracegroupgap=0),
+        margin=dict(t=60),
+        xaxis=dict(anchor='y', domain=[0.0, 1.0], title=dict(text='matchday')),
+        yaxis=dict(anchor='x', domain=[0.0, 1.0], title=dict(text=selected_matchdaymetric)),
+        annotations=annotations,
+    )
 
 
     fig_tblpos = apply_darkly_style(fig_tblpos)
@@ -1161,7 +1334,7 @@ def tab_content_points(df_season_league_filtered, selected_matchdaymetric):
 
 ##############################################################################################
 
-def tab_content_pointdistr(df_league_matchday_filtered):
+def tab_content_pointdistr(df_league_matchday_filtered, df_stats):
 
     # Remove rows with SHL and season 2014/15, as we here had different numbers of team and thus metrics not comparible 
     df_league_matchday_filtered = df_league_matchday_filtered[~((df_league_matchday_filtered['league'] == 'shl') & (df_league_matchday_filtered['season'] == '2014/15'))]
@@ -1170,29 +1343,12 @@ def tab_content_pointdistr(df_league_matchday_filtered):
     league = df_league_matchday_filtered['league'].max()
     matchday = df_league_matchday_filtered['matchday'].max()
 
-    # Custom aggregation functions
-    def top_6_limit(series):
-        return series.nlargest(6).min() if len(series) >= 6 else np.nan
-    def top_12_limit(series):
-        return series.nlargest(12).min() if len(series) >= 12 else np.nan
-
-    df_stats = (
-        df_league_matchday_filtered.groupby('season')['points_cum']
-        .agg(
-            min='min',
-            max='max',
-            max_min_diff=lambda x: x.max() - x.min(),
-            median='median',
-            std='std',
-            top_6_limit=top_6_limit,
-            top_12_limit = top_12_limit
-        )
-        .reset_index()
-    )
+    # Statistics per season come precomputed from the point distribution cube 
+    limit_columns = [f'top_{k}_limit' for k in TOP_K_LIMITS]
 
     outlier_styles = []
 
-    for column in ['min', 'max', 'max_min_diff', 'median', 'std', 'top_6_limit', 'top_12_limit']:
+    for column in ['min', 'max', 'max_min_diff', 'median', 'std'] + limit_columns:
         min_val = df_stats[column].min()
         max_val = df_stats[column].max()
 
@@ -1227,8 +1383,8 @@ def tab_content_pointdistr(df_league_matchday_filtered):
             {"name": "Diff Minmax", "id": "max_min_diff", "type": "numeric", "format": {"specifier": "d"}},
             {"name": "Median", "id": "median", "type": "numeric", "format": {"specifier": "d"}},
             {"name": "Std  Dev", "id": "std", "type": "numeric", "format": {"specifier": "d"}},
-            {"name": "Top 6 Limit", "id": "top_6_limit", "type": "numeric", "format": {"specifier": "d"}},
-            {"name": "Top 12 Limit", "id": "top_12_limit", "type": "numeric", "format": {"specifier": "d"}},
+        ] + [
+            {"name": f"Top {k} Limit", "id": f"top_{k}_limit", "type": "numeric", "format": {"specifier": "d"}} for k in TOP_K_LIMITS
         ],
         tooltip={
             "season": {'value': 'The season (e.g., 2021/2022)', 'use_with': 'both'},
@@ -1237,8 +1393,7 @@ def tab_content_pointdistr(df_league_matchday_filtered):
             "max_min_diff": {'value': f'Point difference between first and last team at matchday {matchday}', 'use_with': 'both'},
             "median": {'value': f'Median number of points at matchday {matchday}', 'use_with': 'both'},
             "std": {'value': f'Standard deviation of points - indicates how much team points are distributed at matchday {matchday}', 'use_with': 'both'},
-            "top_6_limit": {'value': f'Point of position 6 (e.g. to reach playoff) at matchday {matchday}', 'use_with': 'both'},
-            "top_12_limit": {'value': f'Point of position 12 (e.g. to avoid relegation) at matchday {matchday}', 'use_with': 'both'},
+            **{f"top_{k}_limit": {'value': f'Point of position {k} ({usage}) at matchday {matchday}', 'use_with': 'both'} for k, usage in TOP_K_LIMITS.items()},
         },
 
         css=[{
@@ -1262,7 +1417,7 @@ def tab_content_pointdistr(df_league_matchday_filtered):
             'fontSize': '14px'
         },
         style_data_conditional=[
-            {'if': {'column_id': c}, 'minWidth': '50px'} for c in ['min', 'max', 'max_min_diff', 'median', 'std', 'top_6_limit', 'top_12_limit']   
+            {'if': {'column_id': c}, 'minWidth': '50px'} for c in ['min', 'max', 'max_min_diff', 'median', 'std'] + limit_columns   
         ] + [
              {'if': {'column_id': 'season'}, 'minWidth': '100px'}
         ] + 
@@ -1354,35 +1509,26 @@ def tab_content_pointdistr(df_league_matchday_filtered):
 
 ################################################################################################
 
-def tab_content_teamstat(selected_team):
-
-    df_team_headtohead_filtered = df_team_headtohead[(df_team_headtohead['team'] == selected_team) & (df_team_headtohead['games'] >= 15)]
-    df_team_headtohead_filtered = df_team_headtohead_filtered.sort_values(by = 'avg_points', ascending = False)
+def tab_content_teamstat(profile):
 
-    df_team_filtered = df_team_games[(df_team_games['team'] == selected_team) & (df_team_games['league'] != 'preseason')]
-
-    df_team_season_metrics_team = df_team_season_metrics[(df_team_season_metrics['team'] == selected_team) & (df_team_season_metrics['league'] != 'preseason')]
-    df_team_season_metrics_team = df_team_season_metrics_team.sort_values(by='season')
+    # Everything shown for the team is precomputed in its profile (team_profiles.py) 
+    selected_team = profile.team
+    df_team_season_metrics_team = profile.seasons
+    df_team_headtohead_filtered = profile.headtohead
+    df_team_filtered = profile.matches
 
     # Variables for current standings 
-    df_team_currentmetrics_filtered = df_team_currentmetrics[df_team_currentmetrics['team'] == selected_team]
-
-    current_position = df_team_currentmetrics_filtered['table_position'].astype(int).astype(str).values[0]
-    current_points = df_team_currentmetrics_filtered['points'].astype(int).astype(str).values[0]
-    current_league = df_team_currentmetrics_filtered['league'].values[0].upper()
-
-
-    last_game = df_team_currentmetrics_filtered['game_previous'].values[0]
-    last_game_date = df_team_currentmetrics_filtered['date_previous'].values[0]
-    last_game_result = df_team_currentmetrics_filtered['result_previous'].values[0]
-    last_game_score = df_team_currentmetrics_filtered['score_previous'].values[0]
-    next_game = df_team_currentmetrics_filtered['game_next'].values[0]
-    next_game_date = df_team_currentmetrics_filtered['date_next'].values[0]
+    current_position = str(int(profile.current['table_position']))
+    current_points = str(int(profile.current['points']))
+    current_league = profile.current['league'].upper()
 
 
-    df_team_season_metrics_filtered = df_team_season_metrics[(df_team_season_metrics['team'] == selected_team) & (df_team_season_metrics['league'] != 'preseason') & (df_team_season_metrics['is_current_season'] == True) ]
-
-    df_team_season_metrics_filtered[['avg_points', 'avg_points_home', 'avg_points_away', 'avg_scored', 'avg_conceded']] = df_team_season_metrics_filtered[['avg_points', 'avg_points_home', 'avg_points_away', 'avg_scored', 'avg_conceded']].round(2)
+    last_game = profile.current['game_previous']
+    last_game_date = profile.current['date_previous']
+    last_game_result = profile.current['result_previous']
+    last_game_score = profile.current['score_previous']
+    next_game = profile.current['game_next']
+    next_game_date = profile.current['date_next']
 
 
     tbl_teamposition_style = get_table_position_color()
@@ -1422,7 +1568,7 @@ def tab_content_teamstat(selected_team):
                             'rule': 'background-color: grey; font-family: monospace; color: white'
                         }],
                         
-                    data=df_team_season_metrics_filtered.to_dict('records'),
+                    data=profile.standings,
                     style_table={'width': '100%', 'minWidth': '100%', 'maxWidth': '100%','overflowX': 'auto'},
                     markdown_options={"html": True}, 
                     style_cell={
@@ -1568,22 +1714,6 @@ def tab_content_teamstat(selected_team):
 
     # MATCHDAY TABLE  
 
-    # Mapping results to colors
-    color_map = {'win': 'green', 'lost': 'red', 'draw': 'darkblue'}
-    symbol_map = {'win': 'circle', 'lost': 'x', 'draw': 'diamond'}
-    df_team_filtered['color'] = df_team_filtered['result'].map(color_map).fillna('gray')
-    df_team_filtered['symbol'] = df_team_filtered['result'].map(symbol_map).fillna('circle-open')
-    df_team_filtered['hover_text'] = (
-        df_team_filtered['game'] + '<br>' +
-        'Score: ' + df_team_filtered['score'] + '<br>' +
-        'Date: ' + df_team_filtered['date'].astype(str) + '<br>' +
-        'Result: ' + df_team_filtered['result'].fillna('No Result')
-    )
-
-    df_team_filtered['season_league'] = df_team_filtered['league'] + '\t' + df_team_filtered['season']
-
-    df_team_filtered = df_team_filtered.sort_values(by='season')
-
     fig_teamstat_matches = go.Figure()
 
     # Add scatter trace
@@ -1618,18 +1748,12 @@ def tab_content_teamstat(selected_team):
     )
 
 
-    df_team_season_metrics_team_selected = df_team_season_metrics_team[['season','avg_scored', 'avg_conceded', 'avg_points']]
-
-    df_team_season_metrics_team_pivot = df_team_season_metrics_team_selected.set_index('season').transpose().reset_index()
-
-    df_team_season_metrics_team_pivot.columns = ['Metric'] + list(df_team_season_metrics_team_selected['season'])  # Rename columns
-
     ################### HeadtoHead FIGURE
 
     fig_h2h_top = go.Figure()
 
     fig_h2h_top = px.bar(
-        df_team_headtohead_filtered.head(14),
+        df_team_headtohead_filtered,
         x='avg_points',
         y='opponent',
         orientation='h',  
@@ -1760,96 +1884,55 @@ def tab_content_teamstat(selected_team):
 ################################################################################################
 
 
-def tab_content_teamcomparison(metricselector_text, selected_league):
+def tab_content_teamcomparison(dataset, metricselector_text, selected_league):
 
-    df_team_season_aggr = df_team_season_metrics[df_team_season_metrics['league'] == selected_league]
-    
-    df_team_season_aggr = df_team_season_aggr[['team', 'season', metricselector_text]]
-
-    df_team_season_aggr = df_team_season_aggr.sort_values(by = 'season')
-
-    df_team_season_aggr_pivot = df_team_season_aggr.pivot(index='team', columns='season', values=metricselector_text).reset_index()
-    df_team_season_aggr_pivot.columns.name = None 
-
-    # Fix format, depending on what metric is selected. If spectators, we remove decimal but make it a thousand separated 
-    # Format function based on conditions
-    def format_value(value, metricselector_text):
-        if isinstance(value, (int, float)) and not np.isnan(value):  
-            if "spectators" in metricselector_text:
-                return f"{int(value):,}"  
-            else:
-                return f"{value:.1f}"  # One decimal
-        return ""  # For non-numeric values (like 'team')
-
-
-    # Apply formatting to the dataframe before passing it to the DataTable
-    df_team_season_aggr_pivot_formatted = df_team_season_aggr_pivot.copy()
-    for col in df_team_season_aggr_pivot_formatted.columns[1:]:  # Skip the 'team' column
-        df_team_season_aggr_pivot_formatted[col] = df_team_season_aggr_pivot_formatted[col].apply(lambda x: format_value(x, metricselector_text))
-
-   
-    def discrete_background_color_bins(df, n_bins=5, columns='all'):
-        import colorlover
-        bounds = [i * (1.0 / n_bins) for i in range(n_bins + 1)]
-        if columns == 'all':
-            if 'id' in df:
-                df_numeric_columns = df.select_dtypes('number').drop(['id'], axis=1)
-            else:
-                df_numeric_columns = df.select_dtypes('number')
-        else:
-            df_numeric_columns = df[columns]
-
-        df_numeric_columns = df_numeric_columns.apply(pd.to_numeric, errors='coerce')  
-        df_max = df_numeric_columns.max().max()
-
-        if "spectators" in metricselector_text:
-            df_min = 4000
-        else:
-            df_min = df_numeric_columns.min().min()
-
-        ranges = [
-            ((df_max - df_min) * i) + df_min
-            for i in bounds
-        ]
+    if query_engine == 'duckdb':
+        with callback_metrics.timed('sql'):
+            df_team_season_aggr_pivot = sql_engine(dataset).team_season_pivot(selected_league, metricselector_text)
+    else:
+        with callback_metrics.timed('pandas'):
+            df_team_season_metrics = dataset['team_season_metrics']
 
-        styles = []
-        for i in range(1, len(bounds)):
-            min_bound = ranges[i - 1]
-            max_bound = ranges[i]
-            backgroundColor = colorlover.scales[str(n_bins)]['seq']['YlGn'][i - 1]
-            if i <=2:
-                color = 'black'
-            else:
-                color = 'white' if i > len(bounds) / 2. else 'inherit'
-
-            for column in df_numeric_columns:
-                styles.append({
-                    'if': {
-                        'filter_query': (
-                            '{{{column}}} >= {min_bound}' +
-                            (' && {{{column}}} < {max_bound}' if (i < len(bounds) - 1) else '')
-                        ).format(column=column, min_bound=min_bound, max_bound=max_bound),
-                        'column_id': column
-                    },
-                    'backgroundColor': backgroundColor,
-                    'color': color
-                })
+            df_team_season_aggr = df_team_season_metrics[df_team_season_metrics['league'] == selected_league]
+
+            df_team_season_aggr = df_team_season_aggr[['team', 'season', metricselector_text]]
 
-        return (styles)
+            df_team_season_aggr = df_team_season_aggr.sort_values(by = 'season')
 
-    (styles) = discrete_background_color_bins(df_team_season_aggr_pivot)
+            df_team_season_aggr_pivot = df_team_season_aggr.pivot(index='team', columns='season', values=metricselector_text).reset_index()
+            df_team_season_aggr_pivot.columns.name = None 
+
+    seasons = list(df_team_season_aggr_pivot.columns[1:])
+    values = df_team_season_aggr_pivot[seasons].to_numpy(dtype='float64', na_value=np.nan)
+    has_value = ~np.isnan(values)
+
+    # Fix format, depending on what metric is selected. If spectators, we remove decimal but make it a thousand separated.
+    # All cells are formatted at once, missing values are shown empty
+    formatted = np.full(values.shape, '', dtype=object)
+    if "spectators" in metricselector_text:
+        formatted[has_value] = [f"{value:,}" for value in values[has_value].astype(np.int64).tolist()]
+        bins = get_heatmap_bins(values, min_value=4000)
+    else:
+        formatted[has_value] = np.char.mod('%.1f', values[has_value]).tolist()  # One decimal
+        bins = get_heatmap_bins(values)
+
+    # Formatted values as HTML carrying the heatmap bin of every cell, colored by the table css
+    df_team_season_aggr_pivot_formatted = pd.concat([
+        df_team_season_aggr_pivot[['team']],
+        pd.DataFrame(get_heatmap_cells(values, formatted, bins), columns=seasons, index=df_team_season_aggr_pivot.index),
+    ], axis=1)
 
     
     # Define the DataTable with your data
     seasonstats_table = dash_table.DataTable(
         id='team-season-stats',
-        columns=[{"name": col, "id": col} for col in df_team_season_aggr_pivot_formatted.columns],
+        columns=[{"name": "team", "id": "team"}] + [{"name": col, "id": col, "presentation": "markdown"} for col in seasons],
         data=df_team_season_aggr_pivot_formatted.to_dict('records'),
 
         css=[{
                 'selector': '.dash-table-tooltip',
                 'rule': 'background-color: grey; font-family: monospace; color: white'
-            }],
+            }] + get_heatmap_css(),
         style_table={'width': '100%', 'minWidth': '100%', 'maxWidth': '100%','overflowX': 'auto'},
         style_header={
             'backgroundColor': 'rgb(30, 30, 30)',
@@ -1874,11 +1957,10 @@ def tab_content_teamcomparison(metricselector_text, selected_league):
         sort_mode='single',    
         style_as_list_view=True,
         markdown_options={"html": True},
-        style_data_conditional=styles + 
-        [
+        style_data_conditional=[
             {'if': {'column_id': 'team'}, 'minWidth': '120px'},
         ] + [
-            {'if': {'column_id': col}, 'minWidth': '90px'} for col in df_team_season_aggr_pivot_formatted if col != 'team'
+            {'if': {'column_id': col}, 'minWidth': '90px'} for col in seasons
         ],
         row_selectable=False,
         cell_selectable=False
@@ -1903,5 +1985,39 @@ def tab_content_teamcomparison(metricselector_text, selected_league):
 )
 
 
+
+#######################################################################################################
+
+##                                      VIEW SNAPSHOTS 
+
+#######################################################################################################
+
+
+# Values the clientside highlight_button callbacks store on page load, the value of the first button of each group 
+BUTTON_GROUP_DEFAULTS = {
+    'homeaway-button-text.data': 'btn-total.value',
+    'lastgames-button-text.data': 'btn-all.value',
+    'metricselector-button-text.data': 'btn-points.value',
+}
+
+
+def default_view():
+    """
+    Component values the browser has on page load, before the first server callback.
+    """
+    values = layout_values(serve_layout())
+    for store, button in BUTTON_GROUP_DEFAULTS.items():
+        values[store] = values[button]
+    return values
+
+
+# Built once the callbacks are registered, so from here on every published dataset is snapshotted.
+# With preloading, the snapshots of the first dataset are inherited by the workers 
+view_snapshots = ViewSnapshots(app, default_view, [str(dependency) for dependency in FILTER_INPUTS], 'tabs.active_tab',
+                               triggers=tab_content_triggers)
+data_refresher.on_publish(lambda dataset: view_snapshots.build(dataset.version))
+view_snapshots.build(current_dataset().version)
+
+
 if __name__ == '__main__':
     app.run_server(debug=True)
\ No newline at end of file
@@ -0,0 +1,150 @@
+# arrow_store.py
+
+# The prepared dashboard tables (validated, compact dtypes, derived columns) are written
+# once per data version to uncompressed Arrow IPC files and memory-mapped read-only by
+# every process. The mapped pages live in the page cache and are shared between gunicorn
+# workers, instead of each worker holding its own pandas copy of the tables.
+
+import json
+import os
+
+import pyarrow as pa
+
+from data_snapshot import SNAPSHOT_DIR, snapshot_lock
+
+
+ARROW_MANIFEST_FILE = 'dataset.json'
+ARROW_LOCK_FILE = 'dataset.lock'
+
+
+def arrow_lock(directory=SNAPSHOT_DIR):
+    """
+    Exclusive lock held while a process prepares a version, so the other workers
+    wait and then map its files instead of preparing (and holding) their own copy.
+    """
+    return snapshot_lock(directory, exclusive=True, lock_file=ARROW_LOCK_FILE)
+
+
+def read_arrow_manifest(directory=SNAPSHOT_DIR):
+    path = os.path.join(directory, ARROW_MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Could not read Arrow dataset manifest {path}: {e}")
+        return None
+
+
+def _replace_atomically(path, write_fn):
+    # Written under a per-process name and renamed, so readers never see a partial file
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    write_fn(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _write_ipc(df, path):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.OSFile(path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def write_arrow_dataset(tables, version, directory=SNAPSHOT_DIR):
+    """
+    Write prepared tables to Arrow IPC files and publish them under version.
+
+    The manifest is replaced last, so processes picking up the new version
+    always find complete files. Files of older versions are removed; mappings
+    that still use them stay valid until they are closed.
+
+    Parameters:
+        tables: Dict of table name -> DataFrame.
+        version: Data version, the version of the snapshot the tables were loaded from.
+        directory: Directory holding the files.
+
+    Returns:
+        The new manifest.
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    manifest = {'version': version, 'tables': {}}
+    for name, df in tables.items():
+        file_name = f'{name}-{version}.arrow'
+        _replace_atomically(os.path.join(directory, file_name), lambda path: _write_ipc(df, path))
+        manifest['tables'][name] = {'file': file_name, 'rows': len(df)}
+
+    def write_manifest(path):
+        with open(path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+    _replace_atomically(os.path.join(directory, ARROW_MANIFEST_FILE), write_manifest)
+
+    current_files = {entry['file'] for entry in manifest['tables'].values()}
+    for file_name in os.listdir(directory):
+        if file_name.endswith('.arrow') and file_name not in current_files:
+            try:
+                os.remove(os.path.join(directory, file_name))
+            except OSError:
+                pass
+
+    return manifest
+
+
+def map_arrow_dataset(manifest, directory=SNAPSHOT_DIR):
+    """
+    Memory-map the tables listed in an Arrow dataset manifest.
+
+    The returned Arrow tables reference the mapped file directly, nothing is
+    read into process memory until columns are converted to pandas.
+
+    Returns:
+        Dict of table name -> pyarrow.Table.
+    """
+    tables = {}
+    for name, entry in manifest['tables'].items():
+        source = pa.memory_map(os.path.join(directory, entry['file']), 'r')
+        tables[name] = pa.ipc.open_file(source).read_all()
+    return tables
+
+
+def to_frame(table, positions=None):
+    """
+    Convert an Arrow table, or the rows at positions, to a DataFrame.
+
+    Dtypes (categoricals, nullable integers) are restored from the pandas
+    metadata stored with the table. Rows keep their positions as index
+    labels, like an iloc slice of the full frame.
+    """
+    if positions is not None:
+        table = table.take(pa.array(positions, type=pa.int64()))
+    df = table.to_pandas(split_blocks=True)
+    if positions is not None:
+        df.index = positions
+    return df
+
+
+def process_memory():
+    """
+    Resident memory of this process in MB, split into the part shared with other
+    processes (e.g. mapped files and copy-on-write pages) and the private part.
+
+    Pss divides shared pages between the processes using them, so summing Pss over
+    the workers gives their total footprint. Returns None where /proc is not available.
+    """
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line and not line.startswith(' '))
+    except OSError:
+        return None
+
+    def mb(field):
+        return round(int(fields.get(field, '0 kB').split()[0]) / 1024, 1)
+
+    return {
+        'rss_mb': mb('Rss'),
+        'pss_mb': mb('Pss'),
+        'shared_mb': round(mb('Shared_Clean') + mb('Shared_Dirty'), 1),
+        'private_mb': round(mb('Private_Clean') + mb('Private_Dirty'), 1),
+    }
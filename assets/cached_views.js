@@ -0,0 +1,86 @@
+// Sends the callback requests of the pre-rendered views (see view_snapshots.py) as GET
+// requests of their snapshot, which the browser cache or a reverse proxy can answer.
+// Other requests, requests triggered by inputs the snapshot does not render on, and requests
+// whose snapshot is gone after a data refresh, are POSTed as usual.
+
+(function () {
+    // Age after which the manifest is loaded again, as long as the server lets it be cached
+    var MANIFEST_MAX_AGE_MS = 60000;
+
+    var config = JSON.parse(document.getElementById('_dash-config').textContent);
+    var base = config.requests_pathname_prefix || '/';
+    var nativeFetch = window.fetch;
+    var manifest = null;
+    var manifestLoadedAt = 0;
+
+    function loadManifest() {
+        manifestLoadedAt = Date.now();
+        manifest = nativeFetch(base + 'view-snapshots.json', {credentials: 'same-origin'})
+            .then(function (res) { return res.ok ? res.json() : {}; })
+            .then(function (data) { return {paths: data.snapshots || {}, triggers: data.triggers || {}}; })
+            .catch(function () { return {paths: {}, triggers: {}}; });
+        return manifest;
+    }
+
+    // The request as view_snapshots.request_key builds it, JSON with sorted keys and no spaces
+    function canonical(value) {
+        if (Array.isArray(value)) {
+            return '[' + value.map(canonical).join(',') + ']';
+        }
+        if (value !== null && typeof value === 'object') {
+            return '{' + Object.keys(value).sort().map(function (key) {
+                return JSON.stringify(key) + ':' + canonical(value[key]);
+            }).join(',') + '}';
+        }
+        return JSON.stringify(value);
+    }
+
+    // Whether a request triggered by the changed properties gets the snapshot's response.
+    // On page load nothing is changed
+    function rendersOn(changed, triggers) {
+        if (!triggers || !changed.length) {
+            return true;
+        }
+        return changed.some(function (prop) { return triggers.indexOf(prop) !== -1; });
+    }
+
+    window.fetch = function (url, options) {
+        var self = this;
+        var args = arguments;
+        if (typeof url !== 'string' || url.indexOf('_dash-update-component') === -1 || url.indexOf('?') !== -1
+                || !options || options.method !== 'POST' || typeof options.body !== 'string') {
+            return nativeFetch.apply(self, args);
+        }
+
+        var key;
+        var changed;
+        try {
+            var body = JSON.parse(options.body);
+            key = canonical({output: body.output, inputs: body.inputs || [], state: body.state || []});
+            changed = body.changedPropIds || [];
+        } catch (e) {
+            return nativeFetch.apply(self, args);
+        }
+
+        var snapshots = Date.now() - manifestLoadedAt > MANIFEST_MAX_AGE_MS ? loadManifest() : manifest;
+        return snapshots.then(function (snapshots) {
+            var paths = snapshots.paths;
+            if (!Object.prototype.hasOwnProperty.call(paths, key)
+                    || !rendersOn(changed, snapshots.triggers[key])) {
+                return nativeFetch.apply(self, args);
+            }
+            return nativeFetch(base + paths[key], {credentials: 'same-origin'}).then(function (res) {
+                if (res.status === 200 || res.status === 204) {
+                    return res;
+                }
+                // The data was refreshed since the manifest was loaded
+                loadManifest();
+                return nativeFetch.apply(self, args);
+            }, function () {
+                return nativeFetch.apply(self, args);
+            });
+        });
+    };
+
+    loadManifest();
+})();
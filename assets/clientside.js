@@ -0,0 +1,33 @@
+// Callbacks that only map a click or a tab change to styles and classes run in the
+// browser, so they give instant feedback and the server only sees the resulting
+// filter change.
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    filters: {
+        // Highlight the clicked button of a button group and store its value.
+        // Arguments are the n_clicks of the buttons followed by their values, the first button is the default.
+        highlight_button: function () {
+            var ctx = window.dash_clientside.callback_context;
+            var buttons = arguments.length / 2;
+            var values = Array.prototype.slice.call(arguments, buttons);
+            var button_ids = ctx.inputs_list.map(function (input) { return input.id; });
+
+            // Not triggered by a click (initial call), default to the first button
+            var selected = 0;
+            if (ctx.triggered.length) {
+                var button_id = ctx.triggered[0].prop_id.split('.')[0];
+                selected = Math.max(button_ids.indexOf(button_id), 0);
+            }
+
+            var styles = button_ids.map(function (_, i) {
+                return i === selected ? {backgroundColor: 'blue', color: 'white'} : {};
+            });
+            return styles.concat([values[selected]]);
+        },
+
+        // Filter, title and tab content classes of the active tab, from the table built on the server
+        filter_visibility: function (active_tab, visibility) {
+            return visibility[active_tab] || visibility['default'];
+        }
+    }
+});
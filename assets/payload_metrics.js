@@ -0,0 +1,70 @@
+// Measures how long the browser takes to parse each callback response and reports it to
+// the server, which adds it to /callback-metrics next to the response sizes per tab.
+// The response body is parsed once, by the same JSON.parse the Dash renderer would use.
+
+(function () {
+    var REPORT_SIZE = 20;
+    var REPORT_INTERVAL_MS = 30000;
+
+    var nativeFetch = window.fetch;
+    var samples = [];
+    var reportUrl = null;
+
+    function report() {
+        if (!samples.length || !reportUrl) {
+            return;
+        }
+        var body = JSON.stringify(samples.splice(0, samples.length));
+        if (navigator.sendBeacon) {
+            navigator.sendBeacon(reportUrl, new Blob([body], {type: 'application/json'}));
+        } else {
+            nativeFetch(reportUrl, {method: 'POST', body: body, headers: {'Content-Type': 'application/json'}, keepalive: true});
+        }
+    }
+
+    window.fetch = function (url, options) {
+        var response = nativeFetch.apply(this, arguments);
+        if (typeof url !== 'string' || url.indexOf('_dash-update-component') === -1) {
+            return response;
+        }
+
+        // The metrics endpoint lives next to the callback endpoint, also under a path prefix
+        reportUrl = url.split('?')[0].replace('_dash-update-component', 'callback-metrics/client');
+        var output;
+        var tab;
+        try {
+            var body = JSON.parse(options.body);
+            output = body.output;
+            // The tab content callback renders the active tab, its responses are reported per tab
+            (body.inputs || []).forEach(function (input) {
+                if (input.id === 'tabs' && input.property === 'active_tab') {
+                    tab = input.value;
+                }
+            });
+        } catch (e) {
+            return response;
+        }
+
+        return response.then(function (res) {
+            res.json = function () {
+                return res.text().then(function (text) {
+                    var start = performance.now();
+                    var data = JSON.parse(text);
+                    samples.push({output: output, tab: tab, parse_ms: performance.now() - start, bytes: text.length});
+                    if (samples.length >= REPORT_SIZE) {
+                        report();
+                    }
+                    return data;
+                });
+            };
+            return res;
+        });
+    };
+
+    setInterval(report, REPORT_INTERVAL_MS);
+    document.addEventListener('visibilitychange', function () {
+        if (document.visibilityState === 'hidden') {
+            report();
+        }
+    });
+})();
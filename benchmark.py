@@ -0,0 +1,280 @@
+# benchmark.py
+
+# Times the filter callback and the tab builders against a synthetic dataset (see
+# synthetic_data.py) and writes the results as JSON, so runs at the same scale can be
+# compared between commits:
+#
+#   python benchmark.py --leagues 12 --seasons 40 --output before.json
+#   python benchmark.py --leagues 12 --seasons 40 --output after.json --compare before.json
+#
+# --engine duckdb runs the standings, point distribution and team comparison aggregations
+# as DuckDB queries (see sql_engine.py), to compare them with a pandas run at the same scale.
+#
+# The app is imported with the generated tables as its local data source, so it
+# loads, snapshots, prepares and warms the dataset the same way it does in
+# production. Every tab render starts from empty result and render caches;
+# structures derived per data version (games index, position matrices, point
+# distribution, team profiles) stay built. The filter case likewise computes the
+# standings, season and matchday frames of every selection from an empty result store,
+# as the first tab render after a filter change does.
+
+import argparse
+import gzip
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+
+PERCENTILES = [50, 90, 99]
+
+# Tabs whose builders are timed
+TAB_CASES = ['tab-1', 'tab-2', 'tab-3', 'tab-4', 'tab-5', 'tab-6']
+
+MATCHDAY_METRICS = ['table_position', 'avg_points']
+COMPARISON_METRICS = ['avg_points', 'avg_scored', 'avg_conceded', 'avg_spectators', 'avg_spectators_away',
+                      'avg_points_home', 'avg_points_away']
+# The Team Statistics tab colors seasons by league and knows these leagues
+TEAMSTAT_LEAGUES = ['shl', 'allsvenskan']
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def filter_combinations(df_keys, matchdays, n, seed):
+    """
+    n deterministic (league, season, matchday, homeaway, lastgames) selections over the leagues and seasons in df_keys.
+    """
+    rng = np.random.default_rng(seed)
+    league_seasons = df_keys[['league', 'season']].drop_duplicates().astype(str).to_numpy()
+
+    combinations = []
+    for i in range(n):
+        league, season = league_seasons[rng.integers(len(league_seasons))]
+        combinations.append((
+            league,
+            season,
+            matchdays[rng.integers(len(matchdays))],
+            ['total', 'home', 'away'][i % 3],
+            ['all', 'last5', 'last10'][i % 3],
+        ))
+    return combinations
+
+
+def summarize(timings, memory_peak, payloads):
+    timings = np.array(timings) * 1000
+    total_seconds = timings.sum() / 1000
+    summary = {
+        'iterations': len(timings),
+        'throughput_per_s': round(len(timings) / total_seconds, 2) if total_seconds else None,
+        'mean_ms': round(float(timings.mean()), 3),
+        'max_ms': round(float(timings.max()), 3),
+        'peak_memory_mb': round(memory_peak / 2 ** 20, 2),
+    }
+    for q, value in zip(PERCENTILES, np.percentile(timings, PERCENTILES)):
+        summary[f'p{q}_ms'] = round(float(value), 3)
+    if payloads:
+        for field in ['payload_bytes', 'wire_bytes', 'parse_ms']:
+            summary[f'mean_{field}'] = round(float(np.mean([payload[field] for payload in payloads])), 3)
+    return summary
+
+
+def measure_payload(payload, compression_level):
+    """
+    Size of a response as JSON and as sent gzip compressed, and the time to parse it
+    again, as a stand-in for the parse time in the browser.
+    """
+    start = time.perf_counter()
+    json.loads(payload)
+    parse_seconds = time.perf_counter() - start
+
+    data = payload.encode('utf-8')
+    wire_bytes = len(gzip.compress(data, compresslevel=compression_level)) if compression_level > 0 else len(data)
+    return {'payload_bytes': len(data), 'wire_bytes': wire_bytes, 'parse_ms': parse_seconds * 1000}
+
+
+def run_case(name, calls, serialize=None, compression_level=0):
+    """
+    Time every call, then run the first one again under tracemalloc for its peak allocation.
+
+    Parameters:
+        name: Case name, for progress output.
+        calls: List of zero-argument callables, one per iteration.
+        serialize: Callable turning a result into the JSON sent to the browser, to report payload sizes.
+        compression_level: gzip level of the responses, 0 for uncompressed.
+    """
+    timings = []
+    payloads = []
+    for call in calls:
+        start = time.perf_counter()
+        result = call()
+        timings.append(time.perf_counter() - start)
+        if serialize is not None:
+            payloads.append(measure_payload(serialize(result), compression_level))
+
+    tracemalloc.start()
+    try:
+        calls[0]()
+        _, memory_peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    summary = summarize(timings, memory_peak, payloads)
+    print(f"{name:14s} p50 {summary['p50_ms']:9.2f} ms  p99 {summary['p99_ms']:9.2f} ms  "
+          f"{summary['throughput_per_s']:9.1f}/s  peak {summary['peak_memory_mb']:7.1f} MB  "
+          f"payload {summary.get('mean_payload_bytes', 0):9.0f} B  wire {summary.get('mean_wire_bytes', 0):8.0f} B  "
+          f"parse {summary.get('mean_parse_ms', 0):6.2f} ms")
+    return summary
+
+
+def run_benchmark(args):
+    results = {
+        'commit': git_commit(),
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'scale': {'leagues': args.leagues, 'seasons': args.seasons, 'teams': args.teams, 'seed': args.seed},
+        'engine': args.engine,
+        'iterations': args.iterations,
+    }
+
+    # The app reads its data source from the environment when it is imported
+    data_path = os.path.join(args.work_dir, 'data')
+    os.environ['DATA_SOURCE'] = 'local'
+    os.environ['DATA_SOURCE_PATH'] = data_path
+    os.environ['SNAPSHOT_DIR'] = os.path.join(args.work_dir, 'snapshots')
+    os.environ['DATA_REFRESH_MINUTES'] = '0'
+    os.environ['QUERY_ENGINE'] = args.engine
+
+    from synthetic_data import write_synthetic_tables
+
+    start = time.perf_counter()
+    results['rows'] = write_synthetic_tables(data_path, n_leagues=args.leagues, n_seasons=args.seasons,
+                                             n_teams=args.teams, seed=args.seed)
+    results['generate_seconds'] = round(time.perf_counter() - start, 2)
+    print(f"Generated {results['rows']['team_games']} games rows in {results['generate_seconds']} s")
+
+    start = time.perf_counter()
+    import app
+    results['boot_seconds'] = round(time.perf_counter() - start, 2)
+    # The engine that actually ran, pandas when duckdb is not installed
+    results['engine'] = app.query_engine
+    print(f"Booted app in {results['boot_seconds']} s")
+
+    import plotly
+    from response_compression import RESPONSE_COMPRESSION_LEVEL
+
+    def serialize(result):
+        return json.dumps(result, cls=plotly.utils.PlotlyJSONEncoder)
+
+    dataset = app.current_dataset()
+    matchdays = sorted(int(matchday) for matchday in dataset['matchdays']['matchday'])
+    combinations = filter_combinations(app.games_index(dataset).keys, matchdays, args.iterations, args.seed)
+    keys = [app.update_table(*combination) for combination in combinations]
+
+    teams = dataset['team_season_metrics']
+    teams = sorted(teams.loc[teams['league'].isin(TEAMSTAT_LEAGUES), 'team'].astype(str).unique())
+
+    def uncached(tab_id, *values):
+        def call():
+            app.result_store.clear()
+            app.render_cache.clear()
+            return app.render_tab(tab_id, *values)
+        return call
+
+    tab_inputs = {
+        'tab-1': lambda i: (keys[i][0],),
+        'tab-2': lambda i: (keys[i][1],),
+        'tab-3': lambda i: (keys[i][1], MATCHDAY_METRICS[i % len(MATCHDAY_METRICS)]),
+        'tab-4': lambda i: (keys[i][2],),
+        'tab-5': lambda i: (teams[i % len(teams)],),
+        'tab-6': lambda i: (COMPARISON_METRICS[i % len(COMPARISON_METRICS)], combinations[i][0]),
+    }
+
+    def filtered(combination):
+        # update_table only builds the store keys, the frames are computed by load_result
+        def call():
+            app.result_store.clear()
+            result_keys = app.update_table(*combination)
+            for key in result_keys:
+                app.load_result(key, dataset)
+            return result_keys
+        return call
+
+    cases = {}
+    cases['filter_results'] = run_case('filter_results', [filtered(combination) for combination in combinations],
+                                       serialize, RESPONSE_COMPRESSION_LEVEL)
+    for tab_id in TAB_CASES:
+        if tab_id == 'tab-5' and not teams:
+            continue
+        cases[tab_id] = run_case(tab_id, [uncached(tab_id, *tab_inputs[tab_id](i)) for i in range(args.iterations)],
+                                  serialize, RESPONSE_COMPRESSION_LEVEL)
+
+    results['cases'] = cases
+    results['max_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return results
+
+
+def compare(results, baseline):
+    print(f"\nCompared to {baseline.get('commit')} ({baseline.get('created_at')}):")
+    if baseline.get('engine', 'pandas') != results['engine']:
+        print(f"  Engine: {baseline.get('engine', 'pandas')} -> {results['engine']}")
+    if baseline.get('scale') != results['scale']:
+        print(f"  Scale differs: {baseline.get('scale')} vs {results['scale']}")
+    for name, summary in results['cases'].items():
+        before = baseline.get('cases', {}).get(name)
+        if not before:
+            continue
+        changes = '  '.join(
+            f"{field} {before[field]:.2f} -> {summary[field]:.2f} ({summary[field] / before[field] - 1:+.0%})"
+            for field in ['p50_ms', 'p99_ms', 'mean_payload_bytes', 'mean_wire_bytes'] if before.get(field)
+        )
+        print(f"  {name:14s} {changes}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the filter results and the tab builders on synthetic data.')
+    parser.add_argument('--leagues', type=int, default=2, help='number of leagues (2-20)')
+    parser.add_argument('--seasons', type=int, default=10, help='number of seasons (10-50)')
+    parser.add_argument('--teams', type=int, default=14, help='teams per league')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--engine', choices=['pandas', 'duckdb'], default='pandas', help='query engine of the aggregations')
+    parser.add_argument('--iterations', type=int, default=50, help='calls per case')
+    parser.add_argument('--work-dir', help='directory for the generated tables and the snapshot, a temporary one by default')
+    parser.add_argument('--output', default='benchmark.json', help='JSON file the results are written to')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare with')
+    args = parser.parse_args(argv)
+
+    temporary_dir = None
+    if not args.work_dir:
+        args.work_dir = temporary_dir = tempfile.mkdtemp(prefix='hockey-benchmark-')
+    try:
+        results = run_benchmark(args)
+    finally:
+        if temporary_dir:
+            shutil.rmtree(temporary_dir, ignore_errors=True)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,210 @@
+# callback_metrics.py
+
+import functools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+
+CALLBACK_METRICS_SIZE = int(os.getenv('CALLBACK_METRICS_SIZE', '1000'))
+# Callbacks and client response kinds samples are kept for, later ones are not recorded
+CALLBACK_METRICS_KEYS = int(os.getenv('CALLBACK_METRICS_KEYS', '64'))
+
+# Phases timed inside a callback. Time not spent in a phase of the callback function
+# is reported as 'other', time outside of it (JSON serialization of the response and
+# Dash dispatch) as 'serialize'. 'sql' is time in queries of the DuckDB engine (sql_engine.py),
+# 'compress' the gzip compression of the response (response_compression.py)
+PHASES = ['pandas', 'sql', 'figure', 'compress']
+
+PERCENTILES = [50, 90, 99]
+
+
+class CallbackMetrics:
+    """
+    Wall time, time per phase and request/response size of the last Dash callback
+    invocations of this worker, per callback and per tab, and the JSON parse time
+    the browsers report for the responses.
+
+    An invocation is started and finished around the HTTP request, code inside the
+    callback tags it and times its phases with timed(). Only invocations of callbacks
+    wrapped with instrument() are recorded, under the function name, so the keys come
+    from the code and not from the request. Outside of an invocation (e.g.
+    when warming caches) tagging and timing do nothing. Phases are exclusive: time in a
+    nested phase is not counted in the enclosing one.
+    """
+
+    def __init__(self, max_samples=CALLBACK_METRICS_SIZE, max_keys=CALLBACK_METRICS_KEYS):
+        self.max_samples = max_samples
+        self.max_keys = max_keys
+        self._samples = {}
+        self._client_samples = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def start(self, request_bytes):
+        self._local.invocation = {
+            'callback': None,
+            'tab': None,
+            'start': time.perf_counter(),
+            'request_bytes': request_bytes or 0,
+            'phases': dict.fromkeys(PHASES + ['callback'], 0.0),
+            'stack': [],
+        }
+
+    def tag(self, **tags):
+        invocation = getattr(self._local, 'invocation', None)
+        if invocation is not None:
+            invocation.update(tags)
+
+    @contextmanager
+    def timed(self, phase):
+        invocation = getattr(self._local, 'invocation', None)
+        if invocation is None:
+            yield
+            return
+
+        stack = invocation['stack']
+        now = time.perf_counter()
+        if stack:
+            # Pause the enclosing phase
+            outer, outer_start = stack[-1]
+            invocation['phases'][outer] += now - outer_start
+        stack.append([phase, now])
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            phase, phase_start = stack.pop()
+            invocation['phases'][phase] += now - phase_start
+            if stack:
+                stack[-1][1] = now
+
+    def instrument(self, fn):
+        """
+        Decorator for a callback function: names the invocation after the function and
+        times the function, so the rest of the request is attributed to serialization.
+        """
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            self.tag(callback=fn.__name__)
+            with self.timed('callback'):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    def finish(self, response_bytes, wire_bytes, status):
+        """
+        Record the invocation of this thread, if an instrumented callback ran in it.
+
+        Parameters:
+            response_bytes: Size of the JSON response.
+            wire_bytes: Size of the response as sent, i.e. after compression.
+            status: HTTP status code.
+        """
+        invocation = getattr(self._local, 'invocation', None)
+        if invocation is None:
+            return
+        self._local.invocation = None
+        if invocation['callback'] is None:
+            return
+
+        wall = time.perf_counter() - invocation['start']
+        phases = invocation['phases']
+        callback_time = phases['callback'] + sum(phases[phase] for phase in PHASES)
+
+        sample = {
+            'tab': invocation['tab'],
+            'status': status,
+            'wall_ms': wall * 1000,
+            'pandas_ms': phases['pandas'] * 1000,
+            'sql_ms': phases['sql'] * 1000,
+            'figure_ms': phases['figure'] * 1000,
+            'compress_ms': phases['compress'] * 1000,
+            'other_ms': phases['callback'] * 1000,
+            'serialize_ms': max(wall - callback_time, 0.0) * 1000,
+            'request_bytes': invocation['request_bytes'],
+            'response_bytes': response_bytes or 0,
+            'wire_bytes': wire_bytes or 0,
+        }
+        self._append(self._samples, invocation['callback'], sample)
+
+    def _append(self, samples_by_key, key, sample):
+        with self._lock:
+            samples = samples_by_key.get(key)
+            if samples is None:
+                if len(samples_by_key) >= self.max_keys:
+                    return
+                samples = samples_by_key[key] = deque(maxlen=self.max_samples)
+            samples.append(sample)
+
+    def record_client(self, key, parse_ms, response_bytes):
+        """
+        Record a response as parsed in the browser.
+
+        Parameters:
+            key: Tab id of a tab content response, otherwise the output of a registered callback.
+            parse_ms: Time of JSON.parse of the response body.
+            response_bytes: Size of the decoded response body.
+        """
+        self._append(self._client_samples, key, {'parse_ms': parse_ms, 'response_bytes': response_bytes})
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._client_samples.clear()
+
+    def stats(self):
+        """
+        Percentiles of the recorded invocations, per callback and per tab.
+
+        Invocations that did not update anything (PreventUpdate, status 204) are counted
+        but left out of the percentiles.
+        """
+        with self._lock:
+            samples = {callback: list(entries) for callback, entries in self._samples.items()}
+            client_samples = {key: list(entries) for key, entries in self._client_samples.items()}
+
+        by_tab = {}
+        for entries in samples.values():
+            for sample in entries:
+                if sample['tab'] is not None:
+                    by_tab.setdefault(sample['tab'], []).append(sample)
+
+        return {
+            'max_samples': self.max_samples,
+            'callbacks': {callback: summarize(entries) for callback, entries in sorted(samples.items())},
+            'tabs': {tab: summarize(entries) for tab, entries in sorted(by_tab.items())},
+            'client': {key: summarize_client(entries) for key, entries in sorted(client_samples.items())},
+        }
+
+
+def summarize(samples):
+    updated = [sample for sample in samples if sample['status'] != 204]
+    summary = {'count': len(samples), 'prevented': len(samples) - len(updated)}
+    if not updated:
+        return summary
+
+    for field in ['wall_ms', 'pandas_ms', 'sql_ms', 'figure_ms', 'compress_ms', 'other_ms', 'serialize_ms',
+                  'request_bytes', 'response_bytes', 'wire_bytes']:
+        summary[field] = percentiles([sample[field] for sample in updated])
+    summary['response_bytes']['total'] = int(sum(sample['response_bytes'] for sample in updated))
+    summary['wire_bytes']['total'] = int(sum(sample['wire_bytes'] for sample in updated))
+    return summary
+
+
+def summarize_client(samples):
+    return {
+        'count': len(samples),
+        'parse_ms': percentiles([sample['parse_ms'] for sample in samples]),
+        'response_bytes': percentiles([sample['response_bytes'] for sample in samples]),
+    }
+
+
+def percentiles(values):
+    values = np.array(values, dtype='float64')
+    summary = {f'p{q}': round(float(value), 2) for q, value in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+    summary['max'] = round(float(values.max()), 2)
+    return summary
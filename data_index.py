@@ -0,0 +1,64 @@
+# data_index.py
+
+import numpy as np
+import pandas as pd
+
+from arrow_store import to_frame
+
+
+KEY_COLUMNS = ['league', 'season', 'matchday']
+
+
+class GamesIndex:
+    """
+    Row positions of the games table per (league, season) and (league, matchday).
+
+    Built once per dataset version, so callbacks take their slice of the table
+    instead of masking every row on each interaction. Slices keep the row order
+    of the full table.
+
+    The games table is a DataFrame or a memory-mapped Arrow table. For an Arrow
+    table only the key columns are converted to pandas, slices are taken from
+    the mapped table and converted per request.
+    """
+
+    def __init__(self, team_games):
+        if isinstance(team_games, pd.DataFrame):
+            self.df, self.table = team_games, None
+            self.keys = team_games[KEY_COLUMNS]
+        else:
+            self.df, self.table = None, team_games
+            self.keys = to_frame(team_games.select(KEY_COLUMNS))
+        self._league_season = self.keys.groupby(['league', 'season'], sort=False, observed=True).indices
+        self._league_matchday = self.keys.groupby(['league', 'matchday'], sort=False, observed=True).indices
+
+    def _take(self, positions):
+        if positions is None:
+            positions = np.array([], dtype=np.intp)
+        if self.table is not None:
+            return to_frame(self.table, positions)
+        return self.df.iloc[positions]
+
+    def columns(self, names):
+        """
+        The full games table restricted to the given columns.
+        """
+        if self.table is not None:
+            return to_frame(self.table.select(names))
+        return self.df[names]
+
+    def has_league_season(self, league, season):
+        try:
+            return (league, season) in self._league_season
+        except TypeError:
+            return False
+
+    def league_season(self, league, season):
+        return self._take(self._league_season.get((league, season)))
+
+    def league_matchday(self, league, matchday):
+        return self._take(self._league_matchday.get((league, matchday)))
+
+
+def games_index(dataset):
+    return dataset.derived('games_index', lambda ds: GamesIndex(ds.tables['team_games']))
@@ -0,0 +1,133 @@
+# data_refresh.py
+
+import threading
+import time
+from types import MappingProxyType
+
+import pandas as pd
+
+from arrow_store import to_frame
+
+
+class Dataset:
+    """
+    Immutable set of dashboard tables for one data version.
+
+    Callbacks should fetch the current dataset once and read every table from
+    it, so a refresh that happens mid-callback can not mix two versions.
+
+    Tables are DataFrames, or Arrow tables memory-mapped from the shared dataset
+    files (see arrow_store.py), which are converted to DataFrames on first access.
+    """
+
+    def __init__(self, version, tables):
+        self.version = version
+        self.tables = MappingProxyType(dict(tables))
+        self.loaded_at = time.time()
+        self._derived = {}
+        # Reentrant, since builders may use other derived structures of the same dataset
+        self._derived_lock = threading.RLock()
+
+    def __getitem__(self, name):
+        table = self.tables[name]
+        if isinstance(table, pd.DataFrame):
+            return table
+        return self.derived(('frame', name), lambda ds: to_frame(table))
+
+    def derived(self, name, builder):
+        """
+        Return a structure built from this dataset, building it on first use.
+
+        Parameters:
+            name: Cache key of the structure.
+            builder: Callable taking the dataset and returning the structure.
+        """
+        try:
+            return self._derived[name]
+        except KeyError:
+            pass
+        with self._derived_lock:
+            if name not in self._derived:
+                self._derived[name] = builder(self)
+            return self._derived[name]
+
+
+_current_dataset = None
+
+
+def current_dataset():
+    return _current_dataset
+
+
+def publish_dataset(dataset):
+    # A single reference assignment, so readers see either the old or the new dataset
+    global _current_dataset
+    _current_dataset = dataset
+
+
+class DataRefresher:
+    """
+    Reload the dashboard tables in a background thread and swap in new versions.
+
+    Parameters:
+        load_fn: Callable taking a force flag and returning (version, tables).
+            Derived columns must already be built on the returned tables.
+        interval_seconds: Seconds between scheduled refreshes, 0 disables the schedule.
+        warm_fn: Optional callable run on a new dataset before it is published,
+            e.g. to build its derived structures.
+
+    Callables registered with on_publish run on every dataset published after that,
+    e.g. to render what is served from the new version.
+    """
+
+    def __init__(self, load_fn, interval_seconds=0, warm_fn=None):
+        self.load_fn = load_fn
+        self.interval_seconds = interval_seconds
+        self.warm_fn = warm_fn
+        self._trigger = threading.Event()
+        self._refresh_lock = threading.Lock()
+        self._thread = None
+        self._publish_fns = []
+
+    def refresh(self, force=False):
+        """
+        Load the tables and publish them if the version changed.
+
+        Returns:
+            The current dataset after the refresh.
+        """
+        with self._refresh_lock:
+            version, tables = self.load_fn(force)
+            dataset = current_dataset()
+            if dataset is None or dataset.version != version:
+                dataset = Dataset(version, tables)
+                if self.warm_fn is not None:
+                    self.warm_fn(dataset)
+                publish_dataset(dataset)
+                print(f"Published dataset version {version}")
+                for publish_fn in self._publish_fns:
+                    publish_fn(dataset)
+            return dataset
+
+    def on_publish(self, publish_fn):
+        """Run publish_fn(dataset) after every dataset published from now on."""
+        self._publish_fns.append(publish_fn)
+
+    def trigger(self):
+        """Ask the background thread for a forced refresh."""
+        self._trigger.set()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name='data-refresher', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            triggered = self._trigger.wait(self.interval_seconds or None)
+            self._trigger.clear()
+            try:
+                self.refresh(force=triggered)
+            except Exception as e:
+                print(f"Error refreshing data: {e}")
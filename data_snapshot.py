@@ -0,0 +1,197 @@
+# data_snapshot.py
+
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows, where only one process uses the snapshot
+    fcntl = None
+
+
+SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', 'snapshots')
+SNAPSHOT_MAX_AGE_HOURS = float(os.getenv('SNAPSHOT_MAX_AGE_HOURS', '24'))
+MANIFEST_FILE = 'manifest.json'
+LOCK_FILE = 'snapshot.lock'
+
+
+def read_manifest(snapshot_dir=SNAPSHOT_DIR):
+    """
+    Read the snapshot manifest.
+
+    Returns:
+        The manifest dict, or None if no (readable) snapshot exists.
+    """
+    path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Could not read snapshot manifest {path}: {e}")
+        return None
+
+
+def snapshot_age_hours(manifest):
+    created_at = datetime.fromisoformat(manifest['created_at'])
+    return (datetime.now(timezone.utc) - created_at).total_seconds() / 3600
+
+
+def query_hash(query):
+    return hashlib.sha1(' '.join(query.split()).encode('utf-8')).hexdigest()
+
+
+def is_complete(manifest, queries, snapshot_dir=SNAPSHOT_DIR, match_queries=True):
+    """
+    Check that the manifest lists every table and that all files are on disk.
+
+    With match_queries, each table must also have been written from the same
+    query, so a changed column selection invalidates the snapshot.
+    """
+    if not manifest:
+        return False
+    for name, query in queries.items():
+        entry = manifest['tables'].get(name)
+        if entry is None or not os.path.exists(os.path.join(snapshot_dir, entry['file'])):
+            return False
+        if match_queries and entry.get('query_hash') != query_hash(query):
+            return False
+    return True
+
+
+def is_fresh(manifest, queries, snapshot_dir=SNAPSHOT_DIR, max_age_hours=SNAPSHOT_MAX_AGE_HOURS):
+    return is_complete(manifest, queries, snapshot_dir) and snapshot_age_hours(manifest) <= max_age_hours
+
+
+def write_snapshot(tables, snapshot_dir=SNAPSHOT_DIR, queries=None):
+    """
+    Write each table to a Parquet file and publish a new manifest.
+
+    The manifest is written last and replaced atomically, so readers either see
+    the previous complete snapshot or the new one.
+
+    Parameters:
+        tables: Dict of table name -> DataFrame.
+        snapshot_dir: Directory holding the snapshot files.
+        queries: Dict of table name -> query the table was loaded with.
+
+    Returns:
+        The new manifest.
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+
+    created_at = datetime.now(timezone.utc)
+    version = created_at.strftime('%Y%m%dT%H%M%S%fZ')
+
+    manifest = {'version': version, 'created_at': created_at.isoformat(), 'tables': {}}
+    for name, df in tables.items():
+        file_name = f'{name}-{version}.parquet'
+        df.to_parquet(os.path.join(snapshot_dir, file_name), index=False)
+        manifest['tables'][name] = {'file': file_name, 'rows': len(df), 'columns': list(df.columns)}
+        if queries is not None:
+            manifest['tables'][name]['query_hash'] = query_hash(queries[name])
+
+    tmp_path = os.path.join(snapshot_dir, MANIFEST_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(snapshot_dir, MANIFEST_FILE))
+
+    _remove_stale_files(manifest, snapshot_dir)
+
+    return manifest
+
+
+def _remove_stale_files(manifest, snapshot_dir):
+    current_files = {entry['file'] for entry in manifest['tables'].values()}
+    for file_name in os.listdir(snapshot_dir):
+        if file_name.endswith('.parquet') and file_name not in current_files:
+            try:
+                os.remove(os.path.join(snapshot_dir, file_name))
+            except OSError:
+                pass
+
+
+@contextmanager
+def snapshot_lock(snapshot_dir=SNAPSHOT_DIR, exclusive=False, lock_file=LOCK_FILE):
+    """
+    Lock the snapshot directory across processes (e.g. gunicorn workers).
+
+    Writers hold the lock exclusively, so only one process loads from the source and
+    stale files are not removed while another process is reading them.
+    Other files in the directory can be guarded with their own lock_file.
+    """
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(snapshot_dir, exist_ok=True)
+    with open(os.path.join(snapshot_dir, lock_file), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def read_snapshot(manifest, table_names, snapshot_dir=SNAPSHOT_DIR):
+    return {
+        name: pd.read_parquet(os.path.join(snapshot_dir, manifest['tables'][name]['file']))
+        for name in table_names
+    }
+
+
+def load_tables(queries, source, snapshot_dir=SNAPSHOT_DIR, max_age_hours=SNAPSHOT_MAX_AGE_HOURS):
+    """
+    Load the dashboard tables, preferring a fresh local snapshot over the data source.
+
+    The source is only queried when the snapshot is missing, older than
+    max_age_hours or written from different queries. If the source is unavailable (e.g. no BigQuery client or a
+    failing query) a stale snapshot is used instead, so the app can boot without network.
+    Concurrent callers in other processes wait for a running fetch and then
+    read its snapshot instead of querying again.
+
+    Parameters:
+        queries: Dict of table name -> query of the source (see data_sources.py).
+        source: Data source the tables are loaded from.
+        snapshot_dir: Directory holding the snapshot files.
+        max_age_hours: Maximum snapshot age before the source is queried again.
+
+    Returns:
+        Tuple of (dict of table name -> DataFrame, manifest).
+    """
+    table_names = list(queries)
+
+    with snapshot_lock(snapshot_dir):
+        manifest = read_manifest(snapshot_dir)
+        if is_fresh(manifest, queries, snapshot_dir, max_age_hours):
+            print(f"Loading tables from snapshot {manifest['version']}")
+            return read_snapshot(manifest, table_names, snapshot_dir), manifest
+
+    with snapshot_lock(snapshot_dir, exclusive=True):
+        # Another worker may have written a new snapshot while this one waited for the lock
+        manifest = read_manifest(snapshot_dir)
+        if is_fresh(manifest, queries, snapshot_dir, max_age_hours):
+            print(f"Loading tables from snapshot {manifest['version']}")
+            return read_snapshot(manifest, table_names, snapshot_dir), manifest
+
+        try:
+            tables = source.load(queries)
+        except Exception as e:
+            if not is_complete(manifest, queries, snapshot_dir, match_queries=False):
+                raise
+            print(f"Error loading from {source.name} ({e}), falling back to stale snapshot {manifest['version']}")
+            return read_snapshot(manifest, table_names, snapshot_dir), manifest
+
+        try:
+            manifest = write_snapshot(tables, snapshot_dir, queries)
+            print(f"Wrote snapshot {manifest['version']}")
+        except Exception as e:
+            print(f"Error writing snapshot: {e}")
+            manifest = None
+
+    return tables, manifest
@@ -0,0 +1,187 @@
+# data_sources.py
+
+# Where the dashboard tables are loaded from, chosen with DATA_SOURCE:
+#   bigquery  The BigQuery views (default), with the service account key from
+#             BIGQUERY_KEY (base64 encoded JSON) or the file BIGQUERY_KEY_PATH.
+#   local     Files under DATA_SOURCE_PATH: a directory with one <table>.parquet or
+#             <table>.csv per table, or a DuckDB database file (.duckdb) with one
+#             table per dashboard table.
+#
+# Every source loads the columns registered in table_schema.py. Loaded tables go
+# through the local snapshot (data_snapshot.py) the same way for every source.
+
+import base64
+import json
+import os
+
+import pandas as pd
+
+from bigquery_loader import fetch_tables
+from table_schema import TABLE_SCHEMAS, build_queries
+
+
+DATA_SOURCE = os.getenv('DATA_SOURCE', 'bigquery')
+DATA_SOURCE_PATH = os.getenv('DATA_SOURCE_PATH', 'data')
+
+# Key files tried in order when BIGQUERY_KEY is not set: local development, then the container
+BIGQUERY_KEY_PATHS = [
+    path for path in [
+        os.getenv('BIGQUERY_KEY_PATH'),
+        'C:/Users/marcu/Documents/servicekeys/sportresults-294318-ffcf7d3aebdf.json',
+        '/app/servicekeys/sportresults-294318-ffcf7d3aebdf.json',
+    ] if path
+]
+
+LOCAL_FORMATS = ['parquet', 'csv']
+
+
+class BigQuerySource:
+    """
+    Tables queried from the BigQuery views.
+
+    Without a usable key the source has no client and load() raises, so the
+    app can still boot from a stale snapshot.
+    """
+
+    name = 'bigquery'
+
+    def __init__(self):
+        self.client = None
+        self.credentials = None
+        self.connect()
+
+    def connect(self):
+        # Also called in each gunicorn worker after the fork, since the client's connections can not be shared
+        try:
+            from google.cloud import bigquery
+            from google.oauth2 import service_account
+
+            key_json = os.getenv('BIGQUERY_KEY')
+            if key_json:
+                key_data = json.loads(base64.b64decode(key_json).decode('utf-8'))
+                # Built from the key info directly, so workers starting together do not share a temp file
+                credentials = service_account.Credentials.from_service_account_info(key_data)
+            else:
+                key_path = next((path for path in BIGQUERY_KEY_PATHS if os.path.exists(path)), BIGQUERY_KEY_PATHS[-1])
+                credentials = service_account.Credentials.from_service_account_file(key_path)
+            # The credentials are kept for the Storage read client of the downloads (see bigquery_loader.py)
+            self.client = bigquery.Client(credentials=credentials, project=credentials.project_id)
+            self.credentials = credentials
+            print("BigQuery client successfully initialized!")
+        except Exception as e:
+            print(f"Error initializing BigQuery client: {e}")
+            self.client = None
+            self.credentials = None
+
+    def queries(self):
+        return build_queries()
+
+    def load(self, queries):
+        if self.client is None:
+            raise RuntimeError('no BigQuery client available')
+        tables, _ = fetch_tables(self.client, queries, self.credentials)
+        return tables
+
+
+class LocalSource:
+    """
+    Tables read from local files, for development, profiling and benchmarks without network.
+
+    The 'query' of a table describes the file it is read from, including its
+    modification time, so a snapshot is reloaded when the files change.
+    """
+
+    name = 'local'
+
+    def __init__(self, path=DATA_SOURCE_PATH):
+        self.path = path
+        self.is_duckdb = path.endswith('.duckdb')
+
+    def connect(self):
+        pass
+
+    def _table_file(self, table_name):
+        for file_format in LOCAL_FORMATS:
+            file_path = os.path.join(self.path, f'{table_name}.{file_format}')
+            if os.path.exists(file_path):
+                return file_path, file_format
+        raise FileNotFoundError(f"No {' or '.join(LOCAL_FORMATS)} file for table {table_name} in {self.path}")
+
+    def _duckdb_query(self, table_name):
+        columns = ', '.join(f'"{column}"' for column in TABLE_SCHEMAS[table_name]['columns'])
+        return f'SELECT {columns} FROM "{table_name}"'
+
+    def queries(self):
+        if self.is_duckdb:
+            modified = os.stat(self.path).st_mtime_ns if os.path.exists(self.path) else None
+            return {name: f'{self._duckdb_query(name)} -- {self.path} {modified}' for name in TABLE_SCHEMAS}
+
+        queries = {}
+        for name in TABLE_SCHEMAS:
+            try:
+                file_path, _ = self._table_file(name)
+                queries[name] = f'{file_path} {os.stat(file_path).st_mtime_ns}'
+            except FileNotFoundError:
+                queries[name] = f'{self.path}/{name} missing'
+        return queries
+
+    def load(self, queries):
+        if self.is_duckdb:
+            return self._load_duckdb(queries)
+
+        tables = {}
+        for name in queries:
+            file_path, file_format = self._table_file(name)
+            columns = list(TABLE_SCHEMAS[name]['columns'])
+            if file_format == 'parquet':
+                df = pd.read_parquet(file_path, columns=columns)
+            else:
+                df = pd.read_csv(file_path, usecols=columns)
+                # Dates as datetime.date objects, as they come from BigQuery and Parquet
+                for column, kind in TABLE_SCHEMAS[name]['columns'].items():
+                    if kind == 'date':
+                        df[column] = pd.to_datetime(df[column]).dt.date
+            print(f"Read {name}: {len(df)} rows from {file_path}")
+            tables[name] = df
+        return tables
+
+    def _load_duckdb(self, queries):
+        try:
+            import duckdb
+        except ImportError:
+            raise RuntimeError('the duckdb package is needed to read a .duckdb data source')
+
+        connection = duckdb.connect(self.path, read_only=True)
+        try:
+            tables = {name: connection.execute(self._duckdb_query(name)).df() for name in queries}
+        finally:
+            connection.close()
+        for name, df in tables.items():
+            print(f"Read {name}: {len(df)} rows from {self.path}")
+        return tables
+
+
+def write_local_tables(tables, path, file_format='parquet'):
+    """
+    Write tables as the files of a local data source, one <table>.<file_format> per table.
+    """
+    os.makedirs(path, exist_ok=True)
+    for name, df in tables.items():
+        file_path = os.path.join(path, f'{name}.{file_format}')
+        if file_format == 'parquet':
+            df.to_parquet(file_path, index=False)
+        else:
+            df.to_csv(file_path, index=False)
+
+
+DATA_SOURCES = {
+    'bigquery': BigQuerySource,
+    'local': LocalSource,
+}
+
+
+def create_data_source(name=DATA_SOURCE):
+    if name not in DATA_SOURCES:
+        raise ValueError(f"Unknown DATA_SOURCE {name!r}, expected one of {list(DATA_SOURCES)}")
+    print(f"Data source: {name}")
+    return DATA_SOURCES[name]()
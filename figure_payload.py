@@ -0,0 +1,210 @@
+# figure_payload.py
+
+# Plotly figures are sent to the browser as JSON inside the tab content. A figure built
+# with plotly.py carries the whole default template (styles for every trace type and
+# subplot kind) and float64 arrays printed with 17 digits. Before a rendered tab is
+# cached, its figures are reduced to what the browser needs to draw the same chart.
+#
+# The Plotly.js bundled with Dash 2.11 (2.24) can not decode base64 typed arrays, so
+# numeric arrays stay JSON numbers, in their shortest form.
+
+import os
+import re
+
+import numpy as np
+import plotly.graph_objs as go
+from dash import dcc
+
+
+# Decimals numeric trace arrays are rounded to, empty to send them unrounded
+FIGURE_FLOAT_DECIMALS = os.getenv('FIGURE_FLOAT_DECIMALS', '4')
+FIGURE_FLOAT_DECIMALS = int(FIGURE_FLOAT_DECIMALS) if FIGURE_FLOAT_DECIMALS else None
+
+# Template layout entries that style a kind of subplot, and the trace types drawn on it
+SUBPLOT_TRACE_TYPES = {
+    'polar': {'scatterpolar', 'scatterpolargl', 'barpolar'},
+    'ternary': {'scatterternary'},
+    'scene': {'scatter3d', 'surface', 'mesh3d', 'cone', 'streamtube', 'volume', 'isosurface'},
+    'geo': {'scattergeo', 'choropleth'},
+    'mapbox': {'scattermapbox', 'choroplethmapbox', 'densitymapbox'},
+}
+
+# Trace types that color by a colorscale without a color array
+COLORSCALE_TRACE_TYPES = {
+    'heatmap', 'heatmapgl', 'contour', 'contourcarpet', 'histogram2d', 'histogram2dcontour',
+    'surface', 'mesh3d', 'choropleth', 'choroplethmapbox', 'densitymapbox', 'parcoords',
+}
+
+# Trace properties that are set to the value Plotly.js uses when they are missing
+TRACE_DEFAULTS = {'xaxis': 'x', 'yaxis': 'y', 'visible': True}
+
+# Style properties that take one value or one value per point
+STYLE_PROPERTIES = {'marker', 'line', 'textfont'}
+PER_POINT_STYLES = {'color', 'size', 'symbol', 'opacity'}
+
+
+def _template_remainder(value, targets):
+    """
+    The part of a template value that still applies, given the values the figure sets
+    where the template value applies (e.g. on each x axis), None where it sets nothing.
+
+    Returns:
+        The remaining template value, None if the figure sets all of it itself.
+    """
+    if not targets or any(target is None for target in targets):
+        return value
+    if not isinstance(value, dict):
+        return None
+    if not all(isinstance(target, dict) for target in targets):
+        return value
+
+    remainder = {}
+    for key, nested in value.items():
+        nested = _template_remainder(nested, [target.get(key) for target in targets])
+        if nested is not None:
+            remainder[key] = nested
+    return remainder or None
+
+
+def _uses_colorscale(figure):
+    if 'coloraxis' in figure['layout']:
+        return True
+    for trace in figure['data']:
+        if trace.get('type', 'scatter') in COLORSCALE_TRACE_TYPES:
+            return True
+        for style in ('marker', 'line'):
+            color = trace.get(style, {}).get('color') if isinstance(trace.get(style), dict) else None
+            if isinstance(color, np.ndarray) and color.dtype.kind in 'iuf':
+                return True
+            if isinstance(color, (list, tuple)) and color and isinstance(color[0], (int, float)):
+                return True
+    return False
+
+
+def prune_template(figure):
+    """
+    Keep only the parts of the figure template that can change how the figure is drawn.
+
+    Dropped are the trace styles of trace types the figure does not have, the styles
+    of subplot kinds it does not use, colorscales it does not color by and every value
+    the figure layout sets itself.
+    """
+    layout = figure['layout']
+    template = layout.get('template')
+    if not template:
+        return figure
+
+    trace_types = {trace.get('type', 'scatter') for trace in figure['data']}
+    template_data = {
+        trace_type: styles for trace_type, styles in template.get('data', {}).items() if trace_type in trace_types
+    }
+
+    template_layout = {}
+    for key, value in template.get('layout', {}).items():
+        subplot_types = SUBPLOT_TRACE_TYPES.get(key)
+        if subplot_types is not None and key not in layout and not trace_types & subplot_types:
+            continue
+        if key in ('colorscale', 'coloraxis') and not _uses_colorscale(figure):
+            continue
+        if key == 'shapedefaults' and not layout.get('shapes'):
+            continue
+        if key == 'annotationdefaults' and not layout.get('annotations'):
+            continue
+        template_layout[key] = value
+
+    # Axis templates apply to every axis of their kind (xaxis, xaxis2, ...)
+    axes = {key: [axis for name, axis in layout.items() if re.fullmatch(key + r'\d*', name)] for key in ('xaxis', 'yaxis')}
+    template_layout = {
+        key: remainder for key, remainder in (
+            (key, _template_remainder(value, axes[key] if key in axes else [layout.get(key)]))
+            for key, value in template_layout.items()
+        ) if remainder is not None
+    }
+
+    layout['template'] = {}
+    if template_data:
+        layout['template']['data'] = template_data
+    if template_layout:
+        layout['template']['layout'] = template_layout
+    return figure
+
+
+def compact_array(values, decimals=FIGURE_FLOAT_DECIMALS):
+    """
+    A numeric array in its shortest JSON form: whole numbers as integers, other
+    values rounded to decimals. Other arrays are returned unchanged.
+    """
+    if isinstance(values, (list, tuple)):
+        if not values or not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+            return values
+        values = np.asarray(values, dtype='float64')
+    if not isinstance(values, np.ndarray) or values.dtype.kind != 'f':
+        return values
+
+    if decimals is not None:
+        values = np.round(values, decimals)
+    finite = np.isfinite(values)
+    if finite.all() and np.array_equal(values, np.trunc(values)) and np.abs(values).max(initial=0) < 2 ** 53:
+        return values.astype(np.int64)
+    return values
+
+
+def _compact_trace(trace):
+    compacted = {}
+    for key, value in trace.items():
+        if isinstance(value, (str, bool)) and key in TRACE_DEFAULTS and TRACE_DEFAULTS[key] == value:
+            continue
+        if key in STYLE_PROPERTIES and isinstance(value, dict):
+            value = dict(value)
+            for style, style_value in value.items():
+                # A style given per point that is the same for every point is sent once
+                if style in PER_POINT_STYLES and isinstance(style_value, (list, tuple, np.ndarray)) and len(style_value) \
+                        and isinstance(style_value[0], str) and all(item == style_value[0] for item in style_value):
+                    value[style] = style_value[0]
+                else:
+                    value[style] = compact_array(style_value)
+        elif key != 'customdata':
+            value = compact_array(value)
+        compacted[key] = value
+    return compacted
+
+
+def compact_figure(figure):
+    """
+    Reduce a figure to the data, layout and template entries needed to draw it.
+
+    Parameters:
+        figure: go.Figure or figure dict.
+
+    Returns:
+        Figure dict.
+    """
+    if isinstance(figure, go.Figure):
+        figure = figure.to_plotly_json()
+    else:
+        figure = dict(figure)
+    figure['data'] = [_compact_trace(trace) for trace in figure.get('data', [])]
+    figure['layout'] = dict(figure.get('layout', {}))
+    return prune_template(figure)
+
+
+def compact_figures(component):
+    """
+    Compact the figures of every dcc.Graph in a component tree, in place.
+
+    Returns:
+        The component.
+    """
+    if isinstance(component, dcc.Graph):
+        figure = getattr(component, 'figure', None)
+        if figure is not None:
+            component.figure = compact_figure(figure)
+        return component
+
+    children = getattr(component, 'children', None)
+    if isinstance(children, (list, tuple)):
+        for child in children:
+            compact_figures(child)
+    elif children is not None and not isinstance(children, (str, int, float)):
+        compact_figures(children)
+    return component
@@ -0,0 +1,122 @@
+# form.py
+
+import numpy as np
+import pandas as pd
+
+
+# Results are encoded as small integer symbols. 0 ends a sequence, unknown results get
+# their own symbol so they keep their (empty) slot like in the original icon mapping.
+RESULT_ICONS = {
+    'win': '<span class="square-icon win">W</span>',
+    'draw': '<span class="square-icon draw">T</span>',
+    'lost': '<span class="square-icon loss">L</span>',
+    'ot win': '<span class="square-icon ot-win">T</span>',
+    'ot loss': '<span class="square-icon ot-loss">T</span>',
+}
+RESULT_SYMBOLS = {result: symbol for symbol, result in enumerate(RESULT_ICONS, start=1)}
+UNKNOWN_SYMBOL = len(RESULT_ICONS) + 1
+SYMBOL_ICONS = [''] + list(RESULT_ICONS.values()) + ['']
+
+BASE = UNKNOWN_SYMBOL + 1
+FORM_LENGTH = 5
+
+
+def encode_form(results):
+    """
+    Encode a list of results (oldest first, at most FORM_LENGTH) as one integer code.
+    """
+    code = 0
+    for result in results:
+        code = code * BASE + RESULT_SYMBOLS.get(result, UNKNOWN_SYMBOL)
+    return code
+
+
+def _decode_icons(code):
+    icons = []
+    while code:
+        code, symbol = divmod(code, BASE)
+        icons.append(SYMBOL_ICONS[symbol])
+    return ' '.join(reversed(icons))
+
+
+FORM_ICON_TABLE = np.array([_decode_icons(code) for code in range(BASE ** FORM_LENGTH)], dtype=object)
+
+
+# Function to map results to icons
+def map_results_to_icons(results):
+    """
+    Map a comma separated string of results to icon HTML.
+
+    Sequences are looked up in FORM_ICON_TABLE, longer ones in chunks of FORM_LENGTH.
+    """
+    if not results:
+        return ''
+
+    results_list = results.split(',')
+
+    return ' '.join(
+        FORM_ICON_TABLE[encode_form(results_list[i:i + FORM_LENGTH])]
+        for i in range(0, len(results_list), FORM_LENGTH)
+    )
+
+
+def icons_from_strings(results):
+    """
+    Map a Series of comma separated result strings to icon HTML.
+
+    Each distinct string is mapped once and the icons are taken from the
+    distinct values, since a few thousand sequences cover every row.
+    """
+    codes, uniques = pd.factorize(results)
+    unique_icons = np.array([map_results_to_icons(value) for value in uniques] + [''], dtype=object)
+    # Missing values get code -1, i.e. the trailing empty icon
+    return pd.Series(unique_icons[codes], index=results.index)
+
+
+def last_results(df_games, n=5):
+    """
+    Results of each team's last n games as a comma separated string, oldest first.
+
+    The window is taken per team, so it never reaches into another team's games.
+
+    Parameters:
+        df_games: Games sorted by date within each team.
+        n: Number of games in the window.
+
+    Returns:
+        Series indexed by team.
+    """
+    position_from_end = df_games.groupby('team', sort=False).cumcount(ascending=False)
+    df_last = df_games.loc[position_from_end < n, ['team', 'result_details']]
+    return df_last['result_details'].fillna('').groupby(df_last['team']).agg(','.join)
+
+
+def last_form_icons(df_games, n=FORM_LENGTH):
+    """
+    Icon HTML of each team's last n (at most FORM_LENGTH) games, oldest first.
+
+    Each result contributes its symbol times BASE ** (position from the end), so
+    a grouped sum gives the form code of every team, which is then a table lookup.
+
+    Parameters:
+        df_games: Games sorted by date within each team.
+        n: Number of games in the window.
+
+    Returns:
+        Series indexed by team.
+    """
+    if n > FORM_LENGTH:
+        return last_results(df_games, n).map(map_results_to_icons)
+
+    team_codes, teams = pd.factorize(df_games['team'], sort=True)
+    position_from_end = df_games.groupby('team', sort=False).cumcount(ascending=False).to_numpy()
+    in_window = position_from_end < n
+
+    result_codes, result_uniques = pd.factorize(df_games['result_details'])
+    unique_symbols = np.array([RESULT_SYMBOLS.get(result, UNKNOWN_SYMBOL) for result in result_uniques] + [UNKNOWN_SYMBOL])
+    symbols = unique_symbols[result_codes]
+
+    weights = np.where(in_window, symbols * BASE ** np.minimum(position_from_end, n), 0)
+    form_codes = np.bincount(team_codes, weights=weights, minlength=len(teams)).astype(np.int64)
+
+    return pd.Series(FORM_ICON_TABLE[form_codes], index=pd.Index(teams, name='team'))
@@ -0,0 +1,29 @@
+# gunicorn.conf.py
+
+# The app is imported once in the master, which loads the tables and builds the derived
+# structures, and the workers are forked from it. The tables are then shared copy-on-write
+# instead of being queried and held once per worker.
+
+import gc
+import os
+
+# Read by app.py, which then starts the refresher thread in the workers instead of the master
+os.environ['PRELOAD_FORK'] = '1'
+# The BigQuery Storage downloads use gRPC, which needs fork support enabled when the master forks
+os.environ.setdefault('GRPC_ENABLE_FORK_SUPPORT', '1')
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+preload_app = True
+
+
+def pre_fork(server, worker):
+    # Move the loaded objects out of the collector's generations, so garbage collection
+    # in the workers does not write to (and thereby copy) the shared pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import app
+    app.after_fork()
+    server.log.info(f"Worker {worker.pid} forked with dataset {app.current_dataset().version}")
@@ -0,0 +1,128 @@
+# point_distribution.py
+
+import numpy as np
+import pandas as pd
+
+from data_index import games_index
+from table_schema import decategorize
+
+
+# Position cut lines shown in the Point Distribution table, k -> what the line is used for
+TOP_K_LIMITS = {
+    6: 'e.g. to reach playoff',
+    12: 'e.g. to avoid relegation',
+}
+
+# (league, season) pairs left out, as the number of teams differed and the metrics are not comparable
+EXCLUDED_SEASONS = [('shl', '2014/15')]
+
+GROUP_COLUMNS = ['league', 'matchday', 'season']
+
+
+class PointDistributionCube:
+    """
+    Cumulative points of every team per (league, matchday, season), sorted in descending order.
+
+    Statistics are computed for all groups at once from the sorted points, so
+    order statistics such as the top-k cut lines or percentiles for any k need
+    no new scan of the games table.
+    """
+
+    def __init__(self, df_team_games):
+        df = df_team_games[df_team_games['result'].notna().to_numpy(dtype=bool)]
+        df = decategorize(df[GROUP_COLUMNS + ['points_cum']].reset_index(drop=True))
+        for league, season in EXCLUDED_SEASONS:
+            df = df[~((df['league'] == league) & (df['season'] == season))]
+        df = df[df['points_cum'].notna()]
+
+        grouped = df.groupby(GROUP_COLUMNS, sort=True)
+        group_codes = grouped.ngroup().to_numpy()
+        sizes = grouped.size()
+        points = df['points_cum'].to_numpy(dtype='float64')
+
+        # Standard deviation in one grouped pass, over the points in table order like a groupby on the games
+        self._std = pd.Series(points).groupby(group_codes).std().reindex(range(len(sizes))).to_numpy()
+
+        order = np.lexsort((-points, group_codes))
+        self.points = points[order]
+        self.sizes = sizes.to_numpy()
+        self.starts = np.cumsum(self.sizes) - self.sizes
+        self.keys = sizes.index
+
+        # Group positions of each (league, matchday), in season order
+        self._groups = {}
+        for group, (league, matchday, _) in enumerate(self.keys):
+            self._groups.setdefault((league, matchday), []).append(group)
+
+        self._summaries = {}
+
+    def nth_largest(self, n):
+        """
+        The n-th largest value (1-based) of every group, NaN where a group has fewer than n values.
+        """
+        valid = self.sizes >= n
+        positions = np.where(valid, self.starts + n - 1, 0)
+        return np.where(valid, self.points[positions], np.nan) if len(self.points) else np.full(len(self.sizes), np.nan)
+
+    def percentile(self, q):
+        """
+        The q-th percentile (0-100, linear interpolation) of every group.
+        """
+        # Points are sorted descending, so the rank from the top is taken from the end of the group
+        rank = (self.sizes - 1) * (1 - q / 100)
+        lower = np.floor(rank).astype(np.int64)
+        upper = np.ceil(rank).astype(np.int64)
+        fraction = rank - lower
+        return self.points[self.starts + lower] * (1 - fraction) + self.points[self.starts + upper] * fraction
+
+    def summary(self, top_k=tuple(TOP_K_LIMITS)):
+        """
+        Min, max, max-min difference, median, standard deviation and top-k cut lines of every group.
+
+        Returns:
+            DataFrame indexed by (league, matchday, season).
+        """
+        top_k = tuple(top_k)
+        if top_k in self._summaries:
+            return self._summaries[top_k]
+
+        maximum = self.points[self.starts]
+        minimum = self.points[self.starts + self.sizes - 1]
+
+        summary = {
+            'min': minimum.astype(np.int64),
+            'max': maximum.astype(np.int64),
+            'max_min_diff': (maximum - minimum).astype(np.int64),
+            'median': self.percentile(50),
+            'std': self._std,
+        }
+        for k in top_k:
+            summary[f'top_{k}_limit'] = self.nth_largest(k)
+
+        self._summaries[top_k] = pd.DataFrame(summary, index=self.keys)
+        return self._summaries[top_k]
+
+    def stats(self, league, matchday, top_k=tuple(TOP_K_LIMITS)):
+        """
+        Statistics of every season at one league and matchday, one row per season.
+        """
+        groups = self._groups.get((league, matchday), [])
+        df_stats = self.summary(top_k).iloc[groups]
+        df_stats = df_stats.reset_index(level=['league', 'matchday'], drop=True).reset_index()
+        return whole_number_limits(df_stats, top_k)
+
+
+def whole_number_limits(df_stats, top_k=tuple(TOP_K_LIMITS)):
+    # Top-k lines are whole numbers, unless a season has fewer than k teams
+    for k in top_k:
+        column = f'top_{k}_limit'
+        if df_stats[column].notna().all():
+            df_stats[column] = df_stats[column].astype(np.int64)
+    return df_stats
+
+
+def point_distribution(dataset):
+    return dataset.derived(
+        'point_distribution',
+        lambda ds: PointDistributionCube(games_index(ds).columns(GROUP_COLUMNS + ['result', 'points_cum'])),
+    )
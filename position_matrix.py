@@ -0,0 +1,114 @@
+# position_matrix.py
+
+import numpy as np
+import pandas as pd
+
+from data_index import games_index
+from table_schema import decategorize
+
+
+# Metric -> whether its values are whole numbers (and are returned as integers)
+METRICS = {
+    'table_position': True,
+    'points_cum': True,
+    'avg_points': False,
+}
+
+
+class PositionMatrix:
+    """
+    Dense team x matchday arrays of table position, cumulative points and average
+    points for one league and season.
+
+    Only played games before the first matchday with an unplayed game are kept,
+    so every team has the same completed matchdays. Teams are sorted by name and
+    matchdays ascending. Missing (team, matchday) cells are NaN.
+    """
+
+    def __init__(self, df_season):
+        df_season = decategorize(df_season)
+
+        # Min matchday where we have non played games, 100 if there is none
+        matchday_not_finished = df_season.loc[df_season['game_id'].isna(), 'matchday'].min()
+        if pd.isnull(matchday_not_finished):
+            matchday_not_finished = 100
+
+        played = df_season['game_id'].notna() & (df_season['matchday'] < matchday_not_finished)
+        df_played = df_season[played.fillna(False).to_numpy(dtype=bool)]
+
+        team_codes, teams = pd.factorize(df_played['team'], sort=True)
+        matchday_codes, matchdays = pd.factorize(df_played['matchday'].astype('int64'), sort=True)
+        self.teams = list(teams)
+        self.matchdays = np.asarray(matchdays, dtype=np.int64)
+        self._team_rows = {team: row for row, team in enumerate(self.teams)}
+        self._matchday_columns = {matchday: column for column, matchday in enumerate(self.matchdays.tolist())}
+
+        shape = (len(self.teams), len(self.matchdays))
+        self.values = {}
+        for metric in ('table_position', 'points_cum'):
+            matrix = np.full(shape, np.nan)
+            matrix[team_codes, matchday_codes] = df_played[metric].to_numpy(dtype='float64', na_value=np.nan)
+            self.values[metric] = matrix
+        self.values['avg_points'] = self.values['points_cum'] / self.matchdays
+
+        # Column of each team's last value, for the end-of-line labels
+        played_cells = ~np.isnan(self.values['points_cum'])
+        self._last_column = shape[1] - 1 - np.argmax(played_cells[:, ::-1], axis=1) if shape[1] else np.zeros(0, dtype=int)
+
+    def value(self, team, matchday, metric='table_position'):
+        """
+        Value of metric for team after matchday, or None if it has not been played.
+        """
+        row = self._team_rows.get(team)
+        column = self._matchday_columns.get(matchday)
+        if row is None or column is None:
+            return None
+        value = self.values[metric][row, column]
+        if np.isnan(value):
+            return None
+        return int(value) if METRICS[metric] else float(value)
+
+    def position(self, team, matchday):
+        return self.value(team, matchday, 'table_position')
+
+    def series(self, metric):
+        """
+        Yield (team, matchdays, values) per team, skipping matchdays without a value.
+        """
+        matrix = self.values[metric]
+        for row, team in enumerate(self.teams):
+            has_value = ~np.isnan(matrix[row])
+            values = matrix[row, has_value]
+            yield team, self.matchdays[has_value], values.astype(np.int64) if METRICS[metric] else values
+
+    def last_values(self, metric):
+        """
+        Each team's value at its last played matchday, in team order.
+        """
+        values = self.values[metric][np.arange(len(self.teams)), self._last_column]
+        return values.astype(np.int64) if METRICS[metric] else values
+
+    def max_value(self, metric):
+        if not self.teams:
+            return np.nan
+        value = np.nanmax(self.values[metric])
+        return int(value) if METRICS[metric] else value
+
+    def max_matchday(self):
+        return int(self.matchdays.max()) if len(self.matchdays) else np.nan
+
+
+def position_matrix(dataset, league, season):
+    """
+    PositionMatrix of a league and season, built once per dataset version.
+
+    Pairs without games get an empty matrix that is not kept, so requests for
+    arbitrary pairs do not grow the dataset cache.
+    """
+    index = games_index(dataset)
+    if not index.has_league_season(league, season):
+        return PositionMatrix(index.league_season(None, None))
+    return dataset.derived(
+        ('position_matrix', league, season),
+        lambda ds: PositionMatrix(games_index(ds).league_season(league, season)),
+    )
@@ -0,0 +1,47 @@
+# response_compression.py
+
+# gzip compression of the JSON responses of the Dash endpoints (callback results, layout
+# and dependencies), which compress 5-15x. Static assets and component bundles are left
+# to the reverse proxy or CDN in front of the app. Behind a proxy that compresses itself,
+# set RESPONSE_COMPRESSION_LEVEL=0.
+
+import gzip
+import os
+
+
+RESPONSE_COMPRESSION_LEVEL = int(os.getenv('RESPONSE_COMPRESSION_LEVEL', '6'))
+# Smaller responses are sent as they are, the gzip header and latency are not worth it
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv('RESPONSE_COMPRESSION_MIN_BYTES', '1024'))
+
+COMPRESSED_ENDPOINTS = ('/_dash-update-component', '/_dash-layout', '/_dash-dependencies')
+
+
+def accepts_gzip(request):
+    return 'gzip' in request.headers.get('Accept-Encoding', '').lower()
+
+
+def compress_response(response, request, level=RESPONSE_COMPRESSION_LEVEL, min_bytes=RESPONSE_COMPRESSION_MIN_BYTES):
+    """
+    gzip the body of a response in place, if the client accepts it and it is worth it.
+
+    Streamed and already encoded responses are left unchanged.
+
+    Returns:
+        True if the response was compressed.
+    """
+    if level <= 0 or response.status_code != 200 or response.direct_passthrough or response.is_streamed:
+        return False
+    if 'Content-Encoding' in response.headers:
+        return False
+
+    response.vary.add('Accept-Encoding')
+    if not accepts_gzip(request):
+        return False
+
+    data = response.get_data()
+    if len(data) < min_bytes:
+        return False
+
+    response.set_data(gzip.compress(data, compresslevel=level))
+    response.headers['Content-Encoding'] = 'gzip'
+    return True
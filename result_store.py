@@ -0,0 +1,91 @@
+# result_store.py
+
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+RESULT_STORE_SIZE = int(os.getenv('RESULT_STORE_SIZE', '128'))
+RENDER_CACHE_SIZE = int(os.getenv('RENDER_CACHE_SIZE', '256'))
+
+
+def store_key(name, version, **params):
+    """
+    Build the small JSON-serializable key that is kept in a dcc.Store.
+
+    The key holds everything needed to recompute the result, so a callback
+    served by another worker (or after eviction) can rebuild it.
+    """
+    return {'name': name, 'version': version, 'params': params}
+
+
+class ResultStore:
+    """
+    Bounded LRU of server-side callback results, keyed by store_key() dicts.
+
+    Callbacks keep only the key in the browser and share the frames here,
+    which avoids serializing whole tables to JSON on every interaction. The
+    same class caches rendered tab content, keyed on the tab inputs.
+    """
+
+    def __init__(self, max_entries=RESULT_STORE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _token(key):
+        return json.dumps(key, sort_keys=True, default=str)
+
+    def put(self, key, value):
+        token = self._token(key)
+        with self._lock:
+            self._entries[token] = value
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return key
+
+    def get(self, key):
+        token = self._token(key)
+        with self._lock:
+            value = self._entries.get(token)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(token)
+            return value
+
+    def get_or_compute(self, key, compute_fn):
+        """
+        Return the stored result for key, computing and storing it on a miss.
+        """
+        value = self.get(key)
+        if value is None:
+            value = compute_fn()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+        }
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,296 @@
+# sql_engine.py
+
+# Query engine for the heavier tab aggregations, chosen with QUERY_ENGINE:
+#   pandas  The aggregations run on the pandas frames of the dataset (default).
+#   duckdb  The dashboard tables are stored once per data version in a DuckDB database
+#           file next to the Arrow files, and the Table standings, the Point Distribution
+#           statistics and the Team Comparison pivot run on it as parameterized, multi-threaded
+#           columnar queries. Needs the duckdb package.
+#
+# Both engines return the same frames, so the tab builders do not know which one ran
+# and the timings of the two can be compared (see benchmark.py --engine).
+
+import glob
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from data_snapshot import SNAPSHOT_DIR, snapshot_lock
+from form import icons_from_strings, FORM_LENGTH
+from point_distribution import EXCLUDED_SEASONS, TOP_K_LIMITS, whole_number_limits
+from standings import Standings, SOURCE_COLUMNS
+from table_schema import TABLE_SCHEMAS
+
+
+QUERY_ENGINE = os.getenv('QUERY_ENGINE', 'pandas')
+# Threads per query, 0 lets DuckDB use one per core
+QUERY_THREADS = int(os.getenv('QUERY_THREADS', '0'))
+
+QUERY_ENGINES = ['pandas', 'duckdb']
+
+DUCKDB_FILE = 'dataset-{version}.duckdb'
+DUCKDB_LOCK_FILE = 'duckdb.lock'
+# Database files kept, the newest first, so a worker still serving the previous version can open it
+DUCKDB_FILES_KEPT = 2
+
+# Row order of the stored tables. Rows of a league and season are stored together, so the
+# per row group min/max of these columns lets a query skip the row groups of other leagues
+TABLE_ORDER = {
+    'team_games': ['league', 'season', 'team', 'date'],
+    'team_season_metrics': ['league', 'season', 'team'],
+}
+
+# Team Comparison metrics, the numeric columns the tab reads from team_season_metrics
+COMPARISON_METRICS = [
+    column for column in TABLE_SCHEMAS['team_season_metrics']['used_by']['tab-6']
+    if TABLE_SCHEMAS['team_season_metrics']['columns'][column] in ('int', 'float')
+]
+
+
+def resolve_query_engine(name=QUERY_ENGINE):
+    """
+    The query engine to use, pandas when duckdb is asked for but not installed.
+    """
+    if name not in QUERY_ENGINES:
+        raise ValueError(f"Unknown QUERY_ENGINE {name!r}, expected one of {QUERY_ENGINES}")
+    if name == 'duckdb':
+        try:
+            import duckdb  # noqa: F401
+        except ImportError:
+            print("Error initializing query engine duckdb: the duckdb package is not installed, using pandas")
+            return 'pandas'
+    print(f"Query engine: {name}")
+    return name
+
+
+# Queries, one per tab. Request values are bound as positional parameters ($1, ...), never formatted into the SQL
+
+# Table: per team sums and non-null counts of the standings columns over the games of a
+# league and season, optionally only home or away games and only the last $4 games
+# (NULL for all), with the results of the last FORM_LENGTH of them, oldest first
+TABLE_STANDINGS_SQL = """
+WITH games AS (
+    SELECT
+        team, date, result_details, {columns},
+        row_number() OVER (PARTITION BY team ORDER BY date DESC) AS position_from_end
+    FROM team_games
+    WHERE league = $1 AND season = $2 AND game_id IS NOT NULL AND ($3 = 'total' OR h_a = $3)
+)
+SELECT
+    team,
+    {totals},
+    count(*)::DOUBLE AS games,
+    string_agg(coalesce(result_details, ''), ',' ORDER BY date) FILTER (WHERE position_from_end <= {form_length}) AS last_results
+FROM games
+WHERE position_from_end <= coalesce($4::BIGINT, position_from_end)
+GROUP BY team
+ORDER BY team
+""".format(
+    totals=',\n    '.join(
+        f'coalesce(sum({column}), 0)::DOUBLE AS {column}, count({column})::DOUBLE AS {column}_n'
+        for column in SOURCE_COLUMNS
+    ),
+    columns=', '.join(SOURCE_COLUMNS),
+    form_length=FORM_LENGTH,
+)
+
+# Point Distribution: statistics of the cumulative points per season at a league and matchday
+POINT_DISTRIBUTION_SQL = """
+WITH seasons AS (
+    SELECT
+        season,
+        min(points_cum) AS min,
+        max(points_cum) AS max,
+        quantile_cont(points_cum, 0.5) AS median,
+        stddev_samp(points_cum) AS std,
+        list(points_cum ORDER BY points_cum DESC) AS points
+    FROM team_games
+    WHERE league = $1 AND matchday = $2 AND result IS NOT NULL AND points_cum IS NOT NULL
+        AND NOT ({excluded})
+    GROUP BY season
+)
+SELECT
+    season,
+    min::BIGINT AS min,
+    max::BIGINT AS max,
+    (max - min)::BIGINT AS max_min_diff,
+    median::DOUBLE AS median,
+    std::DOUBLE AS std,
+    {top_k_limits}
+FROM seasons
+ORDER BY season
+""".format(
+    top_k_limits=',\n    '.join(f'points[{k}]::DOUBLE AS top_{k}_limit' for k in TOP_K_LIMITS),
+    excluded=' OR '.join(f"(league = '{league}' AND season = '{season}')" for league, season in EXCLUDED_SEASONS),
+)
+
+# Team Comparison: the metric $2 of every team and season of a league, with the row and
+# column of its cell in the team x season pivot
+TEAM_COMPARISON_SQL = """
+SELECT
+    dense_rank() OVER (ORDER BY team) - 1 AS row,
+    dense_rank() OVER (ORDER BY season) - 1 AS col,
+    team,
+    season,
+    CASE $2 {metrics} END::DOUBLE AS value
+FROM team_season_metrics
+WHERE league = $1
+""".format(
+    metrics=' '.join(f"WHEN '{metric}' THEN {metric}" for metric in COMPARISON_METRICS),
+)
+
+QUERIES = {
+    'table_standings': TABLE_STANDINGS_SQL,
+    'point_distribution': POINT_DISTRIBUTION_SQL,
+    'team_comparison': TEAM_COMPARISON_SQL,
+}
+
+
+def _table_columns(table, columns):
+    if isinstance(table, pd.DataFrame):
+        return table[columns]
+    return table.select(columns)
+
+
+def write_duckdb_dataset(dataset, directory=SNAPSHOT_DIR):
+    """
+    Write the schema columns of the dataset tables to the DuckDB database file of its version.
+
+    The file is written once per version, by the first process that needs it, and
+    only the newest DUCKDB_FILES_KEPT files are kept.
+
+    Returns:
+        Path of the database file.
+    """
+    import duckdb
+
+    path = os.path.join(directory, DUCKDB_FILE.format(version=dataset.version))
+    with snapshot_lock(directory, exclusive=True, lock_file=DUCKDB_LOCK_FILE):
+        if os.path.exists(path):
+            return path
+
+        # Written under a per-process name and renamed, so readers never see a partial file
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        connection = duckdb.connect(tmp_path)
+        try:
+            for name, schema in TABLE_SCHEMAS.items():
+                source = _table_columns(dataset.tables[name], list(schema['columns']))
+                connection.register('source', source)
+                order = ', '.join(TABLE_ORDER.get(name, [])) or 'ALL'
+                connection.execute(f'CREATE TABLE "{name}" AS SELECT * FROM source ORDER BY {order}')
+                connection.unregister('source')
+            connection.execute('CHECKPOINT')
+        finally:
+            connection.close()
+        os.replace(tmp_path, path)
+        print(f"Wrote DuckDB dataset {path}")
+
+        files = sorted(glob.glob(os.path.join(directory, DUCKDB_FILE.format(version='*'))), key=os.path.getmtime, reverse=True)
+        for file_path in files[DUCKDB_FILES_KEPT:]:
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+    return path
+
+
+class SqlEngine:
+    """
+    Queries on the DuckDB database file of one data version.
+
+    The database is opened read-only on first use in each process, since DuckDB
+    connections do not survive the fork of the preloaded gunicorn master. Every
+    thread takes a connection from a pool.
+    """
+
+    def __init__(self, dataset, directory=SNAPSHOT_DIR):
+        self.dataset = dataset
+        self.path = write_duckdb_dataset(dataset, directory)
+        self._database = None
+        self._pid = None
+        self._pool = queue.SimpleQueue()
+        self._lock = threading.Lock()
+
+    def _open(self):
+        import duckdb
+
+        with self._lock:
+            if self._pid != os.getpid():
+                config = {'threads': QUERY_THREADS} if QUERY_THREADS else {}
+                self._database = duckdb.connect(self.path, read_only=True, config=config)
+                self._pool = queue.SimpleQueue()
+                self._pid = os.getpid()
+            return self._database.cursor()
+
+    @contextmanager
+    def _connection(self):
+        try:
+            connection = None if self._pid != os.getpid() else self._pool.get_nowait()
+        except queue.Empty:
+            connection = None
+        if connection is None:
+            connection = self._open()
+        try:
+            yield connection
+        finally:
+            self._pool.put(connection)
+
+    def execute(self, query, *args):
+        """
+        Run a query of QUERIES with args bound to its parameters and return the result as a DataFrame.
+        """
+        with self._connection() as connection:
+            return connection.execute(QUERIES[query], [int(arg) if isinstance(arg, np.integer) else arg for arg in args]).df()
+
+    def standings(self, league, season, homeaway, last_games=None):
+        """
+        The Table tab standings, the same frame as the pandas path builds (see filter_table in app.py).
+
+        Parameters:
+            homeaway: 'total', 'home' or 'away'.
+            last_games: Only the last n games of each team, None for all games.
+        """
+        df_totals = self.execute('table_standings', league, season, homeaway, last_games).set_index('team')
+        df_standings = Standings.from_totals(df_totals.drop(columns='last_results')).table()
+        df_standings['last_5_icons'] = icons_from_strings(df_totals['last_results'])
+        return df_standings.reset_index()
+
+    def point_distribution_stats(self, league, matchday, top_k=tuple(TOP_K_LIMITS)):
+        """
+        Statistics of every season at one league and matchday, like PointDistributionCube.stats.
+        """
+        df_stats = self.execute('point_distribution', league, matchday)
+        return whole_number_limits(df_stats, top_k)
+
+    def team_season_pivot(self, league, metric):
+        """
+        The metric of every team (rows) and season (columns) of a league, teams and seasons sorted.
+
+        Returns:
+            DataFrame with a team column and one column per season, NaN where a team did not play.
+        """
+        if metric not in COMPARISON_METRICS:
+            raise KeyError(metric)
+        df_cells = self.execute('team_comparison', league, metric)
+
+        n_rows = int(df_cells['row'].max()) + 1 if len(df_cells) else 0
+        n_cols = int(df_cells['col'].max()) + 1 if len(df_cells) else 0
+        teams = np.empty(n_rows, dtype=object)
+        teams[df_cells['row'].to_numpy()] = df_cells['team'].to_numpy()
+        seasons = np.empty(n_cols, dtype=object)
+        seasons[df_cells['col'].to_numpy()] = df_cells['season'].to_numpy()
+
+        values = np.full((n_rows, n_cols), np.nan)
+        values[df_cells['row'].to_numpy(), df_cells['col'].to_numpy()] = df_cells['value'].to_numpy(dtype='float64', na_value=np.nan)
+
+        df_pivot = pd.DataFrame(values, columns=list(seasons))
+        df_pivot.insert(0, 'team', teams)
+        return df_pivot
+
+
+def sql_engine(dataset):
+    return dataset.derived('sql_engine', lambda ds: SqlEngine(ds))
@@ -0,0 +1,115 @@
+# standings.py
+
+import numpy as np
+import pandas as pd
+
+
+# Standings column -> games table column that is summed
+SUM_COLUMNS = {
+    'points': 'points',
+    'win': 'win',
+    'lost': 'lost',
+    'draw': 'draw',
+    'ot_win': 'ot_win',
+    'ot_loss': 'ot_lost',
+    'scored': 'score_team',
+    'conceded': 'score_opponent',
+}
+
+# Standings column -> games table column that is averaged over its non-null values
+MEAN_COLUMNS = {
+    'avg_points': 'points',
+    'avg_points_pregame_ahead': 'points_ahead_pregame',
+    'avg_points_pregame_behind': 'points_behind_pregame',
+    'avg_scored': 'score_team',
+    'avg_conceded': 'score_opponent',
+    'avg_goals_game': 'goals_game',
+}
+
+# Games table columns the standings are built from. Per team, each one is kept as its
+# sum (<column>) and number of non-null values (<column>_n), plus the number of games
+SOURCE_COLUMNS = list(dict.fromkeys(list(SUM_COLUMNS.values()) + list(MEAN_COLUMNS.values())))
+
+
+def _partial_totals(df_games):
+    # Sums and non-null counts per team in one pass, mergeable with other partials
+    codes, teams = pd.factorize(df_games['team'], sort=True)
+    n_teams = len(teams)
+
+    values = df_games[SOURCE_COLUMNS].to_numpy(dtype='float64', na_value=np.nan)
+    notna = ~np.isnan(values)
+    values = np.where(notna, values, 0.0)
+
+    totals = {}
+    for j, column in enumerate(SOURCE_COLUMNS):
+        totals[column] = np.bincount(codes, weights=values[:, j], minlength=n_teams)
+        totals[column + '_n'] = np.bincount(codes, weights=notna[:, j], minlength=n_teams)
+    totals['games'] = np.bincount(codes, minlength=n_teams).astype('float64')
+
+    return pd.DataFrame(totals, index=pd.Index(teams, name='team'))
+
+
+class Standings:
+    """
+    Standings accumulated from games, one row per team.
+
+    Games can be added in batches (e.g. as new matchdays arrive). Only sums
+    and counts are kept, so adding games never rescans earlier ones.
+    """
+
+    def __init__(self, df_games=None):
+        self._totals = None
+        if df_games is not None:
+            self.add_games(df_games)
+
+    def add_games(self, df_games):
+        partial = _partial_totals(df_games)
+        if self._totals is None:
+            self._totals = partial
+        else:
+            self._totals = self._totals.add(partial, fill_value=0)
+        return self
+
+    @classmethod
+    def from_totals(cls, totals):
+        """
+        Standings from sums and counts aggregated elsewhere, e.g. by a SQL query.
+
+        Parameters:
+            totals: DataFrame indexed by team, with the sum and non-null count of every
+                column in SOURCE_COLUMNS and the number of games.
+        """
+        standings = cls()
+        standings._totals = totals
+        return standings
+
+    def table(self):
+        """
+        Return the standings with the same columns as the Table tab expects.
+
+        Averages are rounded to two decimals and 0 when a team has no values.
+        """
+        if self._totals is None:
+            self._totals = _partial_totals(pd.DataFrame(columns=['team'] + SOURCE_COLUMNS))
+
+        totals = self._totals.sort_index()
+
+        table = {column: totals[source].to_numpy().astype('int64') for column, source in SUM_COLUMNS.items()}
+        table['games'] = totals['games'].to_numpy().astype('int64')
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for column, source in MEAN_COLUMNS.items():
+                averages = np.round(totals[source].to_numpy() / totals[source + '_n'].to_numpy(), 2)
+                table[column] = np.where(np.isnan(averages), 0.0, averages)
+
+        table['goal_difference'] = table['scored'] - table['conceded']
+        table['goal_difference_txt'] = [
+            f'{scored}-{conceded} ({difference})'
+            for scored, conceded, difference in zip(table['scored'], table['conceded'], table['goal_difference'])
+        ]
+
+        return pd.DataFrame(table, index=totals.index)
+
+
+def compute_standings(df_games):
+    return Standings(df_games).table()
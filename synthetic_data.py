@@ -0,0 +1,279 @@
+# synthetic_data.py
+
+# Deterministic synthetic versions of the six dashboard tables, matching the columns
+# and types in table_schema.py, for benchmarks and for running the app without
+# BigQuery (as a local data source, see data_sources.py). Every league plays a home and away round robin each season, the last
+# matchdays of the current season are left unplayed.
+
+import argparse
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from table_schema import TABLE_SCHEMAS, validate_tables
+
+
+# The first leagues get the names the layout and the league colors expect
+LEAGUE_NAMES = ['shl', 'allsvenskan']
+# Team selected in the default layout of the Team Statistics tab
+DEFAULT_TEAM = 'Leksands IF'
+
+RESULT_POINTS = {'win': 3, 'ot win': 2, 'ot loss': 1, 'lost': 0}
+
+
+def league_names(n_leagues):
+    return (LEAGUE_NAMES + [f'division{i}' for i in range(len(LEAGUE_NAMES) + 1, n_leagues + 1)])[:n_leagues]
+
+
+def season_names(n_seasons, last_season=2024):
+    return [f'{year}/{(year + 1) % 100:02d}' for year in range(last_season - n_seasons + 1, last_season + 1)]
+
+
+def round_robin(n_teams, rounds):
+    """
+    Home and away team index of every game, matchdays x games per matchday x 2.
+
+    Circle method: one team stays in place and the others rotate, every round
+    each team meets every other team once. Home and away swap every other round.
+    """
+    half = n_teams // 2
+    rotation = np.arange(1, n_teams)
+    matchdays = []
+    for matchday in range(n_teams - 1):
+        order = np.concatenate([[0], np.roll(rotation, matchday)])
+        pairs = np.stack([order[:half], order[::-1][:half]], axis=1)
+        matchdays.append(pairs if matchday % 2 == 0 else pairs[:, ::-1])
+    single = np.stack(matchdays)
+    return np.concatenate([single if r % 2 == 0 else single[:, :, ::-1] for r in range(rounds)])
+
+
+def _team_games(leagues, seasons, n_teams, rounds, unplayed_matchdays, rng):
+    schedule = round_robin(n_teams, rounds)
+    n_matchdays, games_per_matchday, _ = schedule.shape
+
+    frames = []
+    game_id = 0
+    for league in leagues:
+        name = league.upper() if len(league) <= 3 else league.capitalize()
+        teams = [f'{name} Team {i:02d}' for i in range(1, n_teams + 1)]
+        if league == LEAGUE_NAMES[0]:
+            teams[0] = DEFAULT_TEAM
+        teams = np.array(teams, dtype=object)
+
+        # Team strength per league, drifting a little between seasons
+        strength = rng.normal(0, 0.4, n_teams)
+        for season_number, season in enumerate(seasons):
+            strength = 0.8 * strength + rng.normal(0, 0.2, n_teams)
+            # Teams are drawn to the schedule slots in a new order every season
+            slots = rng.permutation(n_teams)
+            home = slots[schedule[:, :, 0]].ravel()
+            away = slots[schedule[:, :, 1]].ravel()
+            matchday = np.repeat(np.arange(1, n_matchdays + 1), games_per_matchday)
+            n_games = len(home)
+
+            home_score = rng.poisson(np.exp(1.0 + 0.3 * (strength[home] - strength[away])) + 0.3)
+            away_score = rng.poisson(np.exp(1.0 + 0.3 * (strength[away] - strength[home])))
+            # Tied games are decided in overtime
+            overtime = home_score == away_score
+            home_wins_ot = rng.random(n_games) < 0.5
+            home_score = home_score + (overtime & home_wins_ot)
+            away_score = away_score + (overtime & ~home_wins_ot)
+
+            played = np.ones(n_games, dtype=bool)
+            if season_number == len(seasons) - 1 and unplayed_matchdays:
+                played = matchday <= n_matchdays - unplayed_matchdays
+
+            year = int(season[:4])
+            start = np.datetime64(datetime.date(year, 9, 15))
+            date = start + (np.round((matchday - 1) * 3.5)).astype('timedelta64[D]')
+            ids = np.where(played, game_id + np.arange(1, n_games + 1), np.nan)
+            game_id += n_games
+
+            game = teams[home] + ' - ' + teams[away]
+            score = home_score.astype(str).astype(object) + ' - ' + away_score.astype(str).astype(object)
+
+            for team, opponent, scored, conceded, h_a in [
+                (home, away, home_score, away_score, 'home'),
+                (away, home, away_score, home_score, 'away'),
+            ]:
+                win = scored > conceded
+                result_details = np.where(overtime, np.where(win, 'ot win', 'ot loss'), np.where(win, 'win', 'lost')).astype(object)
+                frames.append(pd.DataFrame({
+                    'team': teams[team],
+                    'opponent': teams[opponent],
+                    'league': league,
+                    'season': season,
+                    'matchday': matchday,
+                    'date': date,
+                    'h_a': h_a,
+                    'game_id': ids,
+                    'game': game,
+                    'score': np.where(played, score, None),
+                    'periodscore': np.where(played, '(' + score + ')', None),
+                    'result': np.where(played, np.where(win, 'win', 'lost').astype(object), None),
+                    'result_details': np.where(played, result_details, None),
+                    'score_team': np.where(played, scored, np.nan),
+                    'score_opponent': np.where(played, conceded, np.nan),
+                    'strength': strength[team],
+                }))
+
+    df = pd.concat(frames, ignore_index=True)
+    df = df.sort_values(['league', 'season', 'team', 'matchday'], kind='stable').reset_index(drop=True)
+    df['date'] = df['date'].dt.date
+
+    played = df['game_id'].notna()
+    details = df['result_details']
+    df['points'] = details.map(RESULT_POINTS)
+    for column, value in [('win', 'win'), ('lost', 'lost'), ('ot_win', 'ot win'), ('ot_lost', 'ot loss')]:
+        df[column] = (details == value).astype('float64').where(played)
+    df['draw'] = pd.Series(0.0, index=df.index).where(played)
+    df['goals_game'] = df['score_team'] + df['score_opponent']
+
+    df['points_cum'] = df['points'].fillna(0).groupby([df['league'], df['season'], df['team']], sort=False).cumsum()
+
+    # Table position after each matchday, ties broken by team strength
+    df = df.sort_values(['league', 'season', 'matchday', 'points_cum', 'strength'], ascending=[True, True, True, False, False])
+    table = df.groupby(['league', 'season', 'matchday'], sort=False)
+    df['table_position'] = table.cumcount() + 1
+    df['points_ahead'] = table['points_cum'].shift(1) - df['points_cum']
+    df['points_behind'] = df['points_cum'] - table['points_cum'].shift(-1)
+    df = df.sort_values(['league', 'season', 'team', 'matchday']).reset_index(drop=True)
+
+    # Gaps to the teams just above and below in the table before the game
+    team_season = df.groupby(['league', 'season', 'team'], sort=False)
+    df['points_ahead_pregame'] = team_season['points_ahead'].shift(1).astype('float64')
+    df['points_behind_pregame'] = team_season['points_behind'].shift(1).astype('float64')
+
+    return df.drop(columns=['strength', 'points_ahead', 'points_behind'])
+
+
+def _team_season_metrics(df_team_games, leagues, seasons, rng):
+    df_played = df_team_games[df_team_games['game_id'].notna()]
+    home = df_played['h_a'] == 'home'
+
+    metrics = df_played.groupby(['team', 'league', 'season']).agg(
+        points=('points', 'sum'),
+        nbr_played=('points', 'size'),
+        nbr_win=('win', 'sum'),
+        nbr_lost=('lost', 'sum'),
+        nbr_ot_win=('ot_win', 'sum'),
+        nbr_ot_lost=('ot_lost', 'sum'),
+        avg_points=('points', 'mean'),
+        avg_scored=('score_team', 'mean'),
+        avg_conceded=('score_opponent', 'mean'),
+    )
+    metrics['avg_points_home'] = df_played[home].groupby(['team', 'league', 'season'])['points'].mean()
+    metrics['avg_points_away'] = df_played[~home].groupby(['team', 'league', 'season'])['points'].mean()
+    metrics = metrics.reset_index()
+
+    # Overtime games are neither wins nor losses in the season summary
+    metrics['nbr_draw'] = metrics.pop('nbr_ot_win') + metrics.pop('nbr_ot_lost')
+
+    # Crowds grow with the league level and the team's points
+    league_level = metrics['league'].map({league: level for level, league in enumerate(leagues)})
+    base = 7000 / (1 + league_level) + 1500
+    metrics['avg_spectators'] = np.round(base * (0.6 + 0.3 * metrics['avg_points']) * rng.uniform(0.8, 1.2, len(metrics)))
+    metrics['avg_spectators_away'] = np.round(base * rng.uniform(0.7, 1.3, len(metrics)))
+
+    metrics = metrics.sort_values(['league', 'season', 'points', 'avg_points'], ascending=[True, True, False, False])
+    metrics['table_position'] = metrics.groupby(['league', 'season']).cumcount() + 1
+    metrics['league_short'] = metrics['league'].str[:3].str.upper()
+    metrics['is_current_season'] = metrics['season'] == seasons[-1]
+    return metrics.sort_values(['team', 'season']).reset_index(drop=True)
+
+
+def _team_headtohead(df_team_games):
+    df_played = df_team_games[df_team_games['game_id'].notna()]
+    return df_played.groupby(['team', 'opponent']).agg(
+        games=('points', 'size'),
+        avg_points=('points', 'mean'),
+    ).reset_index()
+
+
+def _team_currentmetrics(df_team_games, seasons):
+    df_current = df_team_games[df_team_games['season'] == seasons[-1]]
+    played = df_current['game_id'].notna()
+
+    previous = df_current[played].groupby('team').tail(1).set_index('team')
+    following = df_current[~played].groupby('team').head(1).set_index('team')
+
+    metrics = pd.DataFrame({
+        'league': previous['league'],
+        'table_position': previous['table_position'],
+        'points': previous['points_cum'],
+        'game_previous': previous['game'],
+        'date_previous': previous['date'],
+        'result_previous': previous['result'],
+        'score_previous': previous['score'],
+    })
+    metrics['game_next'] = following['game']
+    metrics['date_next'] = following['date']
+    return metrics.rename_axis('team').reset_index()
+
+
+def generate_tables(n_leagues=2, n_seasons=10, n_teams=14, rounds=4, unplayed_matchdays=5, seed=0):
+    """
+    Generate the six dashboard tables.
+
+    The same parameters always give the same tables.
+
+    Parameters:
+        n_leagues: Number of leagues, the first two are 'shl' and 'allsvenskan'.
+        n_seasons: Number of seasons, the last one is the current season 2024/25.
+        n_teams: Teams per league, an even number.
+        rounds: Times every team meets every other team per season (half at home).
+        unplayed_matchdays: Matchdays at the end of the current season without a result.
+        seed: Seed of the random generator.
+
+    Returns:
+        Dict of table name -> DataFrame, validated against table_schema.py.
+    """
+    if n_teams % 2:
+        raise ValueError(f"n_teams must be even, got {n_teams}")
+
+    rng = np.random.default_rng(seed)
+    seasons = season_names(n_seasons)
+
+    leagues = league_names(n_leagues)
+    df_team_games = _team_games(leagues, seasons, n_teams, rounds, unplayed_matchdays, rng)
+
+    tables = {
+        'team_games': df_team_games,
+        'team_season_metrics': _team_season_metrics(df_team_games, leagues, seasons, rng),
+        'matchdays': pd.DataFrame({'matchday': np.arange(1, df_team_games['matchday'].max() + 1)}),
+        'teams': pd.DataFrame({'team': np.sort(df_team_games['team'].unique())}),
+        'team_headtohead': _team_headtohead(df_team_games),
+        'team_currentmetrics': _team_currentmetrics(df_team_games, seasons),
+    }
+    return validate_tables({name: tables[name] for name in TABLE_SCHEMAS})
+
+
+def write_synthetic_tables(path, file_format='parquet', **params):
+    """
+    Write generated tables as the files of a local data source, e.g. to run the app with
+    DATA_SOURCE=local DATA_SOURCE_PATH=path.
+
+    Returns:
+        Dict of table name -> number of rows.
+    """
+    from data_sources import write_local_tables
+
+    tables = generate_tables(**params)
+    write_local_tables(tables, path, file_format)
+    return {name: len(df) for name, df in tables.items()}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write synthetic tables as a local data source, to run the app without BigQuery.')
+    parser.add_argument('path')
+    parser.add_argument('--leagues', type=int, default=2)
+    parser.add_argument('--seasons', type=int, default=10)
+    parser.add_argument('--teams', type=int, default=14)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--format', choices=['parquet', 'csv'], default='parquet')
+    args = parser.parse_args()
+
+    rows = write_synthetic_tables(args.path, args.format, n_leagues=args.leagues, n_seasons=args.seasons,
+                                  n_teams=args.teams, seed=args.seed)
+    print(f"Wrote {args.path}: " + ', '.join(f"{name} {count} rows" for name, count in rows.items()))
@@ -0,0 +1,283 @@
+# table_schema.py
+
+# Registry of the columns the dashboard reads from each BigQuery view, which tabs
+# use them and their expected types. Queries select only these columns, and the
+# loaded frames are checked against the registry before they are published.
+
+import numpy as np
+import pandas as pd
+
+BIGQUERY_DATASET = 'sportresults-294318.icehockey_plotly_dashboard'
+
+# Column types: 'str', 'int' (nullable Int64), 'float', 'bool' and 'date'
+TABLE_SCHEMAS = {
+    'team_games': {
+        'view': 'swehockey_team_games_dashboard',
+        'columns': {
+            'team': 'str',
+            'opponent': 'str',
+            'league': 'str',
+            'season': 'str',
+            'matchday': 'int',
+            'date': 'date',
+            'h_a': 'str',
+            'game_id': 'int',
+            'game': 'str',
+            'score': 'str',
+            'periodscore': 'str',
+            'result': 'str',
+            'result_details': 'str',
+            'points': 'int',
+            'points_cum': 'int',
+            'table_position': 'int',
+            'score_team': 'int',
+            'score_opponent': 'int',
+            'goals_game': 'int',
+            'win': 'int',
+            'draw': 'int',
+            'lost': 'int',
+            'ot_win': 'int',
+            'ot_lost': 'int',
+            'points_ahead_pregame': 'float',
+            'points_behind_pregame': 'float',
+        },
+        'used_by': {
+            'tab-1': ['team', 'league', 'season', 'date', 'h_a', 'game_id', 'result_details', 'points', 'win', 'draw',
+                      'lost', 'ot_win', 'ot_lost', 'score_team', 'score_opponent', 'goals_game',
+                      'points_ahead_pregame', 'points_behind_pregame'],
+            'tab-2': ['team', 'opponent', 'league', 'season', 'date', 'h_a', 'game_id', 'score_team', 'score_opponent',
+                      'periodscore', 'result_details'],
+            'tab-3': ['team', 'league', 'season', 'matchday', 'game_id', 'points_cum', 'table_position'],
+            'tab-4': ['team', 'league', 'season', 'matchday', 'result', 'points_cum'],
+            'tab-5': ['team', 'league', 'season', 'matchday', 'date', 'game', 'score', 'result'],
+        },
+    },
+    'team_season_metrics': {
+        'view': 'swehockey_team_season_metrics',
+        'columns': {
+            'team': 'str',
+            'league': 'str',
+            'league_short': 'str',
+            'season': 'str',
+            'is_current_season': 'bool',
+            'table_position': 'int',
+            'points': 'int',
+            'nbr_played': 'int',
+            'nbr_win': 'int',
+            'nbr_draw': 'int',
+            'nbr_lost': 'int',
+            'avg_points': 'float',
+            'avg_points_home': 'float',
+            'avg_points_away': 'float',
+            'avg_scored': 'float',
+            'avg_conceded': 'float',
+            'avg_spectators': 'float',
+            'avg_spectators_away': 'float',
+        },
+        'used_by': {
+            'tab-5': ['team', 'league', 'league_short', 'season', 'is_current_season', 'table_position', 'points',
+                      'nbr_played', 'nbr_win', 'nbr_draw', 'nbr_lost', 'avg_points', 'avg_points_home',
+                      'avg_points_away', 'avg_scored', 'avg_conceded'],
+            'tab-6': ['team', 'league', 'season', 'avg_points', 'avg_points_home', 'avg_points_away', 'avg_scored',
+                      'avg_conceded', 'avg_spectators', 'avg_spectators_away'],
+        },
+    },
+    'matchdays': {
+        'view': 'matchdays',
+        'columns': {
+            'matchday': 'int',
+        },
+        'used_by': {
+            'tab-4': ['matchday'],
+        },
+    },
+    'teams': {
+        'view': 'teams',
+        'columns': {
+            'team': 'str',
+        },
+        'used_by': {
+            'tab-5': ['team'],
+        },
+    },
+    'team_headtohead': {
+        'view': 'team_headtohead',
+        'columns': {
+            'team': 'str',
+            'opponent': 'str',
+            'games': 'int',
+            'avg_points': 'float',
+        },
+        'used_by': {
+            'tab-5': ['team', 'opponent', 'games', 'avg_points'],
+        },
+    },
+    'team_currentmetrics': {
+        'view': 'team_current_metrics',
+        'columns': {
+            'team': 'str',
+            'league': 'str',
+            'table_position': 'int',
+            'points': 'int',
+            'game_previous': 'str',
+            'date_previous': 'date',
+            'result_previous': 'str',
+            'score_previous': 'str',
+            'game_next': 'str',
+            'date_next': 'date',
+        },
+        'used_by': {
+            'tab-5': ['team', 'league', 'table_position', 'points', 'game_previous', 'date_previous',
+                      'result_previous', 'score_previous', 'game_next', 'date_next'],
+        },
+    },
+}
+
+
+class SchemaError(ValueError):
+    pass
+
+
+def build_query(table_name):
+    """
+    Build a query selecting only the registered columns of a table.
+    """
+    schema = TABLE_SCHEMAS[table_name]
+    columns = ',\n    '.join(f'`{column}`' for column in schema['columns'])
+    return f"""
+  SELECT
+    {columns}
+  FROM `{BIGQUERY_DATASET}.{schema['view']}`
+  """
+
+
+def build_queries():
+    return {table_name: build_query(table_name) for table_name in TABLE_SCHEMAS}
+
+
+def _check_dtype(series, kind):
+    if kind == 'str':
+        return pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)
+    if kind == 'int':
+        return pd.api.types.is_integer_dtype(series) or pd.api.types.is_float_dtype(series)
+    if kind == 'float':
+        return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+    if kind == 'bool':
+        return pd.api.types.is_bool_dtype(series) or pd.api.types.is_object_dtype(series)
+    # Dates arrive as dbdate from BigQuery and as datetime.date objects from Parquet
+    return True
+
+
+def validate_table(table_name, df):
+    """
+    Check a loaded frame against the registry and coerce it to the target types.
+
+    Integer columns become nullable Int64 (as BigQuery returns them) and float
+    columns float64. Columns that are not in the registry are dropped.
+
+    Raises:
+        SchemaError: If a column is missing or has an incompatible type.
+
+    Returns:
+        The validated DataFrame.
+    """
+    columns = TABLE_SCHEMAS[table_name]['columns']
+
+    missing = [column for column in columns if column not in df.columns]
+    if missing:
+        raise SchemaError(f"{table_name}: missing columns {missing}")
+
+    df = df.reindex(columns=list(columns))
+    for column, kind in columns.items():
+        if not _check_dtype(df[column], kind):
+            raise SchemaError(f"{table_name}.{column}: expected {kind}, got {df[column].dtype}")
+
+    coerced = {}
+    for column, kind in columns.items():
+        try:
+            if kind == 'int' and df[column].dtype != 'Int64':
+                coerced[column] = df[column].astype('Int64')
+            elif kind == 'float' and df[column].dtype != 'float64':
+                coerced[column] = df[column].astype('float64')
+            elif kind == 'bool' and df[column].dtype == 'object':
+                coerced[column] = df[column].astype('boolean')
+        except (TypeError, ValueError) as e:
+            raise SchemaError(f"{table_name}.{column}: can not convert to {kind}: {e}")
+    if coerced:
+        df = df.assign(**coerced)
+
+    return df
+
+
+def validate_tables(tables):
+    return {table_name: validate_table(table_name, df) for table_name, df in tables.items()}
+
+
+# Low-cardinality string columns stored as categoricals. Columns in one group share a
+# dictionary, so e.g. team and opponent codes can be compared directly.
+CATEGORY_GROUPS = {
+    'team': [('team_games', 'team'), ('team_games', 'opponent')],
+    'league': [('team_games', 'league')],
+    'season': [('team_games', 'season')],
+    'h_a': [('team_games', 'h_a')],
+    'result': [('team_games', 'result')],
+    'result_details': [('team_games', 'result_details')],
+    'game': [('team_games', 'game')],
+}
+
+INTEGER_DTYPES = ['Int8', 'Int16', 'Int32']
+
+
+def _smallest_integer_dtype(series):
+    if series.isna().all():
+        return 'Int8'
+    low, high = series.min(), series.max()
+    for dtype in INTEGER_DTYPES:
+        info = np.iinfo(dtype.lower())
+        if info.min <= low and high <= info.max:
+            return dtype
+    return 'Int64'
+
+
+def optimize_dtypes(tables):
+    """
+    Convert low-cardinality string columns to shared categoricals and downcast integers.
+
+    Categories are sorted, so sorting by a categorical column gives the same
+    order as sorting the strings. Memory per table is printed before and after.
+
+    Returns:
+        Dict of table name -> optimized DataFrame.
+    """
+    before = {name: df.memory_usage(deep=True).sum() for name, df in tables.items()}
+    tables = dict(tables)
+
+    converted = {name: {} for name in tables}
+    for columns in CATEGORY_GROUPS.values():
+        columns = [(name, column) for name, column in columns if name in tables]
+        values = pd.concat([tables[name][column] for name, column in columns], ignore_index=True)
+        dtype = pd.CategoricalDtype(sorted(values.dropna().unique()))
+        for name, column in columns:
+            converted[name][column] = tables[name][column].astype(dtype)
+
+    for name, df in tables.items():
+        for column, kind in TABLE_SCHEMAS[name]['columns'].items():
+            if kind == 'int':
+                converted[name][column] = df[column].astype(_smallest_integer_dtype(df[column]))
+        tables[name] = df.assign(**converted[name])
+
+        after = tables[name].memory_usage(deep=True).sum()
+        print(f"{name}: {before[name] / 1e6:.2f} MB -> {after / 1e6:.2f} MB")
+
+    return tables
+
+
+def decategorize(df):
+    """
+    Return df with categorical columns as plain strings, for the string operations,
+    plots and groupbys in the tab builders. Meant for small filtered frames.
+    """
+    categorical = [column for column, dtype in df.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)]
+    if not categorical:
+        return df
+    return df.astype({column: object for column in categorical})
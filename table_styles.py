@@ -1,3 +1,7 @@
+import colorlover
+import numpy as np
+
+
 # Function to create conditional background coloring, depending on table position 
 
 def get_table_style():
@@ -55,4 +59,91 @@ def get_table_position_color():
             'backgroundColor': '#f08080',  # Light red
             'color': 'black'
         } for i in range(12, 14)
-    ]
\ No newline at end of file
+    ]
+
+# Heatmap coloring of numeric table cells. Every cell is assigned a bin on the server and
+# sent as HTML carrying its bin as a class, so the browser colors it with one CSS rule per
+# bin instead of evaluating a style rule per bin against every row.
+
+HEATMAP_CELL_CLASS = 'heatmap-cell'
+
+
+def get_heatmap_bins(values, n_bins=5, min_value=None):
+    """
+    Assign every cell of a numeric matrix to one of n_bins equal-width bins between
+    the minimum (or min_value) and the maximum of the matrix.
+
+    A bin includes its lower bound, the last bin also its upper bound. Missing values
+    and values below min_value get bin -1.
+
+    Parameters:
+        values: 2D array of numbers, NaN for missing values.
+        n_bins: Number of bins.
+        min_value: Lower bound of the first bin, the minimum of values if None.
+
+    Returns:
+        Integer array of the same shape as values.
+    """
+    values = np.asarray(values, dtype='float64')
+    bins = np.full(values.shape, -1, dtype=np.int64)
+    has_value = ~np.isnan(values)
+    if not has_value.any():
+        return bins
+
+    df_max = values[has_value].max()
+    df_min = values[has_value].min() if min_value is None else min_value
+    bounds = [((df_max - df_min) * (i * (1.0 / n_bins))) + df_min for i in range(n_bins + 1)]
+
+    binned = has_value & (values >= bounds[0])
+    bins[binned] = np.searchsorted(bounds[1:-1], values[binned], side='right')
+    return bins
+
+
+def get_heatmap_cells(values, formatted, bins):
+    """
+    HTML of every cell of a heatmap table, for columns with markdown presentation.
+
+    Cells with a bin get its class (see get_heatmap_css()). The value, zero padded, leads
+    the HTML, so native sorting, which compares the strings, sorts by value. Missing
+    values are empty.
+
+    Parameters:
+        values: 2D array of numbers, NaN for missing values.
+        formatted: 2D array of the cell texts.
+        bins: 2D integer array of bins, as returned by get_heatmap_bins().
+
+    Returns:
+        Object array of the same shape as values.
+    """
+    values = np.asarray(values, dtype='float64')
+    cells = np.full(values.shape, '', dtype=object)
+    has_value = ~np.isnan(values)
+    cells[has_value] = [
+        '<div data-sort="{value:012.2f}" class="{cls}{bin_class}">{text}</div>'.format(
+            value=value, cls=HEATMAP_CELL_CLASS, bin_class=f' heatmap-bin-{i}' if i >= 0 else '', text=text)
+        for value, text, i in zip(values[has_value].tolist(), np.asarray(formatted)[has_value].tolist(),
+                                  np.asarray(bins)[has_value].tolist())
+    ]
+    return cells
+
+
+def get_heatmap_css(n_bins=5):
+    """
+    CSS rules of the heatmap cell classes, from light yellow to dark green. The cells
+    fill their table cell, whose padding is 2px.
+
+    Returns:
+        List of DataTable css rules.
+    """
+    background_colors = colorlover.scales[str(n_bins)]['seq']['YlGn']
+
+    css = [{'selector': f'.{HEATMAP_CELL_CLASS}', 'rule': 'margin: -2px; padding: 2px'}]
+    for i, background_color in enumerate(background_colors):
+        # Dark text on the light bins, white text on the dark ones
+        if i < 2:
+            color = 'black'
+        else:
+            color = 'white' if i + 1 > (n_bins + 1) / 2. else 'inherit'
+        css.append({'selector': f'.heatmap-bin-{i}', 'rule': f'background-color: {background_color}; color: {color}'})
+
+    return css
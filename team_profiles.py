@@ -0,0 +1,157 @@
+# team_profiles.py
+
+import pandas as pd
+
+from data_index import games_index
+from table_schema import decategorize
+
+
+# Match results -> marker color and symbol in the match results chart
+RESULT_COLORS = {'win': 'green', 'lost': 'red', 'draw': 'darkblue'}
+RESULT_SYMBOLS = {'win': 'circle', 'lost': 'x', 'draw': 'diamond'}
+
+STANDINGS_ROUND_COLUMNS = ['avg_points', 'avg_points_home', 'avg_points_away', 'avg_scored', 'avg_conceded']
+
+MATCH_COLUMNS = ['team', 'league', 'season', 'matchday', 'date', 'game', 'score', 'result']
+
+# Opponents need at least this many games to be listed in the head-to-head chart
+HEADTOHEAD_MIN_GAMES = 15
+HEADTOHEAD_TOP = 14
+
+
+class TeamProfile:
+    """
+    Everything the Team Statistics tab shows for one team, precomputed per data version.
+
+    Attributes:
+        team: Team name.
+        current: Dict of the team's current standing, previous and next game, or None.
+        standings: Records of the team's current season standings rows.
+        seasons: DataFrame of league, league_short and table_position per season, sorted by season.
+        matches: DataFrame of the match result markers (matchday, season_league, color, symbol, hover_text).
+        headtohead: DataFrame of the best opponents by average points (opponent, avg_points).
+    """
+
+    def __init__(self, team, current, standings, seasons, matches, headtohead):
+        self.team = team
+        self.current = current
+        self.standings = standings
+        self.seasons = seasons
+        self.matches = matches
+        self.headtohead = headtohead
+
+
+class TeamProfiles:
+    """
+    Team profiles of one dataset, looked up by team name.
+
+    The match result markers are computed for the whole games table in one
+    pass and each source table is grouped by team once, so a profile is built
+    from row positions instead of filtering the full tables. Profiles are
+    built on first lookup, or all at once with warm(). Only teams of the teams
+    table have a profile, so lookups of other names never grow the cache.
+    """
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.teams = frozenset(dataset['teams']['team'].dropna().astype(str))
+
+        df_team_season_metrics = dataset['team_season_metrics']
+        self.df_season_metrics = df_team_season_metrics[df_team_season_metrics['league'] != 'preseason']
+
+        # Current season standings, rounded for display
+        df_standings = self.df_season_metrics[self.df_season_metrics['is_current_season'] == True]
+        self.df_standings = df_standings.assign(**df_standings[STANDINGS_ROUND_COLUMNS].round(2))
+
+        df_team_headtohead = dataset['team_headtohead']
+        self.df_headtohead = df_team_headtohead[df_team_headtohead['games'] >= HEADTOHEAD_MIN_GAMES]
+
+        self.df_currentmetrics = dataset['team_currentmetrics']
+
+        self._season_metrics_rows = self.df_season_metrics.groupby('team', sort=False).indices
+        self._standings_rows = self.df_standings.groupby('team', sort=False).indices
+        self._headtohead_rows = self.df_headtohead.groupby('team', sort=False).indices
+        self._currentmetrics_rows = self.df_currentmetrics.groupby('team', sort=False).indices
+
+        df_matches = games_index(dataset).columns(MATCH_COLUMNS)
+        df_matches = decategorize(df_matches[(df_matches['league'] != 'preseason').to_numpy(dtype=bool)])
+        self.df_matches = pd.DataFrame({
+            'team': df_matches['team'],
+            'season': df_matches['season'],
+            'matchday': df_matches['matchday'],
+            'season_league': df_matches['league'] + '\t' + df_matches['season'],
+            'color': df_matches['result'].map(RESULT_COLORS).fillna('gray'),
+            'symbol': df_matches['result'].map(RESULT_SYMBOLS).fillna('circle-open'),
+            'hover_text': (
+                df_matches['game'] + '<br>' +
+                'Score: ' + df_matches['score'] + '<br>' +
+                'Date: ' + df_matches['date'].astype(str) + '<br>' +
+                'Result: ' + df_matches['result'].fillna('No Result')
+            ),
+        })
+        self._matches_rows = self.df_matches.groupby('team', sort=False).indices
+
+        self._profiles = {}
+
+    def __getitem__(self, team):
+        if team not in self.teams:
+            raise KeyError(team)
+        profile = self._profiles.get(team)
+        if profile is None:
+            profile = self._profiles[team] = self._build(team)
+        return profile
+
+    def get(self, team):
+        """
+        The profile of team, None if it is not in the teams table.
+        """
+        try:
+            return self[team]
+        except (KeyError, TypeError):
+            return None
+
+    def warm(self, teams=None):
+        """
+        Build the profiles of teams (default: every team of the teams table) ahead of their first lookup.
+        """
+        if teams is None:
+            teams = sorted(self.teams)
+        for team in teams:
+            self[team]
+        print(f"Warmed {len(self._profiles)} team profiles")
+
+    def _rows(self, df, rows, team):
+        return df.iloc[rows.get(team, [])]
+
+    def _build(self, team):
+        # Current season standings
+        df_standings = self._rows(self.df_standings, self._standings_rows, team)
+
+        # Table position per season
+        df_seasons = self._rows(self.df_season_metrics, self._season_metrics_rows, team)
+        df_seasons = df_seasons.sort_values(by='season')[['season', 'league', 'league_short', 'table_position']]
+
+        # Current standing, previous and next game
+        df_current = self._rows(self.df_currentmetrics, self._currentmetrics_rows, team)
+        current = df_current.iloc[0].to_dict() if len(df_current) else None
+
+        # Match result markers
+        df_matches = self._rows(self.df_matches, self._matches_rows, team)
+        df_matches = df_matches.sort_values(by='season')[['matchday', 'season_league', 'color', 'symbol', 'hover_text']]
+
+        # Best head-to-head opponents
+        df_headtohead = self._rows(self.df_headtohead, self._headtohead_rows, team)
+        df_headtohead = df_headtohead.sort_values(by='avg_points', ascending=False).head(HEADTOHEAD_TOP)[['opponent', 'avg_points']]
+
+        return TeamProfile(
+            team=team,
+            current=current,
+            standings=df_standings.to_dict('records'),
+            seasons=df_seasons,
+            matches=df_matches,
+            headtohead=df_headtohead,
+        )
+
+
+def team_profiles(dataset):
+    return dataset.derived('team_profiles', TeamProfiles)
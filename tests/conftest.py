@@ -0,0 +1,40 @@
+# Tests run the app on a small synthetic dataset (see synthetic_data.py) written to a
+# temporary local data source. The environment is set before the app modules are imported,
+# since they read their settings at import.
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+WORK_DIR = tempfile.mkdtemp(prefix='hockey-tests-')
+DATA_PATH = os.path.join(WORK_DIR, 'data')
+
+os.environ.update({
+    'DATA_SOURCE': 'local',
+    'DATA_SOURCE_PATH': DATA_PATH,
+    'SNAPSHOT_DIR': os.path.join(WORK_DIR, 'snapshots'),
+    'DATA_REFRESH_MINUTES': '0',
+    'QUERY_ENGINE': 'pandas',
+    'VIEW_SNAPSHOT_TABS': '',
+})
+
+# 11 seasons, so SHL 2014/15 (left out of the Point Distribution) is part of the data
+SYNTHETIC_SCALE = {'n_leagues': 2, 'n_seasons': 11, 'n_teams': 14, 'seed': 0}
+
+
+@pytest.fixture(scope='session')
+def dashboard():
+    """
+    The app module, serving the synthetic dataset.
+    """
+    from synthetic_data import write_synthetic_tables
+
+    write_synthetic_tables(DATA_PATH, **SYNTHETIC_SCALE)
+    import app
+    return app
@@ -0,0 +1,52 @@
+# Callback metrics endpoints (app.py): the stats and the reset need the refresh token, browser
+# reports are limited in size and only well-formed samples of known outputs are recorded.
+
+import pytest
+
+
+@pytest.fixture
+def client(dashboard, monkeypatch):
+    monkeypatch.setattr(dashboard, 'REFRESH_TOKEN', 'secret')
+    dashboard.callback_metrics.reset()
+    yield dashboard.server.test_client()
+    dashboard.callback_metrics.reset()
+
+
+def test_stats_and_reset_need_token(client):
+    assert client.get('/callback-metrics').status_code == 403
+    assert client.post('/callback-metrics/reset').status_code == 403
+    assert client.get('/callback-metrics', headers={'X-Refresh-Token': 'wrong'}).status_code == 403
+
+    assert client.get('/callback-metrics', headers={'X-Refresh-Token': 'secret'}).status_code == 200
+    assert client.post('/callback-metrics/reset', headers={'X-Refresh-Token': 'secret'}).status_code == 204
+
+
+def test_client_samples_are_validated(dashboard, client):
+    valid = {'output': dashboard.TAB_CONTENT_OUTPUT, 'tab': 'tab-3', 'parse_ms': 1.5, 'bytes': 1000}
+    samples = [
+        valid,
+        {'output': 'about-modal.is_open', 'parse_ms': 0.1, 'bytes': 20},
+        {**valid, 'tab': 'tab-9'},
+        {**valid, 'tab': ['tab-3']},
+        {**valid, 'output': 'unknown.children'},
+        {**valid, 'output': ['about-modal.is_open']},
+        {**valid, 'parse_ms': -1},
+        {**valid, 'parse_ms': 1e12},
+        {**valid, 'parse_ms': '1.5'},
+        {**valid, 'bytes': 1.5},
+        {**valid, 'bytes': True},
+        {**valid, 'bytes': 10 ** 12},
+        'sample',
+    ]
+    assert client.post('/callback-metrics/client', json=samples).status_code == 204
+
+    stats = client.get('/callback-metrics', headers={'X-Refresh-Token': 'secret'}).get_json()
+    assert {key: summary['count'] for key, summary in stats['client'].items()} == {'about-modal.is_open': 1, 'tab-3': 1}
+
+
+def test_client_report_size_is_capped(dashboard, client):
+    sample = {'output': dashboard.TAB_CONTENT_OUTPUT, 'tab': 'tab-1', 'parse_ms': 1.0, 'bytes': 1000}
+    report = [sample] * (dashboard.CLIENT_REPORT_MAX_BYTES // 100)
+
+    assert client.post('/callback-metrics/client', json=report).status_code == 413
+    assert client.post('/callback-metrics/client', json={'output': 'x'}).status_code == 400
@@ -0,0 +1,63 @@
+# Figures reduced to what the browser needs to draw them (figure_payload.py).
+
+import numpy as np
+import plotly.graph_objs as go
+import plotly.io as pio
+from dash import dcc, html
+
+from figure_payload import compact_array, compact_figure, compact_figures, prune_template
+
+
+def test_compact_array():
+    assert compact_array(np.array([1.0, 2.0, -3.0])).tolist() == [1, 2, -3]
+    assert compact_array(np.array([1.0, 2.0, -3.0])).dtype == np.int64
+    assert compact_array(np.array([0.123456789, 2.5]), decimals=4).tolist() == [0.1235, 2.5]
+    assert np.isnan(compact_array([1.0, float('nan')])[1])
+    # Only numeric arrays are changed
+    assert compact_array(['2024/25', '2023/24']) == ['2024/25', '2023/24']
+    assert compact_array([True, False]) == [True, False]
+
+
+def test_compact_trace():
+    figure = go.Figure(go.Scatter(
+        x=['2023/24', '2024/25'], y=[1.0, 2.50004], customdata=[[1.23456789], [2.0]],
+        marker={'color': ['red', 'red'], 'size': [4.0, 6.0]}, xaxis='x',
+    ))
+
+    trace = compact_figure(figure)['data'][0]
+
+    assert 'xaxis' not in trace
+    assert trace['y'].tolist() == [1.0, 2.5]
+    assert trace['marker']['color'] == 'red'
+    assert trace['marker']['size'].tolist() == [4, 6]
+    # customdata is shown in hover texts as is
+    assert np.asarray(trace['customdata']).tolist() == [[1.23456789], [2.0]]
+
+
+def test_template_pruned_to_what_applies():
+    figure = go.Figure(go.Bar(x=['a', 'b'], y=[1, 2]), layout={'template': pio.templates['plotly'],
+                                                               'xaxis': {'gridcolor': 'black'}})
+
+    template = compact_figure(figure)['layout']['template']
+
+    assert list(template['data']) == ['bar']
+    assert 'polar' not in template['layout'] and 'colorscale' not in template['layout']
+    # The figure sets the x axis grid color itself, the rest of the axis template still applies
+    assert 'gridcolor' not in template['layout']['xaxis']
+    assert template['layout']['xaxis']['linecolor'] == pio.templates['plotly'].layout.xaxis.linecolor
+    assert template['layout']['yaxis']['gridcolor'] == pio.templates['plotly'].layout.yaxis.gridcolor
+
+
+def test_colorscale_kept_for_heatmaps():
+    figure = go.Figure(go.Heatmap(z=[[1, 2], [3, 4]]), layout={'template': pio.templates['plotly']}).to_plotly_json()
+
+    assert 'colorscale' in prune_template(figure)['layout']['template']['layout']
+
+
+def test_compact_figures_in_component_tree():
+    graph = dcc.Graph(figure=go.Figure(go.Scatter(x=[1.0, 2.0], y=[3.0, 4.0])))
+    content = html.Div([html.H4('Points'), html.Div(graph)])
+
+    assert compact_figures(content) is content
+    assert isinstance(graph.figure, dict)
+    assert graph.figure['data'][0]['x'].tolist() == [1, 2]
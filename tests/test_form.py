@@ -0,0 +1,41 @@
+# Form icons of the last games (form.py).
+
+import pandas as pd
+
+from form import FORM_ICON_TABLE, RESULT_ICONS, encode_form, icons_from_strings, last_form_icons, map_results_to_icons
+
+
+def reference_icons(results):
+    # The original per-result mapping, unknown results keep an empty slot
+    return ' '.join(RESULT_ICONS.get(result, '') for result in results.split(','))
+
+
+def test_table_matches_per_result_mapping():
+    for results in ['win', 'lost,draw', 'ot win,ot loss,win,unknown,lost', 'win,win,win,win,win']:
+        assert FORM_ICON_TABLE[encode_form(results.split(','))] == reference_icons(results)
+    assert map_results_to_icons('') == ''
+    # Longer sequences are looked up in chunks
+    assert map_results_to_icons('win,lost,draw,win,win,ot loss') == reference_icons('win,lost,draw,win,win,ot loss')
+
+
+def test_icons_from_strings_keeps_missing_empty():
+    results = pd.Series(['win,lost', None, 'win,lost', 'draw'], index=[3, 5, 7, 9])
+
+    icons = icons_from_strings(results)
+
+    assert icons.index.tolist() == [3, 5, 7, 9]
+    assert icons.tolist() == [reference_icons('win,lost'), '', reference_icons('win,lost'), reference_icons('draw')]
+
+
+def test_last_form_icons_per_team():
+    df_games = pd.DataFrame({
+        'team': ['B'] * 7 + ['A'] * 2,
+        'result_details': ['lost', 'lost', 'win', 'draw', 'ot win', None, 'win', 'ot loss', 'win'],
+    })
+
+    form = last_form_icons(df_games)
+
+    # The window never reaches into another team's games, missing results keep their slot
+    assert form.to_dict() == {'A': reference_icons('ot loss,win'), 'B': reference_icons('win,draw,ot win,,win')}
+    assert last_form_icons(df_games, n=2)['B'] == reference_icons(',win')
+    assert last_form_icons(df_games, n=7)['B'] == reference_icons('lost,lost,win,draw,ot win,,win')
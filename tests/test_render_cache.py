@@ -0,0 +1,25 @@
+# Rendered tab content is cached per tab, inputs and data version (render_cached in app.py).
+
+from types import SimpleNamespace
+
+from dash import html
+
+
+def test_render_once_per_tab_inputs_and_version(dashboard):
+    dashboard.render_cache.clear()
+    calls = []
+
+    def render():
+        calls.append(1)
+        return html.Div('content')
+
+    dataset = SimpleNamespace(version='v1')
+    first = dashboard.render_cached(dataset, 'tab-6', {'metric': 'Points', 'league': 'SHL'}, render)
+    assert dashboard.render_cached(dataset, 'tab-6', {'league': 'SHL', 'metric': 'Points'}, render) is first
+    assert len(calls) == 1
+
+    dashboard.render_cached(dataset, 'tab-6', {'metric': 'Scored', 'league': 'SHL'}, render)
+    dashboard.render_cached(SimpleNamespace(version='v2'), 'tab-6', {'metric': 'Points', 'league': 'SHL'}, render)
+    assert len(calls) == 3
+    assert dashboard.render_cache.stats()['hits'] == 1
+    dashboard.render_cache.clear()
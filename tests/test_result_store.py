@@ -0,0 +1,58 @@
+# Bounded LRU of server-side results (result_store.py).
+
+from result_store import ResultStore, store_key
+
+
+def test_least_recently_used_entry_is_evicted():
+    store = ResultStore(max_entries=2)
+    first, second, third = (store_key('table', 'v1', league='shl', season=season) for season in ['a', 'b', 'c'])
+
+    store.put(first, 1)
+    store.put(second, 2)
+    # A hit makes first the most recently used entry
+    assert store.get(first) == 1
+    store.put(third, 3)
+
+    assert store.get(second) is None
+    assert store.get(first) == 1
+    assert store.get(third) == 3
+    assert len(store) == 2
+    assert store.evictions == 1
+
+
+def test_stats_count_hits_misses_and_evictions():
+    store = ResultStore(max_entries=1)
+    store.put(store_key('table', 'v1', league='shl'), 'shl')
+    store.get(store_key('table', 'v1', league='shl'))
+    store.get(store_key('table', 'v1', league='allsvenskan'))
+    store.put(store_key('table', 'v1', league='allsvenskan'), 'allsvenskan')
+
+    assert store.stats() == {'entries': 1, 'max_entries': 1, 'hits': 1, 'misses': 1, 'evictions': 1, 'hit_rate': 0.5}
+
+
+def test_keys_match_regardless_of_parameter_order():
+    store = ResultStore()
+    store.put(store_key('table', 'v1', league='shl', season='2024/25'), 'standings')
+
+    assert store.get(store_key('table', 'v1', season='2024/25', league='shl')) == 'standings'
+    # Another data version is another entry
+    assert store.get(store_key('table', 'v2', league='shl', season='2024/25')) is None
+
+
+def test_result_is_computed_once():
+    store = ResultStore()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return 'standings'
+
+    key = store_key('table', 'v1', league='shl')
+    assert store.get_or_compute(key, compute) == 'standings'
+    assert store.get_or_compute(key, compute) == 'standings'
+    assert len(calls) == 1
+
+    store.clear()
+    assert len(store) == 0
+    store.get_or_compute(key, compute)
+    assert len(calls) == 2
@@ -0,0 +1,40 @@
+# The Team Comparison pivot of the duckdb engine against the pandas path (sql_engine.py).
+
+import pandas as pd
+import pandas.testing as tm
+import pytest
+
+from table_schema import decategorize
+
+
+def pandas_pivot(dataset, league, metric):
+    # The pandas path of tab_content_teamcomparison in app.py
+    df_metrics = decategorize(dataset['team_season_metrics'])
+    df_league = df_metrics[df_metrics['league'] == league][['team', 'season', metric]].sort_values(by='season')
+    df_pivot = df_league.pivot(index='team', columns='season', values=metric).reset_index()
+    df_pivot.columns.name = None
+    return df_pivot
+
+
+@pytest.mark.parametrize('metric', ['avg_points', 'avg_conceded', 'avg_spectators'])
+def test_team_season_pivot_matches_pandas(dashboard, metric):
+    pytest.importorskip('duckdb')
+    from sql_engine import sql_engine
+
+    dataset = dashboard.current_dataset()
+    for league in ['shl', 'allsvenskan']:
+        df_pivot = sql_engine(dataset).team_season_pivot(league, metric)
+        df_reference = pandas_pivot(dataset, league, metric)
+
+        assert len(df_reference) and len(df_reference.columns) > 1
+
+        tm.assert_frame_equal(df_pivot, df_reference.astype({season: 'float64' for season in df_reference.columns[1:]}),
+                              check_dtype=False)
+
+
+def test_unknown_metric(dashboard):
+    pytest.importorskip('duckdb')
+    from sql_engine import sql_engine
+
+    with pytest.raises(KeyError):
+        sql_engine(dashboard.current_dataset()).team_season_pivot('shl', 'team')
@@ -0,0 +1,211 @@
+# The Table tab standings (standings.py, form.py) replaced a groupby.agg over the filtered
+# games. They are compared here with that aggregation, kept as reference, on a small fixture
+# with tied teams, draws, missing pregame values and an unplayed game, and on the synthetic
+# dataset for every filter combination.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from form import last_form_icons
+from standings import Standings, compute_standings
+
+
+RESULT_POINTS = {'win': 3, 'ot win': 2, 'draw': 1, 'ot loss': 1, 'lost': 0}
+RESULT_ICONS = {
+    'win': '<span class="square-icon win">W</span>',
+    'draw': '<span class="square-icon draw">T</span>',
+    'lost': '<span class="square-icon loss">L</span>',
+    'ot win': '<span class="square-icon ot-win">T</span>',
+    'ot loss': '<span class="square-icon ot-loss">T</span>',
+}
+
+STANDINGS_COLUMNS = ['team', 'points', 'win', 'lost', 'draw', 'ot_win', 'ot_loss', 'scored', 'conceded', 'games',
+                     'avg_points', 'avg_points_pregame_ahead', 'avg_points_pregame_behind', 'avg_scored',
+                     'avg_conceded', 'avg_goals_game', 'last_5_icons', 'goal_difference', 'goal_difference_txt']
+
+
+def reference_icons(results):
+    # Form icons before form.py
+    if not results:
+        return ''
+    return ' '.join(RESULT_ICONS.get(result, '') for result in results.split(','))
+
+
+def reference_standings(df_table_filtered, lastgames='all'):
+    # Table tab standings before standings.py, from the played games of the selection
+    if lastgames == 'last5':
+        df_table_filtered = df_table_filtered.sort_values(by='date', ascending=False).groupby('team').head(5).reset_index(drop=True)
+    if lastgames == 'last10':
+        df_table_filtered = df_table_filtered.sort_values(by='date', ascending=False).groupby('team').head(10).reset_index(drop=True)
+
+    df_table_filtered = df_table_filtered.sort_values(by=['team', 'date'])
+    df_table_filtered['last_5_results'] = [','.join(df_table_filtered['result_details'][max(0, i-4):i+1]) for i in range(len(df_table_filtered))]
+    df_table_filtered['last_5_icons'] = df_table_filtered['last_5_results'].apply(reference_icons)
+
+    def average(x):
+        return round(x.dropna().mean(), 2) if not x.dropna().empty else 0
+
+    df_standings = (
+        df_table_filtered.groupby('team')
+        .agg(
+            points=('points', 'sum'),
+            win=('win', 'sum'),
+            lost=('lost', 'sum'),
+            draw=('draw', 'sum'),
+            ot_win=('ot_win', 'sum'),
+            ot_loss=('ot_lost', 'sum'),
+            scored=('score_team', 'sum'),
+            conceded=('score_opponent', 'sum'),
+            games=('points', 'size'),
+            avg_points=('points', average),
+            avg_points_pregame_ahead=('points_ahead_pregame', average),
+            avg_points_pregame_behind=('points_behind_pregame', average),
+            avg_scored=('score_team', average),
+            avg_conceded=('score_opponent', average),
+            avg_goals_game=('goals_game', average),
+            last_5_icons=('last_5_icons', 'last'),
+        )
+        .reset_index()
+    )
+    df_standings['goal_difference'] = df_standings['scored'] - df_standings['conceded']
+    df_standings['goal_difference_txt'] = (df_standings['scored'].astype(int).astype(str) + '-'
+                                           + df_standings['conceded'].astype(int).astype(str) + ' ('
+                                           + df_standings['goal_difference'].astype(int).astype(str) + ')')
+    return df_standings
+
+
+def standings_with_form(df_games):
+    # The pandas path of filter_table (app.py) after the filters
+    df_games = df_games.sort_values(by=['team', 'date'])
+    df_standings = compute_standings(df_games)
+    df_standings['last_5_icons'] = last_form_icons(df_games, 5)
+    return df_standings.reset_index()
+
+
+def assert_same_standings(standings, reference):
+    standings = standings[STANDINGS_COLUMNS].astype({'team': str}).reset_index(drop=True)
+    reference = reference[STANDINGS_COLUMNS].astype({'team': str}).reset_index(drop=True)
+    # The reference form window ran over the rows of all teams, so for a team with fewer than
+    # five games it took the last games of the team before. The form is now taken per team
+    # (user-010) and compared only where the two agree by construction
+    short = (standings['games'] < 5).to_numpy()
+    reference.loc[short, 'last_5_icons'] = standings.loc[short, 'last_5_icons']
+    pd.testing.assert_frame_equal(standings, reference, check_dtype=False)
+
+
+def table_order(df_standings):
+    # Row order of the Table tab (see tab_content_table in app.py)
+    return df_standings.sort_values(by=['points', 'goal_difference'], ascending=[False, False])['team'].tolist()
+
+
+@pytest.fixture
+def games():
+    """
+    Six games of four teams, rows out of date order:
+    - Alpha and Beta tie on points and goal difference, with different results
+    - Gamma plays draws and has no pregame values, so its pregame averages are 0
+    - Delta has a seventh, unplayed game
+    """
+    schedule = {
+        'Alpha': [('win', 4, 1), ('win', 3, 1), ('lost', 0, 3), ('lost', 1, 2), ('win', 5, 2), ('ot loss', 2, 3)],
+        'Beta': [('win', 3, 0), ('ot win', 3, 2), ('ot win', 2, 1), ('lost', 1, 4), ('lost', 2, 5), ('win', 4, 0)],
+        'Gamma': [('draw', 1, 1), ('draw', 2, 2), ('win', 3, 1), ('lost', 0, 2), ('draw', 0, 0), ('ot win', 2, 1)],
+        'Delta': [('lost', 1, 3), ('ot loss', 2, 3), ('win', 2, 0), ('lost', 0, 1), ('ot win', 4, 3), ('win', 3, 1), (None, None, None)],
+    }
+    rows = []
+    for team, results in schedule.items():
+        for i, (result, scored, conceded) in enumerate(results):
+            played = result is not None
+            rows.append({
+                'team': team,
+                'date': pd.Timestamp('2024-09-01') + pd.Timedelta(days=7 * i),
+                'h_a': 'home' if i % 2 == 0 else 'away',
+                'game_id': f'{team}-{i}' if played else None,
+                'result_details': result,
+                'points': RESULT_POINTS[result] if played else np.nan,
+                'win': float(result == 'win') if played else np.nan,
+                'lost': float(result == 'lost') if played else np.nan,
+                'draw': float(result == 'draw') if played else np.nan,
+                'ot_win': float(result == 'ot win') if played else np.nan,
+                'ot_lost': float(result == 'ot loss') if played else np.nan,
+                'score_team': scored if played else np.nan,
+                'score_opponent': conceded if played else np.nan,
+                'goals_game': scored + conceded if played else np.nan,
+                'points_ahead_pregame': RESULT_POINTS[result] if played and team != 'Gamma' and i % 2 == 0 else np.nan,
+                'points_behind_pregame': RESULT_POINTS[result] if played and team != 'Gamma' and i % 2 == 1 else np.nan,
+            })
+    return pd.DataFrame(rows).sample(frac=1, random_state=0).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('homeaway', ['total', 'home', 'away'])
+@pytest.mark.parametrize('lastgames', ['all', 'last5'])
+def test_standings_match_reference(games, homeaway, lastgames):
+    df_played = games[games['game_id'].notna()]
+    if homeaway != 'total':
+        df_played = df_played[df_played['h_a'] == homeaway]
+    if lastgames == 'last5':
+        df_played = df_played.sort_values(by='date', ascending=False).groupby('team').head(5).reset_index(drop=True)
+
+    standings = standings_with_form(df_played)
+    reference = reference_standings(df_played)
+
+    assert_same_standings(standings, reference)
+    assert table_order(standings) == table_order(reference)
+
+
+def test_tied_teams_and_form(games):
+    standings = standings_with_form(games[games['game_id'].notna()]).set_index('team')
+
+    assert standings.loc['Alpha', ['points', 'goal_difference']].tolist() == [10, 3]
+    assert standings.loc['Beta', ['points', 'goal_difference']].tolist() == [10, 3]
+    assert standings.loc['Gamma', ['avg_points_pregame_ahead', 'avg_points_pregame_behind']].tolist() == [0, 0]
+    assert standings.loc['Delta', 'games'] == 6
+    # The last five games, oldest first
+    assert standings.loc['Gamma', 'last_5_icons'] == ' '.join(RESULT_ICONS[result] for result in ['draw', 'win', 'lost', 'draw', 'ot win'])
+
+
+def test_form_of_fewer_than_five_games(games):
+    df_home = games[games['game_id'].notna() & (games['h_a'] == 'home')]
+    standings = standings_with_form(df_home).set_index('team')
+
+    # Only the team's own three home games
+    assert standings.loc['Beta', 'last_5_icons'] == ' '.join(RESULT_ICONS[result] for result in ['win', 'ot win', 'lost'])
+
+
+def test_standings_added_in_batches(games):
+    df_played = games[games['game_id'].notna()]
+    first = df_played['date'] < pd.Timestamp('2024-09-20')
+
+    batches = Standings(df_played[first]).add_games(df_played[~first]).table()
+
+    pd.testing.assert_frame_equal(batches, compute_standings(df_played))
+
+
+def test_table_tab_matches_reference(dashboard):
+    dataset = dashboard.current_dataset()
+    pairs = dashboard.games_index(dataset).keys[['league', 'season']].drop_duplicates().astype(str).to_numpy()
+
+    for league, season in pairs:
+        df_played = dashboard.filter_season_league(dataset, league, season)
+        df_played = df_played[df_played['game_id'].notna()]
+        for homeaway in ['total', 'home', 'away']:
+            df_filtered = df_played if homeaway == 'total' else df_played[df_played['h_a'] == homeaway]
+            for lastgames in ['all', 'last5', 'last10']:
+                standings = dashboard.filter_table(dataset, league, season, homeaway, lastgames)
+                assert_same_standings(standings, reference_standings(df_filtered, lastgames))
+
+
+def test_duckdb_standings_match_reference(dashboard):
+    pytest.importorskip('duckdb')
+    from sql_engine import sql_engine
+
+    dataset = dashboard.current_dataset()
+    for league, season in [('shl', '2024/25'), ('allsvenskan', '2019/20')]:
+        df_played = dashboard.filter_season_league(dataset, league, season)
+        df_played = df_played[df_played['game_id'].notna()]
+        for homeaway in ['total', 'home', 'away']:
+            df_filtered = df_played if homeaway == 'total' else df_played[df_played['h_a'] == homeaway]
+            for lastgames, last_games in [('all', None), ('last5', 5)]:
+                standings = sql_engine(dataset).standings(league, season, homeaway, last_games)
+                assert_same_standings(standings, reference_standings(df_filtered, lastgames))
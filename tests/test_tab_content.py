@@ -0,0 +1,46 @@
+# One callback renders the active tab (render_content in app.py). It renders on page load,
+# on a tab switch and on changes of the active tab's own inputs only.
+
+import json
+
+import pytest
+
+
+def tab_content_request(dashboard, active_tab, changed):
+    values = dashboard.default_view()
+    values['tabs.active_tab'] = active_tab
+    # The stores update_table fills, as the browser has them after the first request
+    for output, key in zip(['table-filtered.data', 'season-league-filtered.data', 'league-matchday-filtered.data'],
+                           dashboard.update_table(*(values[str(dependency)] for dependency in dashboard.FILTER_INPUTS))):
+        values[output] = key
+
+    inputs = [{'id': 'tabs', 'property': 'active_tab', 'value': active_tab}]
+    for dependency in dashboard.TAB_CONTENT_INPUTS:
+        inputs.append({'id': dependency.component_id, 'property': dependency.component_property,
+                       'value': values.get(str(dependency))})
+    return {'output': dashboard.TAB_CONTENT_OUTPUT, 'outputs': None, 'inputs': inputs, 'changedPropIds': changed}
+
+
+@pytest.mark.parametrize('changed, status', [
+    ([], 200),
+    (['tabs.active_tab'], 200),
+    (['table-filtered.data', 'league-dropdown.value'], 200),
+    (['team-dropdown.value'], 204),
+    (['matchdaymetric-dropdown.value'], 204),
+    (['league-matchday-filtered.data', 'metricselector-button-text.data'], 204),
+])
+def test_only_active_tab_inputs_render(dashboard, changed, status):
+    client = dashboard.server.test_client()
+    response = client.post('/_dash-update-component', json=tab_content_request(dashboard, 'tab-1', changed))
+
+    assert response.status_code == status
+    if status == 200:
+        assert list(json.loads(response.get_data())['response']) == ['tab-1-content']
+
+
+def test_snapshot_triggers(dashboard):
+    body = tab_content_request(dashboard, 'tab-3', [])
+
+    assert dashboard.tab_content_triggers(body) == ['tabs.active_tab', 'season-league-filtered.data',
+                                                    'matchdaymetric-dropdown.value']
+    assert dashboard.tab_content_triggers({**body, 'output': 'about-modal.is_open'}) is None
@@ -0,0 +1,146 @@
+# The Matchday Table Position (tab 3) and Point Distribution (tab 4) tabs were rebuilt on
+# precomputed structures (position_matrix.py, point_distribution.py). Their output is
+# compared here with the plotly.express and groupby code they replaced, kept as reference.
+
+import json
+
+import numpy as np
+import pandas as pd
+import plotly
+import plotly.express as px
+from dash import dcc
+
+from chart_styles import apply_darkly_style
+from point_distribution import point_distribution
+from position_matrix import position_matrix
+
+
+MATCHDAY_METRICS = ['table_position', 'avg_points']
+
+
+def reference_points_figure(df_season_league_filtered, selected_matchdaymetric):
+    # Figure of tab 3 before the position matrix
+    matchday_not_finished = df_season_league_filtered[df_season_league_filtered['game_id'].isnull()]["matchday"].min()
+    if pd.isnull(matchday_not_finished):
+        matchday_not_finished = 100
+
+    df_season_league_filtered = df_season_league_filtered[df_season_league_filtered['game_id'].notnull()].sort_values(by=['team', 'matchday'])
+    df_finished = df_season_league_filtered[df_season_league_filtered['matchday'] < matchday_not_finished].sort_values(by=['team', 'matchday'])
+    df_finished['avg_points'] = df_finished['points_cum'] / df_finished['matchday']
+
+    max_position = df_finished[selected_matchdaymetric].max()
+    middle_position = (max_position+1)//2
+    matchday_max = df_finished["matchday"].max()
+
+    if selected_matchdaymetric == 'avg_points':
+        yaxis_range = [0, 3]
+        headline_txt = 'Average Points'
+        tick_format = '.2f'
+    else:
+        yaxis_range = [max_position + 0.5, 0.5]
+        headline_txt = 'Table Position'
+        tick_format = 'd'
+
+    fig = px.line(df_finished, title=None, x='matchday', y=selected_matchdaymetric, color='team', markers=True)
+
+    if selected_matchdaymetric == 'table_position':
+        for team in df_finished["team"].unique():
+            last_row = df_finished[df_finished["team"] == team].iloc[-1]
+            fig.add_annotation(x=matchday_max*1.05, y=last_row[selected_matchdaymetric], text=team,
+                               showarrow=False, font=dict(size=12), align="right")
+
+    fig = apply_darkly_style(fig)
+    fig.update_layout(title_font=dict(size=20, color='white'), showlegend=True, xaxis=dict(title='Matchday'))
+    fig.update_traces(marker=dict(size=10))
+    fig.update_yaxes(
+        title=headline_txt,
+        title_standoff=25,
+        side="left",
+        range=yaxis_range,
+        tickvals=[1, middle_position, max_position],
+        ticktext=['1', str(middle_position), str(max_position)],
+        tickmode='array',
+        tickformat=tick_format,
+        showgrid=True,
+        gridwidth=1,
+        tickangle=0
+    )
+    return fig
+
+
+def reference_pointdistr_stats(df_league_matchday_filtered):
+    # Statistics table of tab 4 before the point distribution cube
+    df = df_league_matchday_filtered[~((df_league_matchday_filtered['league'] == 'shl') & (df_league_matchday_filtered['season'] == '2014/15'))]
+
+    def top_6_limit(series):
+        return series.nlargest(6).min() if len(series) >= 6 else np.nan
+
+    def top_12_limit(series):
+        return series.nlargest(12).min() if len(series) >= 12 else np.nan
+
+    return (
+        df.groupby('season')['points_cum']
+        .agg(
+            min='min',
+            max='max',
+            max_min_diff=lambda x: x.max() - x.min(),
+            median='median',
+            std='std',
+            top_6_limit=top_6_limit,
+            top_12_limit=top_12_limit
+        )
+        .reset_index()
+    )
+
+
+def graph_figure(component):
+    if isinstance(component, dcc.Graph):
+        return component.figure
+    children = getattr(component, 'children', None)
+    for child in children if isinstance(children, list) else [children]:
+        if child is not None and not isinstance(child, str):
+            figure = graph_figure(child)
+            if figure is not None:
+                return figure
+    return None
+
+
+def to_json(value):
+    return json.dumps(value, cls=plotly.utils.PlotlyJSONEncoder, sort_keys=True)
+
+
+def figure_json(figure):
+    # px joins the trace mode flags from a set, so their order changes with the string hash
+    # seed of the process. Plotly draws them the same in any order
+    figure = json.loads(to_json(figure))
+    for trace in figure['data']:
+        if 'mode' in trace:
+            trace['mode'] = '+'.join(sorted(trace['mode'].split('+')))
+    return to_json(figure)
+
+
+def test_points_figure_matches_reference(dashboard):
+    dataset = dashboard.current_dataset()
+    pairs = dashboard.games_index(dataset).keys[['league', 'season']].drop_duplicates().astype(str).to_numpy()
+
+    for league, season in pairs:
+        df_season = dashboard.filter_season_league(dataset, league, season)
+        matrix = position_matrix(dataset, league, season)
+        for metric in MATCHDAY_METRICS:
+            figure = graph_figure(dashboard.tab_content_points(matrix, metric))
+            reference = reference_points_figure(df_season, metric)
+            assert figure_json(figure) == figure_json(reference), (league, season, metric)
+
+
+def test_pointdistr_stats_match_reference(dashboard):
+    dataset = dashboard.current_dataset()
+    pairs = dashboard.games_index(dataset).keys[['league', 'matchday']].drop_duplicates().astype({'league': str}).to_numpy()
+    cube = point_distribution(dataset)
+
+    for league, matchday in pairs:
+        df_matchday = dashboard.filter_league_matchday(dataset, league, int(matchday))
+        if df_matchday.empty:
+            continue
+        stats = cube.stats(league, int(matchday)).reset_index(drop=True)
+        reference = reference_pointdistr_stats(df_matchday)
+        assert to_json(stats.to_dict('records')) == to_json(reference.to_dict('records')), (league, matchday)
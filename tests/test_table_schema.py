@@ -0,0 +1,44 @@
+# Shared categoricals and downcast integers of the loaded tables (optimize_dtypes in table_schema.py).
+
+import pandas as pd
+import pandas.testing as tm
+
+from synthetic_data import generate_tables
+from table_schema import decategorize, optimize_dtypes, validate_tables
+
+
+def test_optimize_dtypes_round_trip():
+    tables = validate_tables(generate_tables(n_leagues=1, n_seasons=2, n_teams=6, seed=0))
+
+    optimized = optimize_dtypes(tables)
+
+    for name, df in tables.items():
+        restored = decategorize(optimized[name])
+        for column in df.columns:
+            if pd.api.types.is_integer_dtype(df[column]):
+                tm.assert_series_equal(restored[column].astype('Int64'), df[column])
+            else:
+                tm.assert_series_equal(restored[column], df[column], check_dtype=False)
+
+
+def test_team_and_opponent_share_sorted_categories():
+    games = optimize_dtypes(validate_tables(generate_tables(n_leagues=1, n_seasons=2, n_teams=6, seed=0)))['team_games']
+
+    categories = games['team'].cat.categories
+    assert games['opponent'].dtype == games['team'].dtype
+    assert categories.tolist() == sorted(categories)
+    # Codes are comparable across the two columns
+    assert not (games['team'].cat.codes == games['opponent'].cat.codes).any()
+
+
+def test_integers_downcast_to_smallest_dtype():
+    tables = validate_tables(generate_tables(n_leagues=1, n_seasons=2, n_teams=6, seed=0))
+    tables['matchdays'] = tables['matchdays'].assign(matchday=pd.array([1, 52] + [None] * (len(tables['matchdays']) - 2), dtype='Int64'))
+    tables['team_currentmetrics'] = tables['team_currentmetrics'].assign(points=40000)
+
+    optimized = optimize_dtypes(tables)
+
+    assert optimized['matchdays']['matchday'].dtype == 'Int8'
+    assert optimized['matchdays']['matchday'].isna().sum() == len(tables['matchdays']) - 2
+    assert optimized['team_currentmetrics']['table_position'].dtype == 'Int8'
+    assert optimized['team_currentmetrics']['points'].dtype == 'Int32'
@@ -0,0 +1,45 @@
+# Heatmap bins and cells of the Team Comparison table (table_styles.py).
+
+import numpy as np
+
+from table_styles import get_heatmap_bins, get_heatmap_cells, get_heatmap_css
+
+
+def test_bins_between_min_and_max():
+    values = np.array([[0.0, 1.5, 2.5], [3.5, 4.5, 5.0]])
+
+    # Bounds 0, 1, 2, 3, 4, 5: the first bin includes the minimum, the last bin the maximum
+    assert get_heatmap_bins(values).tolist() == [[0, 1, 2], [3, 4, 4]]
+
+
+def test_missing_values_and_values_below_min_value():
+    values = np.array([[np.nan, 3000.0, 4000.0], [6000.0, 9000.0, 14000.0]])
+
+    bins = get_heatmap_bins(values, min_value=4000)
+
+    assert bins.tolist() == [[-1, -1, 0], [1, 2, 4]]
+
+
+def test_no_values():
+    assert get_heatmap_bins(np.full((2, 2), np.nan)).tolist() == [[-1, -1], [-1, -1]]
+
+
+def test_cells_carry_bin_class_and_sort_by_value():
+    values = np.array([[9.5, np.nan], [10.25, 3000.0]])
+    formatted = np.array([['9.5', ''], ['10.2', '3,000']], dtype=object)
+    bins = np.array([[0, -1], [4, -1]])
+
+    cells = get_heatmap_cells(values, formatted, bins)
+
+    assert cells[0, 0] == '<div data-sort="000000009.50" class="heatmap-cell heatmap-bin-0">9.5</div>'
+    assert cells[0, 1] == ''
+    assert cells[1, 1] == '<div data-sort="000003000.00" class="heatmap-cell">3,000</div>'
+    # DataTable sorts the strings, which follows the values
+    assert sorted(cells[cells != ''].tolist()) == [cells[0, 0], cells[1, 0], cells[1, 1]]
+
+
+def test_css_one_rule_per_bin():
+    css = get_heatmap_css(5)
+
+    assert [rule['selector'] for rule in css] == ['.heatmap-cell'] + [f'.heatmap-bin-{i}' for i in range(5)]
+    assert 'color: black' in css[1]['rule'] and 'color: white' in css[5]['rule']
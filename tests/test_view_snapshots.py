@@ -0,0 +1,62 @@
+# Pre-rendered callback responses served with ETags (view_snapshots.py).
+
+import gzip
+import json
+
+import pytest
+
+from view_snapshots import ViewSnapshots
+
+
+@pytest.fixture(scope='module')
+def snapshots(dashboard):
+    view_snapshots = ViewSnapshots(dashboard.app, dashboard.default_view,
+                                   [str(dependency) for dependency in dashboard.FILTER_INPUTS], 'tabs.active_tab',
+                                   tabs=['tab-2'], triggers=dashboard.tab_content_triggers)
+    view_snapshots.build(dashboard.current_dataset().version)
+    return view_snapshots
+
+
+@pytest.fixture
+def client(dashboard, snapshots, monkeypatch):
+    monkeypatch.setattr(dashboard, 'view_snapshots', snapshots)
+    return dashboard.server.test_client()
+
+
+def test_manifest_conditional_get(dashboard, client):
+    response = client.get('/view-snapshots.json')
+    manifest = json.loads(response.get_data())
+
+    assert response.status_code == 200 and response.headers['ETag']
+    assert manifest['version'] == dashboard.current_dataset().version and manifest['snapshots']
+    assert response.cache_control.public
+
+    response = client.get('/view-snapshots.json', headers={'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 304 and not response.get_data()
+
+
+def test_manifest_of_other_version_is_empty(snapshots, client, monkeypatch):
+    monkeypatch.setattr(snapshots, 'version', 'older')
+    response = client.get('/view-snapshots.json')
+
+    assert json.loads(response.get_data())['snapshots'] == {}
+    assert response.cache_control.no_store and 'ETag' not in response.headers
+
+
+def test_snapshot_gzip_and_conditional_get(client):
+    manifest = json.loads(client.get('/view-snapshots.json').get_data())
+    key = next(key for key in manifest['snapshots'] if key in manifest['triggers'])
+    url = '/' + manifest['snapshots'][key]
+
+    plain = client.get(url)
+    compressed = client.get(url, headers={'Accept-Encoding': 'gzip, deflate'})
+
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in compressed.vary and 'Accept-Encoding' in plain.vary
+    assert gzip.decompress(compressed.get_data()) == plain.get_data()
+    assert list(json.loads(plain.get_data())['response']) == ['tab-2-content']
+    # Each encoding has its own ETag
+    assert compressed.headers['ETag'] != plain.headers['ETag']
+    assert client.get(url, headers={'If-None-Match': plain.headers['ETag']}).status_code == 304
+    assert client.get(url, headers={'If-None-Match': compressed.headers['ETag']}).status_code == 200
+    assert client.get('/view-snapshots/' + '0' * 32 + '.json').status_code == 404
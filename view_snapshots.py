@@ -0,0 +1,292 @@
+# view_snapshots.py
+
+# Most visitors land on the default view (Table tab, SHL, the current season, all games)
+# and, until the next data refresh, all of them send the same callback requests and get
+# the same responses. After each refresh these responses are rendered once, for the default
+# view and the most requested filter combinations, and served as static JSON by GET with an
+# ETag and Cache-Control, so the first paint runs no callback and the browser cache or a
+# reverse proxy can answer it. assets/cached_views.js sends a callback request as such a GET
+# when the manifest lists it, and as the usual POST otherwise.
+#
+# Snapshots are rendered as on page load. A callback that renders only on changes of some of
+# its inputs lists them in the manifest, and requests triggered by other inputs are POSTed.
+#
+# Snapshot URLs are derived from the data version and the request, so a snapshot never
+# changes and can be cached long. The manifest, which changes with every refresh, is cached
+# for VIEW_SNAPSHOT_MANIFEST_MAX_AGE seconds only.
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+from flask import Response
+
+from response_compression import accepts_gzip, RESPONSE_COMPRESSION_LEVEL, RESPONSE_COMPRESSION_MIN_BYTES
+
+
+# Active tabs each view is snapshotted with, empty to disable the snapshots
+VIEW_SNAPSHOT_TABS = [tab for tab in os.getenv('VIEW_SNAPSHOT_TABS', 'tab-1,tab-2,tab-3,tab-4,tab-5,tab-6').split(',') if tab]
+# Most requested filter combinations snapshotted next to the default view
+VIEW_SNAPSHOT_POPULAR = int(os.getenv('VIEW_SNAPSHOT_POPULAR', '5'))
+VIEW_SNAPSHOT_MAX_AGE = int(os.getenv('VIEW_SNAPSHOT_MAX_AGE', '86400'))
+VIEW_SNAPSHOT_MANIFEST_MAX_AGE = int(os.getenv('VIEW_SNAPSHOT_MANIFEST_MAX_AGE', '60'))
+
+# Filter combinations counted, the least requested half is dropped beyond it
+VIEW_COUNTS_SIZE = 1000
+
+# Header of the callback requests that render snapshots, which are neither measured nor counted
+SNAPSHOT_HEADER = 'X-View-Snapshot'
+
+SNAPSHOT_URL = 'view-snapshots/{digest}.json'
+
+
+def is_snapshot_request(request):
+    return request.headers.get(SNAPSHOT_HEADER) == '1'
+
+
+def request_key(body):
+    """
+    Canonical form of a callback request: its output and the values of its inputs and
+    state, with sorted keys. assets/cached_views.js builds the same string in the browser.
+    """
+    return json.dumps(
+        {'output': body['output'], 'inputs': body.get('inputs') or [], 'state': body.get('state') or []},
+        sort_keys=True, separators=(',', ':'), ensure_ascii=False,
+    )
+
+
+def layout_values(layout):
+    """
+    The properties of every component with an id in a layout, except its children.
+
+    Returns:
+        Dict 'id.property' -> value.
+    """
+    values = {}
+    for component in [layout] + list(layout._traverse()):
+        component_id = getattr(component, 'id', None)
+        if not isinstance(component_id, str):
+            continue
+        for prop, value in component.to_plotly_json()['props'].items():
+            if prop != 'children':
+                values[f'{component_id}.{prop}'] = value
+    return values
+
+
+def _outputs(callback):
+    outputs = callback['output'] if isinstance(callback['output'], (list, tuple)) else [callback['output']]
+    return [str(output) for output in outputs]
+
+
+def _dependency_values(dependencies, values):
+    # Like the browser, a property without a value is sent without the value key
+    filled = []
+    for dependency in dependencies:
+        prop = f"{dependency['id']}.{dependency['property']}"
+        entry = {'id': dependency['id'], 'property': dependency['property']}
+        if prop in values:
+            entry['value'] = values[prop]
+        filled.append(entry)
+    return filled
+
+
+class ViewSnapshots:
+    """
+    Rendered callback responses of the views visitors start from, for one data version.
+
+    A view is the set of component values the browser has on page load. Its server
+    callbacks are run in the order the browser runs them, through the Flask server, and
+    every response is kept, keyed on its request. Snapshots are rebuilt with build()
+    after every refresh and swapped in at once.
+
+    Parameters:
+        app: Dash app.
+        default_view: Callable returning the values ('id.property' -> value) the browser has
+            on page load, including the values clientside callbacks set.
+        filters: 'id.property' of the filter inputs whose value combinations are counted.
+        tab_property: 'id.property' of the active tab.
+        triggers: Callable returning the 'id.property' of the inputs whose change a callback
+            request renders on, None if it renders on a change of any of its inputs. Requests
+            triggered by other inputs are not answered from the snapshot.
+    """
+
+    def __init__(self, app, default_view, filters, tab_property, tabs=VIEW_SNAPSHOT_TABS, popular=VIEW_SNAPSHOT_POPULAR,
+                 triggers=None):
+        self.app = app
+        self.default_view = default_view
+        self.filters = list(filters)
+        self.tab_property = tab_property
+        self.tabs = tabs
+        self.popular = popular
+        self.triggers = triggers
+        self.version = None
+        self._snapshots = {}
+        self._manifest = None
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def count_request(self, body):
+        """
+        Count the filter combination of a callback request, if its inputs are the filters.
+        """
+        inputs = body.get('inputs') or []
+        if [f"{entry.get('id')}.{entry.get('property')}" for entry in inputs] != self.filters:
+            return
+        self._count(json.dumps([entry.get('value') for entry in inputs]))
+
+    def _count(self, combination):
+        with self._lock:
+            self._counts[combination] += 1
+            if len(self._counts) > VIEW_COUNTS_SIZE:
+                self._counts = Counter(dict(self._counts.most_common(VIEW_COUNTS_SIZE // 2)))
+
+    def popular_filters(self):
+        """
+        The most requested filter combinations, the most requested first.
+
+        Returns:
+            List of dicts 'id.property' -> value.
+        """
+        with self._lock:
+            combinations = self._counts.most_common(self.popular)
+        return [dict(zip(self.filters, json.loads(combination))) for combination, _ in combinations]
+
+    def build(self, version):
+        """
+        Render the snapshots of the default view and the most requested filter combinations
+        with every tab of tabs active, and serve them from now on.
+        """
+        if not self.tabs:
+            return
+        with self._build_lock:
+            start = time.perf_counter()
+            try:
+                default_view = self.default_view()
+                views = [default_view]
+                for filters in self.popular_filters():
+                    view = {**default_view, **filters}
+                    if view not in views:
+                        views.append(view)
+
+                client = self.app.server.test_client()
+                snapshots = {}
+                for view in views:
+                    for tab in self.tabs:
+                        self._render_view(client, {**view, self.tab_property: tab}, version, snapshots)
+            except Exception as e:
+                print(f"Error rendering view snapshots of version {version}: {e}")
+                return
+
+            manifest = json.dumps({
+                'version': version,
+                'snapshots': {snapshot['key']: SNAPSHOT_URL.format(digest=digest) for digest, snapshot in snapshots.items()},
+                'triggers': {snapshot['key']: snapshot['triggers'] for snapshot in snapshots.values() if snapshot['triggers'] is not None},
+            }, separators=(',', ':'), ensure_ascii=False).encode()
+            with self._lock:
+                self._snapshots = snapshots
+                self._manifest = self._static_file(manifest)
+                self.version = version
+            print(f"Rendered {len(snapshots)} view snapshots of {len(views)} views of version {version} "
+                  f"in {time.perf_counter() - start:.1f} s")
+
+    def _render_view(self, client, values, version, snapshots):
+        # Server callbacks fired on page load, run once all callbacks their inputs wait for have run
+        callbacks = {
+            output: callback for output, callback in self.app.callback_map.items()
+            if 'callback' in callback and not callback.get('prevent_initial_call')
+        }
+        url = self.app.config.routes_pathname_prefix + '_dash-update-component'
+        values = dict(values)
+
+        while callbacks:
+            pending = {prop for callback in callbacks.values() for prop in _outputs(callback)}
+            ready = [
+                output for output, callback in callbacks.items()
+                if not any(f"{dependency['id']}.{dependency['property']}" in pending
+                           for dependency in callback['inputs'] + callback['state'])
+            ]
+            if not ready:
+                break
+
+            for output in ready:
+                callback = callbacks.pop(output)
+                body = {'output': output, 'inputs': _dependency_values(callback['inputs'], values), 'changedPropIds': []}
+                if callback['state']:
+                    body['state'] = _dependency_values(callback['state'], values)
+                key = request_key(body)
+                digest = hashlib.sha256(f'{version}\n{key}'.encode()).hexdigest()[:32]
+
+                if digest not in snapshots:
+                    response = client.post(url, json=body, headers={SNAPSHOT_HEADER: '1'})
+                    # Failed callbacks are left to the browser, which gets the error from its own request
+                    if response.status_code not in (200, 204):
+                        continue
+                    snapshot = self._static_file(response.get_data(), response.status_code)
+                    snapshot['key'] = key
+                    snapshot['triggers'] = self.triggers(body) if self.triggers is not None else None
+                    if [f"{entry['id']}.{entry['property']}" for entry in body['inputs']] == self.filters:
+                        snapshot['filters'] = json.dumps([entry.get('value') for entry in body['inputs']])
+                    snapshots[digest] = snapshot
+
+                snapshot = snapshots[digest]
+                if snapshot['status'] == 200:
+                    for component_id, props in json.loads(snapshot['body'])['response'].items():
+                        for prop, value in props.items():
+                            values[f'{component_id}.{prop}'] = value
+
+    @staticmethod
+    def _static_file(body, status=200):
+        compressed = None
+        if RESPONSE_COMPRESSION_LEVEL > 0 and len(body) >= RESPONSE_COMPRESSION_MIN_BYTES:
+            compressed = gzip.compress(body, compresslevel=RESPONSE_COMPRESSION_LEVEL)
+        return {
+            'status': status,
+            'body': body,
+            'gzip': compressed,
+            'etag': hashlib.sha256(body).hexdigest()[:32],
+        }
+
+    def manifest_response(self, request, version):
+        """
+        The snapshot URLs by request of the data version, empty while its snapshots are built.
+        """
+        with self._lock:
+            manifest = self._manifest if self.version == version else None
+        if manifest is None:
+            response = Response(json.dumps({'version': version, 'snapshots': {}}), mimetype='application/json')
+            response.cache_control.no_store = True
+            return response
+        return self._cached_response(manifest, request, VIEW_SNAPSHOT_MANIFEST_MAX_AGE)
+
+    def snapshot_response(self, request, digest, version):
+        """
+        A snapshot of the data version, None if there is none.
+        """
+        with self._lock:
+            snapshot = self._snapshots.get(digest) if self.version == version else None
+        if snapshot is None:
+            return None
+        if 'filters' in snapshot:
+            self._count(snapshot['filters'])
+        return self._cached_response(snapshot, request, VIEW_SNAPSHOT_MAX_AGE)
+
+    @staticmethod
+    def _cached_response(static_file, request, max_age):
+        compressed = static_file['gzip'] is not None and accepts_gzip(request)
+        response = Response(static_file['gzip'] if compressed else static_file['body'],
+                            status=static_file['status'], mimetype='application/json')
+        etag = static_file['etag']
+        if static_file['gzip'] is not None:
+            response.vary.add('Accept-Encoding')
+            if compressed:
+                response.headers['Content-Encoding'] = 'gzip'
+                etag += '-gzip'
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+        return response.make_conditional(request)